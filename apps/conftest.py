@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from apps.stddata.models import Country, Language
+
+
+@pytest.fixture
+def country(db):
+    return Country.objects.get_or_create(
+        code='zz', defaults={'name': 'Zedland'})[0]
+
+
+@pytest.fixture
+def language(db):
+    return Language.objects.get_or_create(
+        code='zz', defaults={'name': 'Zedish'})[0]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Updates of the data derived from committed revisions, i.e. the
+collaborations of creators, the series and feature rollups of creators,
+characters and groups, and the issue neighbours and columns of series.
+Within deferred_updates, as used by Changeset.approve, the ids of the
+objects to update are gathered over all revisions of the changeset, and
+after the commit each update is run once for all of them, by an RQ job if
+django_rq is in INSTALLED_APPS.  Outside of deferred_updates the updates
+are run after the commit of the current transaction.
+"""
+
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.gcd.models.creator import update_story_collaborations
+from apps.gcd.models.rollup import update_story_rollups
+from apps.gcd.models.series import Series
+from apps.gcd.views.issue_page import invalidate_issue_pages
+
+# The ids gathered by deferred_updates per thread, by their name.
+_pending_updates = threading.local()
+
+
+def update_derived_data(ids):
+    """
+    Job updating the derived data for the ids, keyed by the names used
+    with record_updates.
+    """
+    if ids.get('collaboration_story_ids') or ids.get('collaborator_ids'):
+        update_story_collaborations(ids.get('collaboration_story_ids', ()),
+                                    ids.get('collaborator_ids', ()))
+    if ids.get('rollup_story_ids'):
+        update_story_rollups(
+          ids['rollup_story_ids'],
+          creator_ids=ids.get('rollup_creator_ids', ()),
+          character_ids=ids.get('rollup_character_ids', ()),
+          group_ids=ids.get('rollup_group_ids', ()),
+          series_ids=ids.get('rollup_series_ids', ()),
+          feature_ids=ids.get('rollup_feature_ids', ()),
+          owner_story_ids=ids.get('rollup_owner_story_ids', ()))
+    if ids.get('issue_series_ids'):
+        series_ids = ids['issue_series_ids']
+        for series in Series.objects.filter(id__in=series_ids):
+            series.set_prev_next_issues()
+            series.set_issue_columns()
+        # the pages can be cached with the old neighbours in the meantime
+        invalidate_issue_pages(series_ids)
+
+
+def _queue_updates(ids):
+    ids = {name: sorted(values) for name, values in ids.items()}
+    if 'django_rq' not in settings.INSTALLED_APPS:
+        update_derived_data(ids)
+        return
+
+    import django_rq
+    django_rq.get_queue('default').enqueue(update_derived_data, ids)
+
+
+def record_updates(**ids):
+    """
+    Record the ids of objects whose derived data needs to be updated, e.g.
+    record_updates(collaborator_ids=[creator.id]).
+    """
+    pending = getattr(_pending_updates, 'ids', None)
+    if pending is None:
+        transaction.on_commit(partial(_queue_updates, ids))
+        return
+    for name, values in ids.items():
+        pending.setdefault(name, set()).update(values)
+
+
+@contextmanager
+def deferred_updates():
+    """
+    Gathers the ids of record_updates and queues one update for all of them
+    after the commit.  Nested uses are part of the outermost one.  On errors
+    the gathered ids are dropped.
+    """
+    if getattr(_pending_updates, 'ids', None) is not None:
+        yield
+        return
+    _pending_updates.ids = {}
+    try:
+        yield
+        ids = _pending_updates.ids
+    finally:
+        _pending_updates.ids = None
+    if ids:
+        transaction.on_commit(partial(_queue_updates, ids))
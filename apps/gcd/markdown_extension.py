@@ -1,6 +1,7 @@
-from django.shortcuts import get_object_or_404
-from django.http import Http404
+import re
+import threading
 
+import markdown
 from markdown.extensions import Extension
 from markdown.treeprocessors import Treeprocessor
 from markdown.inlinepatterns import InlineProcessor
@@ -10,6 +11,9 @@ from apps.gcd.models import Issue, Story
 
 GCD_REFERENCE_RE = r'\[gcd_link_([^\]]+)\]\((\d+)\)'
 GCD_REFERENCE_LINK_NAME_RE = r'\[gcd_link_name_([^\]]+)\]\((\d+)\)\{([^\}]+)\}'
+# both kinds of references, for collecting them from a text
+GCD_ANY_REFERENCE_RE = re.compile(
+  r'\[gcd_link_(?:name_)?([^\]]+)\]\((\d+)\)')
 
 # Regular expression for matching URLs
 URL_RE = r'(?<!\]\()(https?:\/\/[^\s\)\]\}]+)'
@@ -32,8 +36,45 @@ class URLExtension(Extension):
             'autolink_urls', 180)
 
 
+def _reference_model(ref_type):
+    from apps.oi.views import DISPLAY_CLASSES
+    if ref_type in ['issue_with_date', 'story_with_date']:
+        ref_type = ref_type[:-len('_with_date')]
+    return DISPLAY_CLASSES.get(ref_type)
+
+
+def load_references(text):
+    """
+    The objects of the GCD references in the text, loaded with one query per
+    object type, keyed by their model and id.
+    """
+    ids_per_model = {}
+    for ref_type, ref_id in GCD_ANY_REFERENCE_RE.findall(text):
+        model = _reference_model(ref_type)
+        if model:
+            ids_per_model.setdefault(model, set()).add(int(ref_id))
+
+    references = {}
+    for model, ids in ids_per_model.items():
+        objects = model._default_manager.filter(id__in=ids)
+        if model is Issue:
+            objects = objects.select_related('series__publisher')
+        elif model is Story:
+            objects = objects.select_related('issue__series__publisher')
+        for object in objects:
+            references[(model, object.id)] = object
+    return references
+
+
 class GCDReferenceInlineProcessor(InlineProcessor):
     """Process [gcd_link_object](id) references and convert to links."""
+    def _get_object(self, model, ref_id):
+        # the references loaded by convert_markdown, or a query for each
+        references = getattr(self.md, 'gcd_references', None)
+        if references is None:
+            return model._default_manager.filter(id=ref_id).first()
+        return references.get((model, int(ref_id)))
+
     def handleMatch(self, m, data):
         from apps.oi.views import DISPLAY_CLASSES
         # Check if the regex match has two or three groups
@@ -49,9 +90,8 @@ class GCDReferenceInlineProcessor(InlineProcessor):
         el = Element('a')
 
         if ref_type in ['issue', 'issue_with_date']:
-            try:
-                issue = get_object_or_404(Issue, id=ref_id)
-            except Http404:
+            issue = self._get_object(Issue, ref_id)
+            if issue is None:
                 # If the issue is not found, return the text
                 if ref_type == 'issue_with_date':
                     ref_type = 'issue'
@@ -67,9 +107,8 @@ class GCDReferenceInlineProcessor(InlineProcessor):
                 # append the publication date to the text
                 el.text += f" ({issue.publication_date})"
         elif ref_type in ['story', 'story_with_date']:
-            try:
-                story = get_object_or_404(Story, id=ref_id)
-            except Http404:
+            story = self._get_object(Story, ref_id)
+            if story is None:
                 # If the story is not found, return the text
                 if ref_type == 'story_with_date':
                     ref_type = 'story'
@@ -85,10 +124,8 @@ class GCDReferenceInlineProcessor(InlineProcessor):
                 # append the publication date to the text
                 el.text += f" ({story.issue.publication_date})"
         elif ref_type in DISPLAY_CLASSES:
-            try:
-                object = get_object_or_404(DISPLAY_CLASSES[ref_type],
-                                           id=ref_id)
-            except Http404:
+            object = self._get_object(DISPLAY_CLASSES[ref_type], ref_id)
+            if object is None:
                 # If the object is not found, return the text
                 el.text = f"No corresponding GCD object found: {ref_type}" \
                           f" with id {ref_id}"
@@ -161,3 +198,29 @@ class TailwindTreeProcessor(Treeprocessor):
 
                 # Apply classes to subsequent occurrences
                 node.attrib["class"] = tag_classes
+
+
+# Markdown instances are expensive to set up and not thread-safe, each
+# thread keeps its own for reuse.
+_renderers = threading.local()
+
+
+def convert_markdown(text, references):
+    """
+    Converts the markdown text to html, with the references loaded by
+    load_references.
+    """
+    renderer = getattr(_renderers, 'markdown', None)
+    if renderer is None:
+        renderer = markdown.Markdown(extensions=['nl2br',
+                                                 'md_in_html',
+                                                 TailwindExtension(),
+                                                 GCDFieldLinkNameExtension(),
+                                                 GCDFieldExtension(),
+                                                 URLExtension()])
+        _renderers.markdown = renderer
+    renderer.gcd_references = references
+    try:
+        return renderer.reset().convert(text)
+    finally:
+        renderer.gcd_references = None
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Min, Q, Value, When
+
+from apps.gcd.models.creator import COLLABORATION_ROLES
+from apps.gcd.models.story import CORE_TYPES
+
+BATCH_SIZE = 1000
+
+
+def add_collaborations(apps, schema_editor):
+    Creator = apps.get_model('gcd', 'Creator')
+    CreatorCollaboration = apps.get_model('gcd', 'CreatorCollaboration')
+    # the co-creators with credits on the core stories of the own names of
+    # the creators, as in update_collaborations, all conditions in one
+    # filter for the same joins
+    credit = 'creator_names__storycredit'
+    creator = credit + '__story__credits__creator'
+    issue = credit + '__story__issue'
+    conditions = {
+      credit + '__deleted': False,
+      credit + '__credit_type__id__lt': 6,
+      credit + '__story__type__id__in': CORE_TYPES,
+      credit + '__story__credits__deleted': False,
+      credit + '__story__credits__credit_type__id__lt': 6,
+      creator + '__deleted': False}
+    roles = {role: Count(issue, distinct=True,
+                         filter=Q(**{credit + '__credit_type__id': number}))
+             for number, role in enumerate(COLLABORATION_ROLES, 1)}
+    last_id = Creator.objects.aggregate(models.Max('id'))['id__max']
+    for start in range(0, (last_id or 0) + 1, BATCH_SIZE):
+        rows = Creator.objects.filter(**conditions, **{
+          creator + '__creator__gte': start,
+          creator + '__creator__lt': start + BATCH_SIZE})\
+                              .values('id',
+                                      creator_id=F(creator + '__creator'))\
+                              .order_by().annotate(
+          issue_count=Count(issue, distinct=True),
+          first_credit=Min(Case(When(**{issue + '__key_date': '',
+                                        'then': Value('9999-99-99')}),
+                                default=F(issue + '__key_date'))),
+          **roles)
+        CreatorCollaboration.objects.bulk_create(
+          [CreatorCollaboration(co_creator_id=row.pop('id'), **row)
+           for row in rows if row['id'] != row['creator_id']],
+          batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcd', '0071_feature_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatorCollaboration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue_count', models.PositiveIntegerField(default=0)),
+                ('script', models.PositiveIntegerField(default=0)),
+                ('pencils', models.PositiveIntegerField(default=0)),
+                ('inks', models.PositiveIntegerField(default=0)),
+                ('colors', models.PositiveIntegerField(default=0)),
+                ('letters', models.PositiveIntegerField(default=0)),
+                ('first_credit', models.CharField(max_length=10)),
+                ('co_creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_creator_collaborations', to='gcd.creator')),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collaborations', to='gcd.creator')),
+            ],
+            options={
+                'db_table': 'gcd_creator_collaboration',
+                'unique_together': {('creator', 'co_creator')},
+            },
+        ),
+        migrations.RunPython(add_collaborations,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,162 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Max, Min, Q, Value, When
+
+from apps.gcd.models.creator import COLLABORATION_ROLES
+from apps.gcd.models.story import CORE_TYPES
+
+BATCH_SIZE = 1000
+
+
+def _role_counts(issue, credit_type):
+    return {role: Count(issue, filter=Q(**{credit_type: number}),
+                        distinct=True)
+            for number, role in enumerate(COLLABORATION_ROLES, 1)}
+
+
+def _add_rollups(owners, rollup, objects, conditions, owner, annotations):
+    """
+    Add the rollups of the objects per batch of owners, all conditions are
+    in one filter for the same joins as in apps.gcd.models.rollup.
+    """
+    owner_field = rollup._meta.get_field(owners.model._meta.model_name).attname
+    key_field = rollup._meta.get_field(objects.model._meta.model_name).attname
+    last_id = owners.aggregate(Max('id'))['id__max']
+    for start in range(0, (last_id or 0) + 1, BATCH_SIZE):
+        rows = objects.filter(**conditions, **{owner + '__gte': start,
+                                               owner + '__lt':
+                                               start + BATCH_SIZE})\
+                      .values('id', rollup_owner=F(owner))\
+                      .order_by().annotate(**annotations)
+        rollup.objects.bulk_create(
+          [rollup(**{owner_field: row.pop('rollup_owner'),
+                     key_field: row.pop('id')}, **row) for row in rows],
+          batch_size=BATCH_SIZE)
+
+
+def add_rollups(apps, schema_editor):
+    Series = apps.get_model('gcd', 'Series')
+    Feature = apps.get_model('gcd', 'Feature')
+    Creator = apps.get_model('gcd', 'Creator')
+    Character = apps.get_model('gcd', 'Character')
+    Group = apps.get_model('gcd', 'Group')
+    series_dates = {'issue_count': Count('issue', distinct=True),
+                    'first_key_date': Min('issue__key_date'),
+                    'last_key_date': Max('issue__key_date')}
+
+    _add_rollups(
+      Creator.objects, apps.get_model('gcd', 'CreatorSeriesRollup'),
+      Series.objects, {'issue__story__type__id__in': CORE_TYPES,
+                       'issue__story__credits__deleted': False,
+                       'issue__story__credits__credit_type__id__lt': 6,
+                       'issue__story__credits__creator__deleted': False},
+      'issue__story__credits__creator__creator',
+      dict(series_dates,
+           **_role_counts('issue', 'issue__story__credits__credit_type__id')))
+    _add_rollups(
+      Creator.objects, apps.get_model('gcd', 'CreatorFeatureRollup'),
+      Feature.objects, {'story__credits__deleted': False,
+                        'story__credits__creator__deleted': False},
+      'story__credits__creator__creator',
+      dict(issue_count=Count('story__issue', distinct=True),
+           first_key_date=Min(Case(When(story__issue__key_date='',
+                                        then=Value('9999-99-99')),
+                                   default=F('story__issue__key_date'))),
+           last_key_date=Max('story__issue__key_date'),
+           **_role_counts('story__issue', 'story__credits__credit_type__id')))
+    _add_rollups(
+      Character.objects, apps.get_model('gcd', 'CharacterSeriesRollup'),
+      Series.objects, {'issue__story__type__id__in': CORE_TYPES,
+                       'issue__story__appearing_characters__deleted': False},
+      'issue__story__appearing_characters__character__character',
+      series_dates)
+    _add_rollups(
+      Group.objects, apps.get_model('gcd', 'GroupSeriesRollup'),
+      Series.objects, {'issue__story__type__id__in': CORE_TYPES,
+                       'issue__story__appearing_groups__deleted': False},
+      'issue__story__appearing_groups__group_name__group',
+      series_dates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcd', '0072_creator_collaboration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CharacterSeriesRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue_count', models.PositiveIntegerField(default=0)),
+                ('first_key_date', models.CharField(max_length=10)),
+                ('last_key_date', models.CharField(max_length=10)),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_rollups', to='gcd.character')),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='character_rollups', to='gcd.series')),
+            ],
+            options={
+                'db_table': 'gcd_character_series_rollup',
+                'unique_together': {('character', 'series')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CreatorFeatureRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue_count', models.PositiveIntegerField(default=0)),
+                ('first_key_date', models.CharField(max_length=10)),
+                ('last_key_date', models.CharField(max_length=10)),
+                ('script', models.PositiveIntegerField(default=0)),
+                ('pencils', models.PositiveIntegerField(default=0)),
+                ('inks', models.PositiveIntegerField(default=0)),
+                ('colors', models.PositiveIntegerField(default=0)),
+                ('letters', models.PositiveIntegerField(default=0)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_rollups', to='gcd.creator')),
+                ('feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='creator_rollups', to='gcd.feature')),
+            ],
+            options={
+                'db_table': 'gcd_creator_feature_rollup',
+                'unique_together': {('creator', 'feature')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CreatorSeriesRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue_count', models.PositiveIntegerField(default=0)),
+                ('first_key_date', models.CharField(max_length=10)),
+                ('last_key_date', models.CharField(max_length=10)),
+                ('script', models.PositiveIntegerField(default=0)),
+                ('pencils', models.PositiveIntegerField(default=0)),
+                ('inks', models.PositiveIntegerField(default=0)),
+                ('colors', models.PositiveIntegerField(default=0)),
+                ('letters', models.PositiveIntegerField(default=0)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_rollups', to='gcd.creator')),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='creator_rollups', to='gcd.series')),
+            ],
+            options={
+                'db_table': 'gcd_creator_series_rollup',
+                'unique_together': {('creator', 'series')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupSeriesRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue_count', models.PositiveIntegerField(default=0)),
+                ('first_key_date', models.CharField(max_length=10)),
+                ('last_key_date', models.CharField(max_length=10)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_rollups', to='gcd.group')),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_rollups', to='gcd.series')),
+            ],
+            options={
+                'db_table': 'gcd_group_series_rollup',
+                'unique_together': {('group', 'series')},
+            },
+        ),
+        migrations.RunPython(add_rollups,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.gcd.models.series import prev_next_issue_ids
+
+BATCH_SIZE = 1000
+
+
+def set_prev_next_issues(apps, schema_editor):
+    Issue = apps.get_model('gcd', 'Issue')
+    issues = Issue.objects.exclude(deleted=True)
+    last_id = issues.aggregate(models.Max('series_id'))['series_id__max']
+    for start in range(0, (last_id or 0) + 1, BATCH_SIZE):
+        series_issues = {}
+        for issue in issues.filter(series_id__gte=start,
+                                   series_id__lt=start + BATCH_SIZE)\
+                           .values_list('series_id', 'id', 'sort_code',
+                                        'variant_of_id',
+                                        'variant_of__series_id'):
+            series_issues.setdefault(issue[0], []).append(issue[1:])
+        changed = []
+        for series_id, values in series_issues.items():
+            for issue_id, (prev_id, next_id) in \
+              prev_next_issue_ids(series_id, values).items():
+                if prev_id or next_id:
+                    changed.append(Issue(id=issue_id, prev_issue_id=prev_id,
+                                         next_issue_id=next_id))
+        Issue.objects.bulk_update(changed, ['prev_issue', 'next_issue'],
+                                  batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcd', '0073_series_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='next_issue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gcd.issue'),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='prev_issue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gcd.issue'),
+        ),
+        migrations.RunPython(set_prev_next_issues,
+                             migrations.RunPython.noop),
+    ]
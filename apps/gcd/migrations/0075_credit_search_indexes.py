@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcd', '0074_issue_prev_next'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issuecredit',
+            index=models.Index(fields=['creator', 'credit_type', 'deleted', 'issue'], name='gcd_issue_c_creator_b44407_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storycredit',
+            index=models.Index(fields=['creator', 'credit_type', 'deleted', 'story'], name='gcd_story_c_creator_a1f0ce_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+from apps.gcd.models.issue import parse_issue_date
+
+RANGE_SIZE = 1000
+
+
+def set_date_values(apps, schema_editor):
+    Issue = apps.get_model('gcd', 'Issue')
+    last_id = Issue.objects.aggregate(models.Max('id'))['id__max'] or 0
+    for start in range(1, last_id + 1, RANGE_SIZE):
+        issues = Issue.objects.filter(id__gte=start, id__lt=start + RANGE_SIZE)
+        issues = issues.only('id', 'key_date', 'on_sale_date')
+        changed = []
+        for issue in issues:
+            issue.key_date_value, issue.key_date_precision = \
+              parse_issue_date(issue.key_date)
+            issue.on_sale_date_value, issue.on_sale_date_precision = \
+              parse_issue_date(issue.on_sale_date)
+            if issue.key_date_value or issue.on_sale_date_value:
+                changed.append(issue)
+        Issue.objects.bulk_update(changed, [
+          'key_date_value', 'key_date_precision',
+          'on_sale_date_value', 'on_sale_date_precision'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcd', '0075_credit_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='key_date_precision',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='key_date_value',
+            field=models.DateField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='on_sale_date_precision',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='on_sale_date_value',
+            field=models.DateField(db_index=True, null=True),
+        ),
+        migrations.RunPython(set_date_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcd', '0076_issue_date_values'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='series',
+            name='issue_columns',
+            field=models.PositiveSmallIntegerField(default=None, null=True),
+        ),
+    ]
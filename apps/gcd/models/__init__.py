@@ -32,7 +32,10 @@ from .creator import CreatorArtInfluence, Creator, CreatorDegree, \
                     CreatorNameDetail, CreatorSignature, CreatorSchool,\
                     Degree, CreatorMembership, CreatorRelation, NameType, \
                     CreatorNonComicWork, NonComicWorkType, NonComicWorkRole, \
-                    NonComicWorkYear, RelationType, School, MembershipType
+                    NonComicWorkYear, RelationType, School, MembershipType, \
+                    CreatorCollaboration
+from .rollup import CreatorSeriesRollup, CreatorFeatureRollup, \
+                    CharacterSeriesRollup, GroupSeriesRollup
 from .award import Award, ReceivedAward
 from .datasource import DataSource, SourceType, ExternalSite, ExternalLink
 
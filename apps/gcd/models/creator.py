@@ -1,6 +1,7 @@
 import calendar
 import django.urls as urlresolvers
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Min, Q, Value, When
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericRelation
 from django.utils.safestring import mark_safe
@@ -1080,6 +1081,123 @@ class NonComicWorkYear(models.Model):
                             str(self.work_year))
 
 
+# credit types counted for collaborations: script, pencils, inks, colors,
+# letters
+COLLABORATION_ROLES = ('script', 'pencils', 'inks', 'colors', 'letters')
+
+
+def co_creators(story_ids, creator):
+    """
+    The creators with credits on the stories, besides the creator, each
+    annotated with the number of issues overall and per role, and the
+    key date of the first one.
+    """
+    creators = Creator.objects.filter(
+      creator_names__storycredit__story__id__in=story_ids,
+      creator_names__storycredit__deleted=False,
+      creator_names__storycredit__credit_type__id__lt=6).exclude(id=creator.id)
+    creators = creators.annotate(
+      issue_count=Count("creator_names__storycredit__story__issue",
+                        distinct=True))
+    creators = creators.annotate(first_credit=Min(
+      Case(When(creator_names__storycredit__story__issue__key_date="",
+                then=Value("9999-99-99"),
+                ),
+           default=F("creator_names__storycredit__story__issue__key_date"),
+           )))
+
+    target = 'creator_names__storycredit__credit_type__id'
+    roles = {role: Count('creator_names__storycredit__story__issue',
+                         filter=Q(**{target: credit_type}),
+                         distinct=True)
+             for credit_type, role in enumerate(COLLABORATION_ROLES, 1)}
+    return creators.annotate(**roles)
+
+
+def update_collaborations(creator, co_creator_ids=None):
+    """
+    Recompute the collaborations of the creator, with the given co-creators
+    or with all of them.  The stories of the creator are those of its own
+    names, of the core story types.
+    """
+    from .story import Story, CORE_TYPES
+
+    names = creator.creator_names.filter(deleted=False)
+    story_ids = Story.objects.filter(credits__creator__in=names,
+                                     type__id__in=CORE_TYPES,
+                                     credits__credit_type__id__lt=6,
+                                     credits__deleted=False) \
+                             .distinct().values_list('id', flat=True)
+    collaborators = co_creators(story_ids, creator)
+    collaborations = creator.collaborations.all()
+    if co_creator_ids is not None:
+        collaborators = collaborators.filter(id__in=co_creator_ids)
+        collaborations = collaborations.filter(
+          co_creator_id__in=co_creator_ids)
+
+    rows = [CreatorCollaboration(
+              creator=creator, co_creator_id=co_creator.id,
+              issue_count=co_creator.issue_count,
+              first_credit=co_creator.first_credit,
+              **{role: getattr(co_creator, role)
+                 for role in COLLABORATION_ROLES})
+            for co_creator in collaborators.order_by()]
+    with transaction.atomic():
+        collaborations.delete()
+        CreatorCollaboration.objects.bulk_create(rows)
+
+
+def update_collaborations_between(creator_ids):
+    """
+    Recompute the collaborations among the creators, e.g. the ones of a
+    story after a change of its credits.
+    """
+    for creator in Creator.objects.filter(id__in=creator_ids):
+        update_collaborations(creator, creator_ids)
+
+
+def update_story_collaborations(story_ids, creator_ids=()):
+    """
+    Recompute the collaborations among the creators of the stories and the
+    given creators, e.g. the ones replaced in the credits of the stories.
+    """
+    from .story import StoryCredit
+
+    creator_ids = set(creator_ids) | set(
+      StoryCredit.objects.filter(story_id__in=story_ids)
+                         .values_list('creator__creator_id', flat=True))
+    update_collaborations_between(creator_ids)
+
+
+class CreatorCollaboration(models.Model):
+    """
+    Creators who worked on the same stories, with the number of issues and
+    the roles of the co-creator.  The rows are kept up to date when story
+    credits are committed, scripts/creator_collaborations.py rebuilds them.
+    """
+
+    class Meta:
+        db_table = 'gcd_creator_collaboration'
+        app_label = 'gcd'
+        unique_together = ('creator', 'co_creator')
+
+    creator = models.ForeignKey(Creator, on_delete=models.CASCADE,
+                                related_name='collaborations')
+    co_creator = models.ForeignKey(Creator, on_delete=models.CASCADE,
+                                   related_name='co_creator_collaborations')
+    issue_count = models.PositiveIntegerField(default=0)
+    script = models.PositiveIntegerField(default=0)
+    pencils = models.PositiveIntegerField(default=0)
+    inks = models.PositiveIntegerField(default=0)
+    colors = models.PositiveIntegerField(default=0)
+    letters = models.PositiveIntegerField(default=0)
+    # key date of the first issue, '9999-99-99' if none has one
+    first_credit = models.CharField(max_length=10)
+
+    def __str__(self):
+        return '%s - %s' % (self.creator, self.co_creator)
+
+
 class CreatorBaseTable(tables.Table):
     creator = tables.Column(accessor='gcd_official_name',
                             verbose_name='Creator Name')
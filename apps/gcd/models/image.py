@@ -1,4 +1,7 @@
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from django.db import models
 from django.conf import settings
@@ -41,18 +44,66 @@ class CreatorCropToFace(ImageSpec):
 register.generator('creator:portrait_face', CreatorCropToFace)
 
 
+# Loading the face detection model from disk is much more expensive than the
+# detection itself, therefore idle detectors are kept per process, keyed on
+# the input size they are set up for.
+FACE_DETECTOR_POOL_SIZE = 8
+_face_detectors = OrderedDict()
+_face_detectors_lock = threading.Lock()
+
+
+def _create_face_detector(input_size):
+    model_location = \
+        settings.STATICFILES_DIRS[0] + '/face_detection_yunet_2023mar.onnx'
+    return FaceDetectorYN_create(model_location, "",
+                                 input_size, score_threshold=0.5)
+
+
+@contextmanager
+def face_detector(input_size):
+    """
+    Provides a face detector for images of input_size for exclusive use.
+    An idle detector for the same size is used if available, otherwise the
+    least recently used idle one is set up for the size, and only if there
+    is none the model is loaded.
+    """
+    with _face_detectors_lock:
+        if input_size in _face_detectors:
+            key = input_size
+        else:
+            key = next(iter(_face_detectors), None)
+        detector = None
+        if key is not None:
+            detector = _face_detectors[key].pop()
+            if not _face_detectors[key]:
+                del _face_detectors[key]
+    if detector is None:
+        detector = _create_face_detector(input_size)
+    elif key != input_size:
+        detector.setInputSize(input_size)
+    try:
+        yield detector
+    finally:
+        with _face_detectors_lock:
+            _face_detectors.setdefault(input_size, []).append(detector)
+            _face_detectors.move_to_end(input_size)
+            idle = sum(len(detectors) for detectors in
+                       _face_detectors.values())
+            if idle > FACE_DETECTOR_POOL_SIZE:
+                oldest = next(iter(_face_detectors))
+                _face_detectors[oldest].pop(0)
+                if not _face_detectors[oldest]:
+                    del _face_detectors[oldest]
+
+
 class CropToFace(object):
     def process(self, image):
         image = convert_from_image_to_cv2(image)
         while image.shape[0] > 2000 or image.shape[1] > 2000:
             size = (int(image.shape[1]/2), int(image.shape[0]/2))
             image = resize(image, size, interpolation=INTER_CUBIC)
-        model_location = \
-            settings.STATICFILES_DIRS[0] + '/face_detection_yunet_2023mar.onnx'
-        yunet = FaceDetectorYN_create(model_location, "",
-                                      (300, 300), score_threshold=0.5)
-        yunet.setInputSize((image.shape[1], image.shape[0]))
-        _, faces = yunet.detect(image)  # faces: None, or nx15 np.array
+        with face_detector((image.shape[1], image.shape[0])) as yunet:
+            _, faces = yunet.detect(image)  # faces: None, or nx15 np.array
         if faces is not None:
             x, y, w, h = faces[0][0:4].astype(int)
             if w < h:
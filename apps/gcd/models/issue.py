@@ -6,8 +6,9 @@ from decimal import Decimal
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericRelation
 from django.db import models
-from django.db.models import Sum, Value
+from django.db.models import Sum, Count, Q, Value
 from django.db.models.functions import NullIf
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape as esc
 import django.urls as urlresolvers
@@ -21,7 +22,8 @@ from taggit.managers import TaggableManager
 from .gcddata import GcdData
 from .publisher import IndiciaPublisher, Brand, IndiciaPrinter
 from .image import Image
-from .story import StoryType, STORY_TYPES, AD_TYPES, CreditType
+from .story import Story, STORY_TYPES, AD_TYPES, CreditType, \
+                   annotate_ui_checks
 from .creator import CreatorNameDetail
 from .award import ReceivedAward
 from .datasource import ExternalLink
@@ -47,6 +49,34 @@ VARIANT_COVER_STATUS = {
 }
 
 
+# Precision of the date columns for key_date and on_sale_date, which hold
+# the first day of the known period.
+DATE_PRECISION_NONE = 0
+DATE_PRECISION_YEAR = 1
+DATE_PRECISION_MONTH = 2
+DATE_PRECISION_DAY = 3
+
+
+def parse_issue_date(issue_date):
+    """
+    The date and its precision for a key date or an on-sale date, i.e.
+    YYYY-MM-DD with unknown parts as 00 or ?, on-sale dates also without
+    the day or the month.
+    """
+    year, month, day = (issue_date.split('-') + ['', ''])[:3]
+    if not year.isdigit() or int(year) == 0:
+        return None, DATE_PRECISION_NONE
+    if not month.isdigit() or int(month) == 0:
+        return date(int(year), 1, 1), DATE_PRECISION_YEAR
+    month = min(int(month), 12)
+    if day.isdigit() and int(day):
+        try:
+            return date(int(year), month, int(day)), DATE_PRECISION_DAY
+        except ValueError:
+            pass
+    return date(int(year), month, 1), DATE_PRECISION_MONTH
+
+
 class VCS_Codes(models.IntegerChoices):
     NO_DIFFERENCE = 1
     ONLY_SCAN_DIFFERENCE = 2
@@ -100,6 +130,9 @@ class IssueCredit(GcdData):
     class Meta:
         app_label = 'gcd'
         db_table = 'gcd_issue_credit'
+        # for the semi-join of the linked credit search
+        indexes = [models.Index(fields=['creator', 'credit_type', 'deleted',
+                                        'issue'])]
 
     creator = models.ForeignKey(CreatorNameDetail, on_delete=models.CASCADE)
     credit_type = models.ForeignKey(CreditType, on_delete=models.CASCADE)
@@ -155,7 +188,19 @@ class Issue(GcdData):
     key_date = models.CharField(max_length=10, db_index=True)
     on_sale_date = models.CharField(max_length=10, db_index=True)
     on_sale_date_uncertain = models.BooleanField(default=False)
+    # the dates as date columns for range scans, set on save
+    key_date_value = models.DateField(null=True, db_index=True)
+    key_date_precision = models.PositiveSmallIntegerField(
+      default=DATE_PRECISION_NONE)
+    on_sale_date_value = models.DateField(null=True, db_index=True)
+    on_sale_date_precision = models.PositiveSmallIntegerField(
+      default=DATE_PRECISION_NONE)
     sort_code = models.IntegerField(db_index=True)
+    # the neighbours on the issue pages, see Series.set_prev_next_issues
+    prev_issue = models.ForeignKey('self', on_delete=models.SET_NULL,
+                                   null=True, related_name='+')
+    next_issue = models.ForeignKey('self', on_delete=models.SET_NULL,
+                                   null=True, related_name='+')
     indicia_frequency = models.CharField(max_length=255)
     no_indicia_frequency = models.BooleanField(default=False, db_index=True)
 
@@ -193,6 +238,22 @@ class Issue(GcdData):
     # is very small.  But syncdb produces an int(11).
     is_indexed = models.IntegerField(default=0, db_index=True)
 
+    def set_date_values(self):
+        self.key_date_value, self.key_date_precision = \
+          parse_issue_date(self.key_date)
+        self.on_sale_date_value, self.on_sale_date_precision = \
+          parse_issue_date(self.on_sale_date)
+
+    def save(self, *args, **kwargs):
+        self.set_date_values()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and \
+           {'key_date', 'on_sale_date'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {
+              'key_date_value', 'key_date_precision',
+              'on_sale_date_value', 'on_sale_date_precision'}
+        super(Issue, self).save(*args, **kwargs)
+
     @property
     def indicia_image(self):
         img = Image.objects.filter(
@@ -282,14 +343,14 @@ class Issue(GcdData):
             stories_from = self.variant_of
         else:
             stories_from = self
-        stories = list(stories_from.active_stories()
-                                   .order_by('sequence_number')
-                                   .select_related('type', 'migration_status')
-                                   .prefetch_related(
-                                     'feature_name',
-                                     'feature_logo__feature',
-                                     'credits__creator__creator',
-                                     'credits__creator__type'))
+        stories = stories_from.active_stories()\
+                              .order_by('sequence_number')\
+                              .select_related('type', 'migration_status')\
+                              .prefetch_related('feature_name',
+                                                'feature_logo__feature',
+                                                'credits__creator__creator',
+                                                'credits__creator__type')
+        stories = list(annotate_ui_checks(stories))
         cover_story = None
         if self.series.is_comics_publication or (
           self.series.has_about_comics is True and
@@ -420,7 +481,10 @@ class Issue(GcdData):
         return [prev_issue, next_issue]
 
     def get_prev_next_issue(self):
-        return self._get_prev_next_issue()
+        # the stored neighbours are only kept for active issues
+        if self.deleted:
+            return self._get_prev_next_issue()
+        return [self.prev_issue, self.next_issue]
 
     def has_reprints(self, ignore=STORY_TYPES['preview']):
         """Simplifies UI checks for conditionals, notes and reprint fields"""
@@ -469,65 +533,20 @@ class Issue(GcdData):
         CountStats and set them directly due to circular dependencies.
         """
         was_indexed = self.is_indexed
+        set_indexed_statuses([self])
+        return self.index_delta(was_indexed)
 
-        if not self.variant_of:
-            is_indexed = INDEXED['skeleton']
-            if Decimal(self.page_count or 0) > 0:
-                # ads and blank
-                FILTER_TYPES = AD_TYPES + [24]
-                total_count = self.active_stories()\
-                                  .exclude(type__id__in=FILTER_TYPES)\
-                                  .aggregate(Sum('page_count'))[
-                                    'page_count__sum']
-                if total_count is None:
-                    total_count = 0
-                ad_count = self.active_stories()\
-                               .filter(type__id__in=FILTER_TYPES)\
-                               .aggregate(Sum('page_count'))['page_count__sum']
-                if ad_count is None:
-                    ad_count = 0
-                if (total_count > 0 and
-                        total_count >= Decimal('0.4') * self.page_count):
-                    is_indexed = INDEXED['full']
-                elif (total_count > 0 and
-                      total_count >= Decimal('0.5') * (self.page_count
-                                                       - ad_count)):
-                    is_indexed = INDEXED['full']
-                elif (total_count > 0 and
-                        total_count >= Decimal('0.1') * (self.page_count
-                                                         - ad_count)):
-                    is_indexed = INDEXED['ten_percent']
-
-            if is_indexed not in [INDEXED['full'], INDEXED['ten_percent']]:
-                if self.active_stories()\
-                       .filter(type=StoryType.objects.get(name='comic story'))\
-                       .exists():
-                    is_indexed = INDEXED['partial']
-                elif self.active_stories()\
-                         .exists():
-                    is_indexed = INDEXED['some_data']
-                elif self.has_reprints():
-                    is_indexed = INDEXED['some_data']
-            if is_indexed == INDEXED['full']:
-                if self.page_count_uncertain or self.active_stories()\
-                       .filter(page_count_uncertain=True).exists():
-                    is_indexed = INDEXED['partial']
-
-            if self.is_indexed != is_indexed:
-                self.is_indexed = is_indexed
-                self.save()
-                if self.active_variants():
-                    for variant in self.active_variants():
-                        variant.is_indexed = is_indexed
-                        variant.save()
-
-        index_delta = 0
+    def index_delta(self, was_indexed):
+        """
+        The "issue indexes" stat change value of a change of the index
+        status from was_indexed.
+        """
         if self.series.is_comics_publication:
             if not was_indexed and self.is_indexed:
-                index_delta = 1
+                return 1
             elif was_indexed and not self.is_indexed:
-                index_delta = -1
-        return index_delta
+                return -1
+        return 0
 
     _update_stats = True
 
@@ -700,32 +719,132 @@ class Issue(GcdData):
             return '%s %s' % (self.series, self.display_number)
 
 
+def _indexed_status(issue, stories, reprinted):
+    is_indexed = INDEXED['skeleton']
+    if Decimal(issue.page_count or 0) > 0:
+        total_count = stories.get('total_count') or 0
+        ad_count = stories.get('ad_count') or 0
+        if (total_count > 0 and
+                total_count >= Decimal('0.4') * issue.page_count):
+            is_indexed = INDEXED['full']
+        elif (total_count > 0 and
+              total_count >= Decimal('0.5') * (issue.page_count - ad_count)):
+            is_indexed = INDEXED['full']
+        elif (total_count > 0 and
+              total_count >= Decimal('0.1') * (issue.page_count - ad_count)):
+            is_indexed = INDEXED['ten_percent']
+
+    if is_indexed not in [INDEXED['full'], INDEXED['ten_percent']]:
+        if stories.get('comic_stories'):
+            is_indexed = INDEXED['partial']
+        elif stories.get('stories'):
+            is_indexed = INDEXED['some_data']
+        elif issue.id in reprinted:
+            is_indexed = INDEXED['some_data']
+    if is_indexed == INDEXED['full']:
+        if issue.page_count_uncertain or stories.get('uncertain_stories'):
+            is_indexed = INDEXED['partial']
+    return is_indexed
+
+
+def set_indexed_statuses(issues, save=True):
+    """
+    Sets the index status of the base issues among the issues, using a
+    fixed number of queries for their stories and reprints.  Returns the
+    issues with a changed status, which are only saved together with their
+    active variants if save is set.
+    """
+    from .reprint import Reprint
+
+    issues = [issue for issue in issues if not issue.variant_of_id]
+    if not issues:
+        return []
+    issue_ids = [issue.id for issue in issues]
+
+    # ads and blank
+    filter_types = AD_TYPES + [24]
+    stories = {
+      row['issue_id']: row for row in
+      Story.objects.filter(issue_id__in=issue_ids, deleted=False)
+                   .values('issue_id').order_by()
+                   .annotate(
+                     total_count=Sum('page_count',
+                                     filter=~Q(type_id__in=filter_types)),
+                     ad_count=Sum('page_count',
+                                  filter=Q(type_id__in=filter_types)),
+                     comic_stories=Count(
+                       'id', filter=Q(type_id=STORY_TYPES['comic story'])),
+                     uncertain_stories=Count(
+                       'id', filter=Q(page_count_uncertain=True)),
+                     stories=Count('id'))}
+
+    # reprints only matter for issues without stories
+    without_stories = [issue_id for issue_id in issue_ids
+                       if issue_id not in stories]
+    reprinted = set()
+    if without_stories:
+        reprinted.update(
+          Reprint.objects.filter(target_issue_id__in=without_stories,
+                                 target=None)
+                         .values_list('target_issue_id', flat=True))
+        reprinted.update(
+          Reprint.objects.filter(origin_issue_id__in=without_stories,
+                                 origin=None)
+                         .exclude(target__type__id=STORY_TYPES['preview'])
+                         .values_list('origin_issue_id', flat=True))
+
+    changed = []
+    for issue in issues:
+        is_indexed = _indexed_status(issue, stories.get(issue.id, {}),
+                                     reprinted)
+        if issue.is_indexed != is_indexed:
+            issue.is_indexed = is_indexed
+            changed.append(issue)
+
+    if save and changed:
+        # bulk updates skip auto_now, the delta dumps and the search index
+        # updates select the changed issues by their modified time
+        modified = timezone.now()
+        for issue in changed:
+            issue.modified = modified
+        Issue.objects.bulk_update(changed, ['is_indexed', 'modified'])
+        by_status = {}
+        for issue in changed:
+            by_status.setdefault(issue.is_indexed, []).append(issue.id)
+        for is_indexed, base_ids in by_status.items():
+            Issue.objects.filter(variant_of_id__in=base_ids, deleted=False)\
+                         .update(is_indexed=is_indexed, modified=modified)
+    return changed
+
+
 def issues_for_iso_week(year, week):
     """
     Return a queryset of non-deleted Issues whose on_sale_date falls within
-    the given ISO 8601 week (Monday–Sunday).
-
-    Handles weeks that straddle a month boundary by splitting the filter
-    into two ranges, avoiding partial on_sale_date strings being excluded.
+    the given ISO 8601 week (Monday–Sunday), as a range on the date column.
     """
     # Gregorian calendar date of the first day of the given ISO year
     fourth_jan = date(year, 1, 4)
     year_start = fourth_jan - timedelta(fourth_jan.isoweekday() - 1)
     monday = year_start + timedelta(weeks=week - 1)
     sunday = monday + timedelta(days=6)
-    if monday.month != sunday.month:
-        endday = monday.replace(day=monthrange(monday.year, monday.month)[1])
-        qs = Issue.objects.filter(on_sale_date__gte=monday.isoformat(),
-                                  on_sale_date__lte=endday.isoformat())
-        startday = sunday.replace(day=1)
-        qs = qs | Issue.objects.filter(on_sale_date__gte=startday.isoformat(),
-                                       on_sale_date__lte=sunday.isoformat())
-    else:
-        qs = Issue.objects.filter(on_sale_date__gte=monday.isoformat(),
-                                  on_sale_date__lte=sunday.isoformat())
+    qs = Issue.objects.filter(on_sale_date_value__range=(monday, sunday),
+                              on_sale_date_precision=DATE_PRECISION_DAY)
     return qs.filter(deleted=False), monday, sunday
 
 
+def issues_for_month(year, month):
+    """
+    Return a queryset of non-deleted Issues whose on_sale_date falls within
+    the given month, including the ones without a day.
+    """
+    first_day = date(year, month, 1)
+    last_day = first_day.replace(day=monthrange(year, month)[1])
+    return Issue.objects.filter(
+      on_sale_date_value__range=(first_day, last_day),
+      on_sale_date_precision__gte=DATE_PRECISION_MONTH,
+      deleted=False)
+
+
 ##############################################################################
 # Tables with Sorting
 ##############################################################################
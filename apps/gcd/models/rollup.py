@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Rollups of the series and features a creator, character or group appears
+in, with the number of issues and the first and last key date.  They
+replace the distinct counts over stories, credits and appearances of the
+respective lists, the rows are kept up to date when story revisions are
+committed, see apps.gcd.derived_updates, scripts/series_rollups.py
+reconciles them.
+"""
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Value, When
+
+from .series import Series
+from .feature import Feature
+from .creator import Creator, COLLABORATION_ROLES
+from .character import Character, Group
+from .story import Story, CORE_TYPES
+
+
+class Rollup(models.Model):
+    class Meta:
+        abstract = True
+
+    issue_count = models.PositiveIntegerField(default=0)
+    first_key_date = models.CharField(max_length=10)
+    last_key_date = models.CharField(max_length=10)
+
+
+class CreditRollup(Rollup):
+    class Meta:
+        abstract = True
+
+    script = models.PositiveIntegerField(default=0)
+    pencils = models.PositiveIntegerField(default=0)
+    inks = models.PositiveIntegerField(default=0)
+    colors = models.PositiveIntegerField(default=0)
+    letters = models.PositiveIntegerField(default=0)
+
+
+class CreatorSeriesRollup(CreditRollup):
+    """
+    The series with credits of the own names of a creator in core stories.
+    """
+    class Meta:
+        db_table = 'gcd_creator_series_rollup'
+        app_label = 'gcd'
+        unique_together = ('creator', 'series')
+
+    creator = models.ForeignKey(Creator, on_delete=models.CASCADE,
+                                related_name='series_rollups')
+    series = models.ForeignKey(Series, on_delete=models.CASCADE,
+                               related_name='creator_rollups')
+
+    def __str__(self):
+        return '%s - %s' % (self.creator, self.series)
+
+
+class CreatorFeatureRollup(CreditRollup):
+    """
+    The features with credits of the own names of a creator.  As in the
+    feature list of a creator the first key date is '9999-99-99' if none
+    of the issues has one.
+    """
+    class Meta:
+        db_table = 'gcd_creator_feature_rollup'
+        app_label = 'gcd'
+        unique_together = ('creator', 'feature')
+
+    creator = models.ForeignKey(Creator, on_delete=models.CASCADE,
+                                related_name='feature_rollups')
+    feature = models.ForeignKey(Feature, on_delete=models.CASCADE,
+                                related_name='creator_rollups')
+
+    def __str__(self):
+        return '%s - %s' % (self.creator, self.feature)
+
+
+class CharacterSeriesRollup(Rollup):
+    """
+    The series with appearances of a character in core stories.
+    """
+    class Meta:
+        db_table = 'gcd_character_series_rollup'
+        app_label = 'gcd'
+        unique_together = ('character', 'series')
+
+    character = models.ForeignKey(Character, on_delete=models.CASCADE,
+                                  related_name='series_rollups')
+    series = models.ForeignKey(Series, on_delete=models.CASCADE,
+                               related_name='character_rollups')
+
+    def __str__(self):
+        return '%s - %s' % (self.character, self.series)
+
+
+class GroupSeriesRollup(Rollup):
+    """
+    The series with appearances of a group in core stories.
+    """
+    class Meta:
+        db_table = 'gcd_group_series_rollup'
+        app_label = 'gcd'
+        unique_together = ('group', 'series')
+
+    group = models.ForeignKey(Group, on_delete=models.CASCADE,
+                              related_name='series_rollups')
+    series = models.ForeignKey(Series, on_delete=models.CASCADE,
+                               related_name='group_rollups')
+
+    def __str__(self):
+        return '%s - %s' % (self.group, self.series)
+
+
+def _role_counts(issue, credit_type):
+    return {role: Count(issue, filter=Q(**{credit_type: number}),
+                        distinct=True)
+            for number, role in enumerate(COLLABORATION_ROLES, 1)}
+
+
+def _sync_rollups(rollups, key, rows, **owner):
+    """
+    Bring the rollups of the owner, restricted to the keys to be recomputed,
+    in line with the computed rows, which are dicts with the key and the
+    values.  Only differing rows are written, returns their number.
+    """
+    current = {getattr(rollup, key): rollup for rollup in rollups}
+    model = rollups.model
+    fields = [field.name for field in model._meta.get_fields()
+              if field.concrete and not field.is_relation and
+              not field.primary_key]
+    stale = []
+    created = []
+    for row in rows:
+        rollup = current.pop(row[key], None)
+        if rollup is None:
+            created.append(model(**owner, **{key: row[key]},
+                                 **{field: row[field] for field in fields}))
+        elif any(getattr(rollup, field) != row[field] for field in fields):
+            for field in fields:
+                setattr(rollup, field, row[field])
+            stale.append(rollup)
+
+    with transaction.atomic():
+        if current:
+            model.objects.filter(id__in=[rollup.id
+                                         for rollup in current.values()])\
+                         .delete()
+        model.objects.bulk_update(stale, fields)
+        model.objects.bulk_create(created)
+    return len(current) + len(stale) + len(created)
+
+
+def update_creator_rollups(creator, series_ids=None, feature_ids=None):
+    """
+    Recompute the series and feature rollups of the creator, for the given
+    series and features or for all of them.  Returns the number of changed
+    rows.
+    """
+    names = creator.creator_names.filter(deleted=False)
+
+    series = Series.objects.filter(
+      issue__story__credits__creator__in=names,
+      issue__story__type__id__in=CORE_TYPES,
+      issue__story__credits__deleted=False,
+      issue__story__credits__credit_type__id__lt=6)
+    series_rollups = creator.series_rollups.all()
+    if series_ids is not None:
+        series = series.filter(id__in=series_ids)
+        series_rollups = series_rollups.filter(series_id__in=series_ids)
+    series = series.values('id').order_by().annotate(
+      issue_count=Count('issue', distinct=True),
+      first_key_date=Min('issue__key_date'),
+      last_key_date=Max('issue__key_date'),
+      **_role_counts('issue', 'issue__story__credits__credit_type__id'))
+    changed = _sync_rollups(series_rollups, 'series_id',
+                            [dict(row, series_id=row['id'])
+                             for row in series], creator=creator)
+
+    features = Feature.objects.filter(story__credits__creator__in=names,
+                                      story__credits__deleted=False)
+    feature_rollups = creator.feature_rollups.all()
+    if feature_ids is not None:
+        features = features.filter(id__in=feature_ids)
+        feature_rollups = feature_rollups.filter(feature_id__in=feature_ids)
+    features = features.values('id').order_by().annotate(
+      issue_count=Count('story__issue', distinct=True),
+      first_key_date=Min(Case(When(story__issue__key_date='',
+                                   then=Value('9999-99-99')),
+                              default=F('story__issue__key_date'))),
+      last_key_date=Max('story__issue__key_date'),
+      **_role_counts('story__issue', 'story__credits__credit_type__id'))
+    changed += _sync_rollups(feature_rollups, 'feature_id',
+                             [dict(row, feature_id=row['id'])
+                              for row in features], creator=creator)
+    return changed
+
+
+def update_character_rollups(character, series_ids=None):
+    """
+    Recompute the series rollups of the character, for the given series or
+    for all of them.  Returns the number of changed rows.
+    """
+    series = Series.objects.filter(
+      issue__story__appearing_characters__character__character=character,
+      issue__story__appearing_characters__deleted=False,
+      issue__story__type__id__in=CORE_TYPES)
+    rollups = character.series_rollups.all()
+    if series_ids is not None:
+        series = series.filter(id__in=series_ids)
+        rollups = rollups.filter(series_id__in=series_ids)
+    series = series.values('id').order_by().annotate(
+      issue_count=Count('issue', distinct=True),
+      first_key_date=Min('issue__key_date'),
+      last_key_date=Max('issue__key_date'))
+    return _sync_rollups(rollups, 'series_id',
+                         [dict(row, series_id=row['id']) for row in series],
+                         character=character)
+
+
+def update_group_rollups(group, series_ids=None):
+    """
+    Recompute the series rollups of the group, for the given series or for
+    all of them.  Returns the number of changed rows.
+    """
+    series = Series.objects.filter(
+      issue__story__appearing_groups__group_name__group=group,
+      issue__story__appearing_groups__deleted=False,
+      issue__story__type__id__in=CORE_TYPES)
+    rollups = group.series_rollups.all()
+    if series_ids is not None:
+        series = series.filter(id__in=series_ids)
+        rollups = rollups.filter(series_id__in=series_ids)
+    series = series.values('id').order_by().annotate(
+      issue_count=Count('issue', distinct=True),
+      first_key_date=Min('issue__key_date'),
+      last_key_date=Max('issue__key_date'))
+    return _sync_rollups(rollups, 'series_id',
+                         [dict(row, series_id=row['id']) for row in series],
+                         group=group)
+
+
+def update_story_rollups(story_ids, creator_ids=None, character_ids=None,
+                         group_ids=None, series_ids=(), feature_ids=(),
+                         owner_story_ids=()):
+    """
+    Recompute the rollups affected by changes to the stories, restricted to
+    their series and features plus the given ones, e.g. from before a
+    story moved.  For creators, characters or groups which are None the
+    ones of the stories are taken, otherwise the given ones together with
+    the ones of the owner_story_ids, which need to be among the stories.
+    """
+    stories = Story.objects.filter(id__in=story_ids)
+    owner_stories = Story.objects.filter(id__in=owner_story_ids)
+    series_ids = set(series_ids) | set(
+      stories.values_list('issue__series_id', flat=True))
+    feature_ids = set(feature_ids) | set(
+      stories.filter(feature_object__isnull=False)
+             .values_list('feature_object', flat=True))
+
+    def owner_ids(ids, field):
+        if ids is None:
+            return set(stories.values_list(field, flat=True))
+        if owner_story_ids:
+            return set(ids) | set(owner_stories.values_list(field, flat=True))
+        return set(ids)
+
+    creator_ids = owner_ids(creator_ids, 'credits__creator__creator_id')
+    character_ids = owner_ids(character_ids,
+                              'appearing_characters__character__character_id')
+    group_ids = owner_ids(group_ids, 'appearing_groups__group_name__group_id')
+
+    for creator in Creator.objects.filter(id__in=creator_ids):
+        update_creator_rollups(creator, series_ids, feature_ids)
+    for character in Character.objects.filter(id__in=character_ids):
+        update_character_rollups(character, series_ids)
+    for group in Group.objects.filter(id__in=group_ids):
+        update_group_rollups(group, series_ids)
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 
+from bisect import bisect_left, bisect_right
+
 from django.db import models
 from django.contrib.contenttypes.fields import GenericRelation
 import django.urls as urlresolvers
-from django.db.models import Count, Case, When, F, Q
+from django.db.models import Count, Case, When, F, Q, Max
 from django.template.defaultfilters import pluralize
 from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape as esc
@@ -25,6 +27,35 @@ from .support_tables import render_publisher, TW_COLUMN_ALIGN_RIGHT, \
 from .datasource import ExternalLink
 
 
+def prev_next_issue_ids(series_id, issues):
+    """
+    The ids of the previous and next issue of the active issues of the
+    series, given as tuples of their id, sort code, variant_of id and the
+    series id of the latter, by issue id.  These are the base issues before
+    and after them, the base issue of a variant is skipped.  Also used by
+    the migration adding the columns, so only plain values are used.
+    """
+    base_issues = sorted((sort_code, issue_id)
+                         for issue_id, sort_code, variant_of_id,
+                         base_series_id in issues
+                         if variant_of_id is None or
+                         base_series_id != series_id)
+    sort_codes = [sort_code for sort_code, issue_id in base_issues]
+    neighbours = {}
+    for issue_id, sort_code, variant_of_id, base_series_id in issues:
+        position = bisect_left(sort_codes, sort_code) - 1
+        if position >= 0 and base_issues[position][1] == variant_of_id:
+            position -= 1
+        prev_issue_id = base_issues[position][1] if position >= 0 else None
+        position = bisect_right(sort_codes, sort_code)
+        if position < len(base_issues):
+            next_issue_id = base_issues[position][1]
+        else:
+            next_issue_id = None
+        neighbours[issue_id] = (prev_issue_id, next_issue_id)
+    return neighbours
+
+
 class SeriesPublicationType(models.Model):
     class Meta:
         app_label = 'gcd'
@@ -38,6 +69,31 @@ class SeriesPublicationType(models.Model):
         return self.name
 
 
+# The issue columns shown in the series details, in the order of the bits of
+# Series.issue_columns, with the condition for an issue having a value.
+ISSUE_COLUMNS = {
+  'volume': Q(no_volume=False) & ~Q(volume=''),
+  'brand_emblem': Q(no_brand=False, brand_emblem__isnull=False),
+  'indicia_frequency': (Q(no_indicia_frequency=False) &
+                        ~Q(indicia_frequency='')),
+  'isbn': Q(no_isbn=False) & ~Q(isbn=''),
+  'barcode': Q(no_barcode=False) & ~Q(barcode=''),
+  'title': Q(no_title=False) & ~Q(title=''),
+  'on_sale_date': ~Q(on_sale_date=''),
+  'rating': Q(no_rating=False) & ~Q(rating=''),
+}
+
+# The series flags which need to be set for showing an issue column.
+ISSUE_COLUMN_FLAGS = {
+  'volume': 'has_volume',
+  'indicia_frequency': 'has_indicia_frequency',
+  'isbn': 'has_isbn',
+  'barcode': 'has_barcode',
+  'title': 'has_issue_title',
+  'rating': 'has_rating',
+}
+
+
 class Series(GcdData):
     class Meta:
         app_label = 'gcd'
@@ -103,6 +159,10 @@ class Series(GcdData):
     # Fields related to cover image galleries.
     has_gallery = models.BooleanField(default=False, db_index=True)
 
+    # Bits of the ISSUE_COLUMNS with values in the active issues, null if
+    # not yet computed, see set_issue_columns.
+    issue_columns = models.PositiveSmallIntegerField(null=True, default=None)
+
     # Country and Language info.
     country = models.ForeignKey(Country, on_delete=models.CASCADE)
     language = models.ForeignKey(Language, on_delete=models.CASCADE)
@@ -185,6 +245,57 @@ class Series(GcdData):
             self.last_issue = issues[len(issues) - 1]
         self.save()
 
+    def set_prev_next_issues(self, save=True):
+        """
+        Set the previous and next issue of the active issues, which are the
+        base issues before and after them, as in Issue._get_prev_next_issue.
+        Needs to be called when issues are added, moved, deleted or
+        reordered.  Returns the number of issues with changed neighbours,
+        which are only saved if save is set.
+        """
+        issues = list(self.active_issues().values_list(
+          'id', 'sort_code', 'variant_of_id', 'variant_of__series_id',
+          'prev_issue_id', 'next_issue_id'))
+        neighbours = prev_next_issue_ids(self.id,
+                                         [issue[:4] for issue in issues])
+        changed = [Issue(id=issue[0], prev_issue_id=neighbours[issue[0]][0],
+                         next_issue_id=neighbours[issue[0]][1])
+                   for issue in issues if issue[4:] != neighbours[issue[0]]]
+        if save:
+            Issue.objects.bulk_update(changed, ['prev_issue', 'next_issue'])
+        return len(changed)
+
+    def set_issue_columns(self, save=True):
+        """
+        Set which of the ISSUE_COLUMNS have values in the active issues,
+        using one query.  Needs to be called when issues are changed.
+        """
+        present = self.active_issues().aggregate(**{
+          column: Max(Case(When(condition, then=1), default=0))
+          for column, condition in ISSUE_COLUMNS.items()})
+        self.issue_columns = sum(1 << bit for bit, column
+                                 in enumerate(ISSUE_COLUMNS)
+                                 if present[column])
+        if save:
+            self.save(update_fields=['issue_columns'])
+        return self.issue_columns
+
+    def present_issue_columns(self):
+        """
+        The ISSUE_COLUMNS to show for the issues, i.e. the ones with values
+        which are not switched off for the series.
+        """
+        issue_columns = self.issue_columns
+        if issue_columns is None:
+            issue_columns = self.set_issue_columns()
+        columns = set()
+        for bit, column in enumerate(ISSUE_COLUMNS):
+            flag = ISSUE_COLUMN_FLAGS.get(column)
+            if issue_columns & (1 << bit) and \
+               (flag is None or getattr(self, flag)):
+                columns.add(column)
+        return columns
+
     _update_stats = True
 
     def active_awards(self):
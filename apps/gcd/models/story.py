@@ -1,7 +1,9 @@
+from collections import defaultdict
+
 from django.contrib.contenttypes.fields import GenericRelation
 from django.db import models
 from django.db.models.functions import NullIf
-from django.db.models import Value
+from django.db.models import Exists, OuterRef, Value
 import django.urls as urlresolvers
 from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape as esc
@@ -15,8 +17,8 @@ from apps.stddata.models import Language
 
 from .gcddata import GcdData, GcdLink
 from .award import ReceivedAward
-from .character import CharacterNameDetail, Group, GroupNameDetail, \
-                       Universe, Multiverse
+from .character import CharacterNameDetail, CharacterRelation, Group, \
+                       GroupNameDetail, Universe, Multiverse
 from .creator import CreatorNameDetail, CreatorSignature
 from .feature import Feature, FeatureLogo, FeatureNameDetail
 from .support_tables import render_publisher
@@ -176,39 +178,188 @@ def get_civilian_identity(character, appearing_characters, url=True,
         return ''
 
 
+def _reference_universe_id(universe_ids, verse_ids, mainstream_ids):
+    if len(universe_ids) == 1:
+        return universe_ids[0]
+    elif len(universe_ids) == 2:
+        return -1
+    elif len(set(verse_ids)) == 1:
+        return mainstream_ids[set(verse_ids).pop()]
+    return None
+
+
 def _get_reference_universe(story):
-    reference_universe_id = None
-    if story.universe.count() == 1:
-        reference_universe_id = story.universe.get().id
-    elif story.universe.count() == 2:
-        reference_universe_id = -1
-    else:
-        if len(set(story.appearing_characters.exclude(universe__verse=None)
-                   .values_list('universe__verse', flat=True))) == 1:
-            mainstream_universe_id = set(story.appearing_characters.exclude(
-              universe__verse=None).values_list('universe__verse', flat=True))\
-              .pop()
-            reference_universe_id = Multiverse.objects.get(
-              id=mainstream_universe_id).mainstream_id
-    return reference_universe_id
-
-
-def _process_single_character(character, appearing_characters,
-                              reference_universe_id):
-    universe = None
-    if reference_universe_id:
-        if character.universe:
-            if character.universe_id != reference_universe_id:
-                universe = character.universe
+    universe_ids = list(story.universe.values_list('id', flat=True))
+    verse_ids = set(story.appearing_characters.exclude(universe__verse=None)
+                         .values_list('universe__verse', flat=True))
+    mainstream_ids = dict(Multiverse.objects.filter(id__in=verse_ids)
+                                    .values_list('id', 'mainstream_id'))
+    return _reference_universe_id(universe_ids, verse_ids, mainstream_ids)
+
+
+class AppearingCharacters(object):
+    """
+    The active appearing characters and groups of a story, with what is
+    needed to resolve them for display: the group names of the characters,
+    the alias relations among them and the reference universe.
+
+    load() fetches them for several stories with a fixed number of queries,
+    for_story() for a single story or story revision.
+    """
+    def __init__(self, characters, groups, aliases, reference_universe_id):
+        self.characters = characters
+        self.groups = groups
+        # (alias, civilian identity) pairs of the characters
+        self.aliases = aliases
+        self.reference_universe_id = reference_universe_id
+        for character in characters:
+            character.group_name_ids = {group_name.id for group_name
+                                        in character.group_name.all()}
+
+    @staticmethod
+    def _aliases(character_ids):
+        return set(CharacterRelation.objects.filter(
+          relation_type__id=2, from_character__in=character_ids,
+          to_character__in=character_ids)
+          .values_list('from_character', 'to_character'))
+
+    @classmethod
+    def for_story(cls, story):
+        characters = list(story.active_characters.select_related(
+          'character__character', 'universe__verse', 'group_universe__verse',
+          'role').prefetch_related('group_name'))
+        groups = list(story.active_groups.select_related(
+          'group_name__group', 'universe__verse'))
+        aliases = cls._aliases({character.character.character_id
+                                for character in characters})
+        return cls(characters, groups, aliases,
+                   _get_reference_universe(story))
+
+    @classmethod
+    def load(cls, stories):
+        """
+        Returns the AppearingCharacters of the stories by story id.
+        """
+        story_ids = [story.id for story in stories]
+        characters = defaultdict(list)
+        for character in StoryCharacter.objects.filter(
+          story__in=story_ids, deleted=False).select_related(
+          'character__character', 'universe__verse', 'group_universe__verse',
+          'role').prefetch_related('group_name'):
+            characters[character.story_id].append(character)
+        groups = defaultdict(list)
+        for group in StoryGroup.objects.filter(
+          story__in=story_ids, deleted=False).select_related(
+          'group_name__group', 'universe__verse'):
+            groups[group.story_id].append(group)
+        aliases = cls._aliases({character.character.character_id
+                                for story_characters in characters.values()
+                                for character in story_characters})
+
+        universe_ids = defaultdict(list)
+        for story_id, universe_id in Story.universe.through.objects.filter(
+          story__in=story_ids).values_list('story', 'universe'):
+            universe_ids[story_id].append(universe_id)
+        verse_ids = defaultdict(set)
+        for story_id, verse_id in StoryCharacter.objects.filter(
+          story__in=story_ids, universe__verse__isnull=False).values_list(
+          'story', 'universe__verse'):
+            verse_ids[story_id].add(verse_id)
+        mainstream_ids = dict(Multiverse.objects.filter(
+          id__in=set().union(*verse_ids.values()))
+          .values_list('id', 'mainstream_id'))
+
+        return {story_id: cls(characters[story_id], groups[story_id],
+                              aliases, _reference_universe_id(
+                                universe_ids[story_id], verse_ids[story_id],
+                                mainstream_ids))
+                for story_id in story_ids}
+
+    def _civilian_identity(self, character):
+        return [other for other in self.characters
+                if other.universe_id == character.universe_id and
+                (character.character.character_id,
+                 other.character.character_id) in self.aliases]
+
+    def _is_civilian_identity(self, character):
+        return any(other.universe_id == character.universe_id and
+                   (other.character.character_id,
+                    character.character.character_id) in self.aliases
+                   for other in self.characters)
+
+    def _process_single_character(self, character):
+        universe = None
+        if self.reference_universe_id:
+            if character.universe:
+                if character.universe_id != self.reference_universe_id:
+                    universe = character.universe
+            else:
+                universe = Universe(name='without a universe')
+        return (character, self._civilian_identity(character), universe)
+
+    def _process_characters(self, characters, order_codes):
+        # ordered characters first by their order code, the others follow
+        ordered = sorted((order_codes[character.id], index)
+                         for index, character in enumerate(characters)
+                         if character.id in order_codes)
+        ordered = [characters[index] for _, index in ordered]
+        return [self._process_single_character(character)
+                for character in ordered + [
+                  character for character in characters
+                  if character.id not in order_codes]]
+
+    def resolve(self, order_codes=None):
+        """
+        Return the groups, each with its group universe and characters, and
+        the characters not in a group.  Characters with an order code come
+        first, ordered by it.
+        """
+        order_codes = order_codes or {}
+        group_list = []
+        processed_appearances_ids = set()
+        for group in self.groups:
+            group_universe = None
+            if self.reference_universe_id and group.universe:
+                if group.universe_id != self.reference_universe_id:
+                    group_universe = group.universe
+            members = [character for character in self.characters
+                       if group.group_name_id in character.group_name_ids and
+                       character.group_universe_id == group.universe_id]
+            processed_appearances_ids.update(member.id for member in members)
+            group_list.append((group, group_universe,
+                               self._process_characters(members,
+                                                        order_codes)))
+
+        characters = [character for character in self.characters
+                      if character.id not in processed_appearances_ids and
+                      not self._is_civilian_identity(character)]
+        return (group_list, self._process_characters(characters,
+                                                     order_codes))
+
+
+def batch_appearing_characters(stories):
+    """
+    Batch the stories, e.g. all stories of an issue, so that processing the
+    appearing characters of one of them loads the ones of all of them with
+    a fixed number of queries.  Story revisions load their own.
+    """
+    stories = [story for story in stories if type(story) is Story]
+    for story in stories:
+        story._appearing_characters_batch = stories
+
+
+def _appearing_characters(story):
+    if not hasattr(story, '_appearing_characters'):
+        batch = getattr(story, '_appearing_characters_batch', None)
+        if batch:
+            appearing_characters = AppearingCharacters.load(batch)
+            for batch_story in batch:
+                batch_story._appearing_characters = \
+                  appearing_characters[batch_story.id]
         else:
-            universe = Universe(name='without a universe')
-    civilian_identity = _get_civilian_identity(character,
-                                               appearing_characters)
-    if civilian_identity:
-        civilian_identity = appearing_characters.filter(
-          universe=character.universe,
-          character__character__id__in=civilian_identity)
-    return (character, civilian_identity, universe)
+            story._appearing_characters = \
+              AppearingCharacters.for_story(story)
+    return story._appearing_characters
 
 
 def process_appearing_characters(story):
@@ -216,43 +367,7 @@ def process_appearing_characters(story):
     Return a properly formatted list of characters appearing in the story.
     Ordering is by groups first, then by character sort name.
     """
-    all_appearing_characters = story.active_characters
-    in_group = all_appearing_characters.exclude(group_name=None)
-    groups = story.active_groups
-
-    reference_universe_id = _get_reference_universe(story)
-
-    group_list = []
-    processed_appearances_ids = []
-    for group in groups:
-        group_universe = None
-        if reference_universe_id and group.universe:
-            if group.universe_id != reference_universe_id:
-                group_universe = group.universe
-        character_list = []
-        for member in in_group.filter(group_name=group.group_name_id,
-                                      group_universe=group.universe_id):
-            character_list.append(_process_single_character(
-              member, all_appearing_characters, reference_universe_id))
-            processed_appearances_ids.append(member.id)
-        group_list.append((group, group_universe, character_list))
-    appearing_characters = all_appearing_characters.exclude(
-      id__in=processed_appearances_ids)
-
-    character_list = []
-    for character in appearing_characters:
-        alias_identity = set(
-          character.character.character.from_related_character
-                   .filter(relation_type__id=2).values_list('from_character',
-                                                            flat=True))\
-                   .intersection(all_appearing_characters.filter(
-                      universe=character.universe).values_list(
-                      'character__character', flat=True))
-        if alias_identity:
-            continue
-        character_list.append(_process_single_character(
-          character, all_appearing_characters, reference_universe_id))
-    return (group_list, character_list)
+    return _appearing_characters(story).resolve()
 
 
 def process_ordered_appearing_characters(character_order):
@@ -261,80 +376,15 @@ def process_ordered_appearing_characters(character_order):
     The order ist defined by the given CharacterOrder, followed by any other
     appearing characters not included in the order, ordered by sort name.
     """
-    story = character_order.story
-    all_appearing_characters = story.active_characters
-    in_group = all_appearing_characters.exclude(group_name=None)
     if hasattr(character_order, 'character_revisions'):
         field = 'character_revisions'
     else:
         field = 'characters'
     through_model = character_order._meta.get_field(field).remote_field.through
-    in_character_order = all_appearing_characters.filter(
-      **{f'{through_model.__name__.lower()}__order': character_order}
-    ).distinct()
-    groups = story.active_groups
-
-    reference_universe_id = _get_reference_universe(story)
-
-    group_list = []
-    processed_appearances_ids = []
-    for group in groups:
-        group_universe = None
-        if reference_universe_id and group.universe:
-            if group.universe_id != reference_universe_id:
-                group_universe = group.universe
-        character_list = []
-        ordered_character_list = []
-        for member in in_group.filter(group_name=group.group_name_id,
-                                      group_universe=group.universe_id):
-            if member in in_character_order:
-                ordered_character_list.append((
-                  getattr(character_order,
-                          f'{through_model.__name__.lower()}_set').get(
-                    order=character_order,
-                    story_character=member).order_code, member))
-            else:
-                character_list.append(_process_single_character(
-                  member, all_appearing_characters, reference_universe_id))
-            processed_appearances_ids.append(member.id)
-        ordered_character_list.sort(key=lambda x: x[0])
-        cnt = 0
-        for _, member in ordered_character_list:
-            character_list.insert(cnt, _process_single_character(
-              member, all_appearing_characters, reference_universe_id))
-            cnt += 1
-        group_list.append((group, group_universe, character_list))
-    appearing_characters = all_appearing_characters.exclude(
-      id__in=processed_appearances_ids)
-
-    character_list = []
-    ordered_character_list = []
-    for character in appearing_characters:
-        alias_identity = set(
-          character.character.character.from_related_character
-                   .filter(relation_type__id=2).values_list('from_character',
-                                                            flat=True))\
-                   .intersection(all_appearing_characters.filter(
-                      universe=character.universe).values_list(
-                      'character__character', flat=True))
-        if alias_identity:
-            continue
-        if character in in_character_order:
-            ordered_character_list.append((
-              getattr(character_order,
-                      f'{through_model.__name__.lower()}_set').get(
-                order=character_order,
-                story_character=character).order_code, character))
-        else:
-            character_list.append(_process_single_character(
-              character, all_appearing_characters, reference_universe_id))
-    ordered_character_list.sort(key=lambda x: x[0])
-    cnt = 0
-    for _, character in ordered_character_list:
-        character_list.insert(cnt, _process_single_character(
-          character, all_appearing_characters, reference_universe_id))
-        cnt += 1
-    return (group_list, character_list)
+    order_codes = dict(through_model.objects.filter(order=character_order)
+                                    .values_list('story_character',
+                                                 'order_code'))
+    return _appearing_characters(character_order.story).resolve(order_codes)
 
 
 def show_characters(story, url=True, css_style=True, compare=False,
@@ -572,6 +622,9 @@ class StoryCredit(GcdData):
     class Meta:
         app_label = 'gcd'
         db_table = 'gcd_story_credit'
+        # for the semi-join of the linked credit search
+        indexes = [models.Index(fields=['creator', 'credit_type', 'deleted',
+                                        'story'])]
 
     creator = models.ForeignKey(CreatorNameDetail, on_delete=models.CASCADE)
     credit_type = models.ForeignKey(CreditType, on_delete=models.CASCADE)
@@ -1033,6 +1086,12 @@ class Story(GcdData):
             'stories': 1,
         }
 
+    def _exists(self, annotation, objects):
+        # annotate_ui_checks saves the query per story for lists of stories
+        if hasattr(self, annotation):
+            return getattr(self, annotation)
+        return objects.exists()
+
     def has_credits(self):
         """
         Simplifies UI checks for conditionals.  Credit fields.
@@ -1043,7 +1102,7 @@ class Story(GcdData):
             self.colors or \
             self.letters or \
             self.editing or \
-            self.active_credits.exists()
+            self._exists('_credits_exist', self.active_credits)
 
     def has_content(self):
         """
@@ -1064,8 +1123,10 @@ class Story(GcdData):
         """
         UI check for characters.
         """
-        return self.characters or self.appearing_characters.count() or \
-            self.appearing_groups.count()
+        return self.characters or \
+            self._exists('_characters_exist',
+                         self.appearing_characters.all()) or \
+            self._exists('_groups_exist', self.appearing_groups.all())
 
     def has_characters_order_appearance(self):
         """
@@ -1094,10 +1155,15 @@ class Story(GcdData):
             ignore = AD_TYPES
         else:
             ignore = []
+        if ignore:
+            to_exist = '_reprints_to_non_ads_exist'
+        else:
+            to_exist = '_reprints_to_exist'
         return ((notes and self.reprint_notes) or
-                self.from_all_reprints.count() or
-                self.to_all_reprints.exclude(target__type__id__in=ignore)
-                                    .count())
+                self._exists('_reprints_from_exist',
+                             self.from_all_reprints.all()) or
+                self._exists(to_exist, self.to_all_reprints.exclude(
+                                         target__type__id__in=ignore)))
 
     def reprint_count(self):
         if self.type_id not in [STORY_TYPES['preview'],
@@ -1134,7 +1200,15 @@ class Story(GcdData):
                                      bare_value=True)
 
     def show_characters_as_text(self):
-        return show_characters(self, url=False)
+        # Stories annotated by annotate_ui_checks without appearances only
+        # have the text characters.  The search index uses the value twice.
+        if not hasattr(self, '_characters_as_text'):
+            if getattr(self, '_characters_exist', True) or \
+               getattr(self, '_groups_exist', True):
+                self._characters_as_text = show_characters(self, url=False)
+            else:
+                self._characters_as_text = self.characters
+        return self._characters_as_text
 
     def _show_feature(cls, story):
         return show_feature(story)
@@ -1220,6 +1294,25 @@ class Story(GcdData):
         return show_story_short(self, no_number=True, markup=False)
 
 
+def annotate_ui_checks(stories):
+    """
+    Annotate the queryset of stories with the existence of credits,
+    appearing characters and groups, and reprints, which the UI checks of
+    a story otherwise query one by one, e.g. for the stories of an issue.
+    """
+    from .reprint import Reprint
+    story = OuterRef('pk')
+    return stories.annotate(
+      _credits_exist=Exists(StoryCredit.objects.filter(story=story,
+                                                       deleted=False)),
+      _characters_exist=Exists(StoryCharacter.objects.filter(story=story)),
+      _groups_exist=Exists(StoryGroup.objects.filter(story=story)),
+      _reprints_from_exist=Exists(Reprint.objects.filter(target=story)),
+      _reprints_to_exist=Exists(Reprint.objects.filter(origin=story)),
+      _reprints_to_non_ads_exist=Exists(Reprint.objects.filter(
+        origin=story).exclude(target__type__id__in=AD_TYPES)))
+
+
 class BiblioEntry(Story):
     class Meta:
         app_label = 'gcd'
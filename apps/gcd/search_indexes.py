@@ -1,14 +1,37 @@
 from datetime import date
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from haystack import indexes
 from haystack.fields import MultiValueField
 from apps.gcd.models import Issue, Series, Story, Publisher, IndiciaPublisher,\
     Brand, BrandGroup, STORY_TYPES, Award, Creator, CreatorMembership, \
     CreatorArtInfluence, ReceivedAward, CreatorNonComicWork, Feature, \
-    Printer, IndiciaPrinter, Character, Group, Universe, StoryArc, School
+    Printer, IndiciaPrinter, Character, Group, Universe, StoryArc, School, \
+    Reprint
+from apps.gcd.models.story import annotate_ui_checks
 
+from apps.gcd.templatetags.credits import rendered_credits
 from apps.oi.models import on_sale_date_fields
 
 
+def _reprint_count(field):
+    """
+    The number of reprints from the object as a subquery, which unlike a
+    Count annotation needs no grouping of the indexed rows.
+    """
+    reprints = Reprint.objects.filter(**{field: OuterRef('pk')}).order_by()\
+                      .values(field).annotate(count=Count('id'))\
+                      .values('count')
+    return Coalesce(Subquery(reprints), 0)
+
+
+def _relations_weight(obj):
+    # index_queryset annotates the count, single updates query it
+    if hasattr(obj, 'to_reprint_count'):
+        return obj.to_reprint_count
+    return obj.to_all_reprints.count()
+
+
 class ObjectIndex(object):
     # def index_queryset(self, using=None):
     #     """ Used when populating the queryset with db models """
@@ -69,6 +92,14 @@ class IssueIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
     def get_model(self):
         return Issue
 
+    def index_queryset(self, using=None):
+        return super(IssueIndex, self).index_queryset(using=using)\
+          .select_related('series__country', 'series__language',
+                          'series__publisher')\
+          .prefetch_related('credits__creator__creator',
+                            'credits__creator__type')\
+          .annotate(to_reprint_count=_reprint_count('origin_issue'))
+
     def prepare_facet_model_name(self, obj):
         return "issue"
 
@@ -102,7 +133,7 @@ class IssueIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
         return '%s %s' % (obj.series.name, obj.display_number)
 
     def prepare_relations_weight(self, obj):
-        return obj.to_all_reprints.count()
+        return _relations_weight(obj)
 
 
 class SeriesIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
@@ -128,6 +159,10 @@ class SeriesIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
     def get_model(self):
         return Series
 
+    def index_queryset(self, using=None):
+        return super(SeriesIndex, self).index_queryset(using=using)\
+          .select_related('country', 'language', 'publisher')
+
     def prepare_facet_model_name(self, obj):
         return "series"
 
@@ -189,6 +224,22 @@ class StoryIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
     def get_model(self):
         return Story
 
+    def index_queryset(self, using=None):
+        # The credits with their names and creators are used for the credit
+        # fields and the text, the existence checks save the character
+        # queries of stories without appearances.
+        stories = super(StoryIndex, self).index_queryset(using=using)\
+          .select_related('type', 'issue__series__country',
+                          'issue__series__language',
+                          'issue__series__publisher')\
+          .prefetch_related('credits__creator__creator',
+                            'credits__creator__type',
+                            'issue__credits__creator__creator',
+                            'issue__credits__creator__type',
+                            'feature_name', 'feature_object')\
+          .annotate(to_reprint_count=_reprint_count('origin'))
+        return annotate_ui_checks(stories)
+
     def prepare_facet_model_name(self, obj):
         return "story"
 
@@ -220,15 +271,12 @@ class StoryIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
 
     def _prepare_credit(self, obj, field):
         return_val = [(val.strip()) for val in getattr(obj, field).split(';')]
-        credits = obj.active_credits.filter(credit_type__name=field)
+        credits = rendered_credits(obj, field, url=False)
         if credits:
             if return_val == ['']:
-                return_val = [val.creator.display_credit(val, url=False)
-                              for val in credits]
+                return_val = list(credits)
             else:
-                return_val.extend([val.creator.display_credit(val,
-                                                              url=False)
-                                   for val in credits])
+                return_val.extend(credits)
         if return_val == ['']:
             return None
         else:
@@ -255,25 +303,13 @@ class StoryIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
         return_val.extend([(val.strip()) for val in
                           getattr(obj.issue, 'editing').split(';')])
 
-        credits = obj.active_credits.filter(credit_type__name='editing')
-        if credits:
-            if return_val == ['']:
-                return_val = [val.creator.display_credit(val, url=False)
-                              for val in credits]
-            else:
-                return_val.extend([val.creator.display_credit(val,
-                                                              url=False)
-                                   for val in credits])
-
-        credits = obj.issue.active_credits.filter(credit_type__name='editing')
-        if credits:
-            if return_val == ['']:
-                return_val = [val.creator.display_credit(val, url=False)
-                              for val in credits]
-            else:
-                return_val.extend([val.creator.display_credit(val,
-                                                              url=False)
-                                   for val in credits])
+        for credits in (rendered_credits(obj, 'editing', url=False),
+                        rendered_credits(obj.issue, 'editing', url=False)):
+            if credits:
+                if return_val == ['']:
+                    return_val = list(credits)
+                else:
+                    return_val.extend(credits)
 
         if return_val == ['']:
             return None
@@ -315,7 +351,7 @@ class StoryIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
     #       type=STORY_TYPES['blank'])
 
     def prepare_relations_weight(self, obj):
-        return obj.to_all_reprints.count()
+        return _relations_weight(obj)
 
 
 class FeatureIndex(ObjectIndex, indexes.SearchIndex, indexes.Indexable):
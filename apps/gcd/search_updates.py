@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Near-realtime updates of the search index for approved changes.  With the
+QueuedSignalProcessor as HAYSTACK_SIGNAL_PROCESSOR the display objects
+committed from revisions are recorded after the commit of the approval in
+a pending set in redis, and one RQ job at a time updates the documents of
+the pending objects in bulk batches.  Without django_rq in INSTALLED_APPS
+the documents are updated right after the commit.
+"""
+
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+from haystack import connections
+from haystack.constants import DEFAULT_ALIAS
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+
+SEARCH_UPDATES_PENDING_KEY = 'search_updates:pending:%s'
+SEARCH_UPDATES_QUEUED_KEY = 'search_updates:queued:%s'
+# a lost job only delays the updates until the next recorded object
+SEARCH_UPDATES_QUEUED_TIMEOUT = 60 * 10
+SEARCH_UPDATES_BATCH_SIZE = 500
+
+# Sent by Revision.commit_to_display for the committed display object,
+# deleted ones are sent before their deletion.
+display_object_committed = Signal()
+
+
+def _object_key(instance):
+    return '%s:%d' % (instance._meta.label_lower, instance.pk)
+
+
+def update_search_objects(keys, using=DEFAULT_ALIAS):
+    """
+    Updates the documents of the objects with the keys in bulk, objects no
+    longer in the database are removed from the index.
+    """
+    ids_per_model = {}
+    for key in keys:
+        label, pk = key.split(':')
+        ids_per_model.setdefault(label, set()).add(int(pk))
+
+    unified_index = connections[using].get_unified_index()
+    backend = connections[using].get_backend()
+    for label, ids in ids_per_model.items():
+        index = unified_index.get_index(apps.get_model(label))
+        objects = list(index.index_queryset(using=using).filter(pk__in=ids))
+        if objects:
+            backend.update(index, objects)
+        for pk in ids - {obj.pk for obj in objects}:
+            backend.remove('%s.%d' % (label, pk))
+
+
+def update_search_index(using=DEFAULT_ALIAS):
+    """
+    Job updating the documents of the pending objects in batches.
+    """
+    import django_rq
+    redis = django_rq.get_connection('default')
+    # objects recorded from now on queue the next job
+    redis.delete(SEARCH_UPDATES_QUEUED_KEY % using)
+    while True:
+        keys = redis.spop(SEARCH_UPDATES_PENDING_KEY % using,
+                          SEARCH_UPDATES_BATCH_SIZE)
+        if not keys:
+            break
+        update_search_objects([key.decode() for key in keys], using=using)
+
+
+def _queue_keys(keys, using):
+    if 'django_rq' not in settings.INSTALLED_APPS:
+        update_search_objects(keys, using=using)
+        return
+
+    import django_rq
+    redis = django_rq.get_connection('default')
+    with redis.pipeline() as pipeline:
+        pipeline.sadd(SEARCH_UPDATES_PENDING_KEY % using, *keys)
+        pipeline.set(SEARCH_UPDATES_QUEUED_KEY % using, 1, nx=True,
+                     ex=SEARCH_UPDATES_QUEUED_TIMEOUT)
+        added, not_queued = pipeline.execute()
+    if not_queued:
+        django_rq.get_queue('default').enqueue(update_search_index, using)
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Records the display objects committed from revisions for the queued
+    update of their documents.  Other saves do not update the index, these
+    are left to update_index.
+
+    The objects of a transaction are queued together by the first of its
+    on_commit callbacks.  Objects of a rolled back transaction are queued
+    with the next one, which only updates their unchanged documents.
+    """
+    def setup(self):
+        self._local = threading.local()
+        display_object_committed.connect(self.handle_save)
+
+    def teardown(self):
+        display_object_committed.disconnect(self.handle_save)
+
+    def handle_save(self, sender, instance, **kwargs):
+        for using in self.connection_router.for_write(instance=instance):
+            try:
+                self.connections[using].get_unified_index().get_index(sender)
+            except NotHandled:
+                continue
+            if not hasattr(self._local, 'pending'):
+                self._local.pending = {}
+            self._local.pending.setdefault(using, set())\
+                               .add(_object_key(instance))
+            transaction.on_commit(self._queue_pending)
+
+    def _queue_pending(self):
+        pending = getattr(self._local, 'pending', {})
+        self._local.pending = {}
+        for using, keys in pending.items():
+            _queue_keys(sorted(keys), using)
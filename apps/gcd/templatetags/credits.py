@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
-import icu
+import time
+import hashlib
 
-import markdown as md
+import icu
 
 from django import template
 from django.conf import settings
+from django.core.cache import cache
 from django.template.defaultfilters import stringfilter
 from django.utils.translation import gettext as _
 from django.utils.translation import ngettext
@@ -15,15 +17,16 @@ import django.urls as urlresolvers
 from apps.stddata.models import Country, Language
 from apps.gcd.models.story import AD_TYPES, Story
 from apps.gcd.models.support import GENRES
-from apps.gcd.models import STORY_TYPES, CREDIT_TYPES
-from apps.gcd.markdown_extension import TailwindExtension, \
-                                        GCDFieldExtension, \
-                                        GCDFieldLinkNameExtension, \
-                                        URLExtension
+from apps.gcd.models import Issue, STORY_TYPES, CREDIT_TYPES
+from apps.gcd.markdown_extension import convert_markdown, load_references
 
 
 register = template.Library()
 
+RENDERED_CREDIT_VERSION_KEY = 'rendered_credit_version'
+RENDERED_CREDIT_TIMEOUT = 60 * 60 * 24
+RENDERED_MARKDOWN_TIMEOUT = 60 * 60 * 24
+
 
 def sc_in_brackets(reprints, bracket_begin, bracket_end, sc_pos):
     begin = reprints.find(bracket_begin)
@@ -363,8 +366,14 @@ def __format_credit(story, credit, computed_value='', tailwind=False,
 
 @register.filter
 def search_creator_credit(story, credit_type):
-    credits = story.active_credits.filter(
-              credit_type_id=CREDIT_TYPES[credit_type])
+    if 'credits' in getattr(story, '_prefetched_objects_cache', {}):
+        # the credits prefetched by the index_queryset of the search index
+        credits = [credit for credit in story.credits.all()
+                   if not credit.deleted and
+                   credit.credit_type_id == CREDIT_TYPES[credit_type]]
+    else:
+        credits = story.active_credits.filter(
+                  credit_type_id=CREDIT_TYPES[credit_type])
     if not credits:
         return ''
     credit_value = '%s' % credits[0].creator.display_credit(credits[0],
@@ -378,7 +387,32 @@ def search_creator_credit(story, credit_type):
     return mark_safe(credit_value)
 
 
-def __credit_value(story, credit_type, url, show_sources=False, use_div=False):
+def _rendered_credit_version():
+    version = cache.get(RENDERED_CREDIT_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(RENDERED_CREDIT_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_rendered_credits():
+    """
+    Drop the cached rendered credits, needs to be called when creator names,
+    relations or signatures change.  Changes of the credits and of the
+    creators themselves are part of the cache keys.
+    """
+    cache.set(RENDERED_CREDIT_VERSION_KEY, time.time_ns(), None)
+
+
+def rendered_credits(story, credit_type, url=True, show_sources=False):
+    """
+    The displayed credits of the credit type of the story or issue.
+
+    For stories and issues the list is cached.  The key contains the ids and
+    modification times of the credits, of their creator names and of the
+    creators, which are prefetched for the display of stories, or otherwise
+    selected together with the credits.
+    """
     # We use .credits.all() to allow prefetching of the credits when the
     # story is fetched from the db, otherwise the filter would invalidated
     # the prefetched data. Prefetching is done by
@@ -388,20 +422,46 @@ def __credit_value(story, credit_type, url, show_sources=False, use_div=False):
     # For results from elasticsearch we need to go to the object.
     if '_object' in story.__dict__:
         credits = story.objects.credits.all()
-    else:
+    elif 'credits' in getattr(story, '_prefetched_objects_cache', {}):
         credits = story.credits.all()
+    else:
+        credits = story.credits.select_related('creator__creator')
+    credits = [credit for credit in credits
+               if credit.credit_type_id == CREDIT_TYPES[credit_type] and
+               not credit.deleted]
+    if not credits or type(story) not in (Story, Issue):
+        return [credit.creator.display_credit(credit, url=url,
+                                              show_sources=show_sources)
+                for credit in credits]
+
+    signature = ';'.join('%d,%s,%s,%s' % (credit.id, credit.modified,
+                                          credit.creator.modified,
+                                          credit.creator.creator.modified)
+                         for credit in credits)
+    cache_key = 'rendered_credit:%s:%d:%s:%d:%d:%d:%s' % (
+      story._meta.model_name, story.id, credit_type, url, show_sources,
+      _rendered_credit_version(),
+      hashlib.md5(signature.encode('utf-8')).hexdigest())
+    displayed_credits = cache.get(cache_key)
+    if displayed_credits is None:
+        displayed_credits = [
+          credit.creator.display_credit(credit, url=url,
+                                        show_sources=show_sources)
+          for credit in credits]
+        cache.set(cache_key, displayed_credits, RENDERED_CREDIT_TIMEOUT)
+    return displayed_credits
+
+
+def __credit_value(story, credit_type, url, show_sources=False, use_div=False):
     credit_value = ''
-    for credit in credits:
-        if credit.credit_type_id == CREDIT_TYPES[credit_type] and \
-           not credit.deleted:
-            displayed_credit = credit.creator.display_credit(
-              credit, url=url, show_sources=show_sources)
-            if use_div:
-                credit_value += '<div>' + displayed_credit + '</div>'
-            elif credit_value:
-                credit_value += '; %s' % displayed_credit
-            else:
-                credit_value = displayed_credit
+    for displayed_credit in rendered_credits(story, credit_type, url,
+                                             show_sources):
+        if use_div:
+            credit_value += '<div>' + displayed_credit + '</div>'
+        elif credit_value:
+            credit_value += '; %s' % displayed_credit
+        else:
+            credit_value = displayed_credit
     old_credit_field = getattr(story, credit_type)
     if old_credit_field:
         if use_div:
@@ -492,13 +552,27 @@ def show_cover_letterer_credit(story):
 @register.filter()
 @stringfilter
 def render_markdown(value):
-    return mark_safe(md.markdown(value,
-                                 extensions=['nl2br',
-                                             'md_in_html',
-                                             TailwindExtension(),
-                                             GCDFieldLinkNameExtension(),
-                                             GCDFieldExtension(),
-                                             URLExtension()]))
+    """
+    The html of markdown text, e.g. notes.  The GCD references in the text
+    are loaded together, the html is cached.  The key contains the text and
+    the modification times of the referenced objects.
+    """
+    if not value:
+        return mark_safe('')
+    references = load_references(value)
+    signature = ';'.join('%s,%d,%s' % (model._meta.label_lower, object_id,
+                                       getattr(object, 'modified', ''))
+                         for (model, object_id), object in sorted(
+                           references.items(),
+                           key=lambda item: (item[0][0]._meta.label_lower,
+                                             item[0][1])))
+    cache_key = 'rendered_markdown:%s' % hashlib.md5(
+      ('%s\0%s' % (value, signature)).encode('utf-8')).hexdigest()
+    html = cache.get(cache_key)
+    if html is None:
+        html = convert_markdown(value, references)
+        cache.set(cache_key, html, RENDERED_MARKDOWN_TIMEOUT)
+    return mark_safe(html)
 
 
 def __format_keywords(keywords, join_on='; ', model_name='story', url=True):
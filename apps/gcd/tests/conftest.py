@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from contextlib import contextmanager
+
+import pytest
+from django.conf import settings
+
+from apps.gcd.models import Publisher, Series
+from apps.middleware.query_count import count_queries
+from apps.stddata.models import Script
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Assert a budget of SQL queries for a block, e.g. a page request:
+
+        with query_budget(20):
+            client.get(url)
+
+    Besides the total number, no query shape may be run `repeated` or more
+    times, which catches N+1 patterns on lists.
+    """
+    @contextmanager
+    def budget(queries, repeated=settings.QUERY_COUNT_REPEATED):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= queries, \
+            "%d queries, the budget is %d" % (counter.count, queries)
+        repeated_shapes = counter.repeated(repeated)
+        assert not repeated_shapes, \
+            "repeated queries: %s" % '; '.join(
+              '%dx %s' % (count, sql) for sql, count in repeated_shapes)
+    return budget
+
+
+@pytest.fixture
+def series(country, language):
+    Script.objects.get_or_create(
+        id=Script.LATIN_PK,
+        defaults={'code': 'Latn', 'number': Script.LATIN_PK,
+                  'name': 'Latin'})
+    publisher = Publisher.objects.create(
+        name='Team Publishing', country=country, year_began=1990)
+    return Series.objects.create(
+        name='Team Ups', sort_name='Team Ups', year_began=1990,
+        country=country, language=language, publisher=publisher,
+        is_comics_publication=True, has_gallery=False)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from apps.gcd.models import Publisher, Series
+from apps.gcd.views.alpha_pagination import AlphaPaginator
+
+
+@pytest.fixture
+def publisher(country, language):
+    publisher = Publisher.objects.create(
+        name='Alpha Publishing', country=country, year_began=1990)
+    names = ['1984', 'Action', 'adventure', 'Amazing', 'Batman', 'Crisis',
+             'Detective', 'Zorro']
+    for name in names:
+        Series.objects.create(
+          name=name, sort_name=name, year_began=1990, country=country,
+          language=language, publisher=publisher,
+          is_comics_publication=True, has_gallery=False)
+    return publisher
+
+
+@pytest.mark.django_db
+def test_pages_from_letter_counts(publisher):
+    paginator = AlphaPaginator(publisher.active_series(), per_page=3)
+
+    assert paginator.count == 8
+    assert paginator.number_offset == 1
+    assert [repr(page) for page in paginator.page_range] == \
+           ['A', 'B-Y', 'Z']
+    assert [page.count for page in paginator.page_range] == [3, 3, 1]
+    assert [page.offset for page in paginator.page_range] == [1, 4, 7]
+    assert paginator.page(2).number == 2
+
+
+@pytest.mark.django_db
+def test_page_fetches_only_its_letters(publisher,
+                                       django_assert_num_queries):
+    paginator = AlphaPaginator(publisher.active_series(), per_page=3)
+
+    with django_assert_num_queries(1):
+        names = [series.name for series in paginator.page(1).object_list]
+    # the database collation decides about the case of the ordering
+    assert sorted(names, key=str.lower) == ['Action', 'adventure', 'Amazing']
+    assert [series.name for series in paginator.page(3).object_list] == \
+           ['Zorro']
+
+
+@pytest.mark.django_db
+def test_empty_queryset(publisher):
+    paginator = AlphaPaginator(publisher.active_series().none())
+
+    assert paginator.count == 0
+    assert paginator.num_pages == 0
+    assert paginator.page(1) is None
+
+
+@pytest.mark.django_db
+def test_accented_and_lowercase_letters(publisher, language):
+    for name in ['Ábaco', 'àvila', 'zebra']:
+        Series.objects.create(
+          name=name, sort_name=name, year_began=1990,
+          country=publisher.country, language=language, publisher=publisher,
+          is_comics_publication=True, has_gallery=False)
+    paginator = AlphaPaginator(publisher.active_series(), per_page=3)
+
+    # accented first letters are counted with the numbers, as before
+    assert paginator.count == 11
+    assert paginator.number_offset == 3
+    assert [page.count for page in paginator.page_range] == [3, 3, 2]
+    assert [page.offset for page in paginator.page_range] == [3, 6, 9]
+    assert sorted(series.name
+                  for series in paginator.page(1).object_list) == \
+           ['Action', 'Amazing', 'adventure']
+    assert sorted(series.name
+                  for series in paginator.page(3).object_list) == \
+           ['Zorro', 'zebra']
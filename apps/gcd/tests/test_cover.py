@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import pytest
+from django.core.cache import cache
+
+from apps.gcd.models import Cover, Publisher, Series, Issue
+from apps.gcd.views import covers as cover_views
+from apps.gcd.views.covers import invalidate_random_covers, random_object
+
+
+@pytest.fixture
+def series(country, language):
+    cache.clear()
+    publisher = Publisher.objects.create(
+        name='Random Publishing', country=country, year_began=1990)
+    return Series.objects.create(
+        name='Random', sort_name='Random', year_began=1990, country=country,
+        language=language, publisher=publisher,
+        is_comics_publication=True, has_gallery=True)
+
+
+def _covers(series, count):
+    return [Cover.objects.create(
+              issue=Issue.objects.create(number=str(i), series=series,
+                                         sort_code=i))
+            for i in range(count)]
+
+
+def _series_covers(series):
+    return Cover.objects.filter(issue__series=series, deleted=False)
+
+
+@pytest.mark.django_db
+def test_random_object_returns_one_of_the_objects(series):
+    covers = _covers(series, 5)
+
+    for i in range(20):
+        assert random_object(_series_covers(series),
+                             'series-%d' % series.id) in covers
+
+
+@pytest.mark.django_db
+def test_random_object_empty(series):
+    assert random_object(_series_covers(series),
+                         'series-%d' % series.id) is None
+
+
+@pytest.mark.django_db
+def test_random_object_probes_from_random_id(series,
+                                             django_assert_num_queries):
+    covers = _covers(series, 3)
+    key = 'series-%d' % series.id
+    random_object(_series_covers(series), key)
+
+    with mock.patch.object(cover_views, 'randint',
+                           side_effect=lambda first, last: first + 1):
+        # only the probe, the id range is cached
+        with django_assert_num_queries(1):
+            assert random_object(_series_covers(series), key) == covers[1]
+    with mock.patch.object(cover_views, 'randint',
+                           side_effect=lambda first, last: last) as randint:
+        assert random_object(_series_covers(series), key) == covers[2]
+    randint.assert_called_with(covers[0].id, covers[2].id)
+
+
+@pytest.mark.django_db
+def test_random_object_wraps_around_deleted_covers(series):
+    covers = _covers(series, 3)
+    key = 'series-%d' % series.id
+    random_object(_series_covers(series), key)
+    Cover.objects.filter(id=covers[2].id).update(deleted=True)
+
+    with mock.patch.object(cover_views, 'randint',
+                           side_effect=lambda first, last: last):
+        assert random_object(_series_covers(series), key) == covers[0]
+
+
+@pytest.mark.django_db
+def test_random_object_cached_range_until_invalidated(series):
+    key = 'series-%d' % series.id
+    assert random_object(_series_covers(series), key) is None
+    covers = _covers(series, 1)
+
+    assert random_object(_series_covers(series), key) is None
+    invalidate_random_covers()
+    assert random_object(_series_covers(series), key) == covers[0]
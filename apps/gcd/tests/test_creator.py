@@ -3,9 +3,16 @@
 from types import SimpleNamespace
 
 import mock
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from apps.gcd.models import (
+    CreatorCollaboration, CreditType, Issue, Story, StoryCredit, StoryType)
 from apps.gcd.models.creator import (
-    Creator, CreatorNameDetail, NAME_TYPES, NameType)
+    Creator, CreatorNameDetail, NAME_TYPES, NameType, update_collaborations,
+    update_collaborations_between, update_story_collaborations)
+from apps.stddata.models import Date
 
 
 def _house_name_credit(matching_name):
@@ -66,3 +73,106 @@ def test_display_credit_keeps_official_house_name_without_match():
     assert credit_text == \
         'Credited Creator (under house name Official House Name)'
     active_names.filter.assert_called_once_with(name='House Alias')
+
+
+def _creator(name):
+    creator = Creator.objects.create(gcd_official_name=name, sort_name=name,
+                                     birth_date=Date.objects.create(),
+                                     death_date=Date.objects.create())
+    CreatorNameDetail.objects.create(name=name, creator=creator,
+                                     is_official_name=True)
+    return creator
+
+
+def _story(series, key_date, credits):
+    issue = Issue.objects.create(number=key_date, series=series,
+                                 sort_code=Issue.objects.count(),
+                                 key_date=key_date)
+    story_type, _ = StoryType.objects.get_or_create(
+        id=19, defaults={'name': 'comic story', 'sort_code': 19})
+    story = Story.objects.create(issue=issue, type=story_type,
+                                 sequence_number=0)
+    for creator, credit_type in credits:
+        StoryCredit.objects.create(
+          creator=creator.creator_names.get(), story=story,
+          credit_type=CreditType.objects.get_or_create(
+            id=credit_type,
+            defaults={'name': str(credit_type),
+                      'sort_code': credit_type})[0])
+    return story
+
+
+@pytest.mark.django_db
+def test_update_collaborations(series):
+    writer, artist = _creator('Writer'), _creator('Artist')
+    _story(series, '1990-02-00', [(writer, 1), (artist, 2), (artist, 3)])
+    _story(series, '1990-01-00', [(writer, 1), (artist, 2)])
+    _story(series, '1990-03-00', [(artist, 2)])
+
+    update_collaborations(writer)
+
+    collaboration = CreatorCollaboration.objects.get(creator=writer)
+    assert collaboration.co_creator == artist
+    assert (collaboration.issue_count, collaboration.pencils,
+            collaboration.inks, collaboration.script) == (2, 2, 1, 0)
+    assert collaboration.first_credit == '1990-01-00'
+
+
+@pytest.mark.django_db
+def test_update_collaborations_between(series):
+    writer, artist, letterer = (_creator('Writer'), _creator('Artist'),
+                                _creator('Letterer'))
+    _story(series, '1990-01-00', [(writer, 1), (artist, 2), (letterer, 5)])
+    update_collaborations(writer)
+    CreatorCollaboration.objects.filter(co_creator=letterer).delete()
+    StoryCredit.objects.filter(creator__creator=artist).update(deleted=True)
+
+    update_collaborations_between([writer.id, artist.id])
+
+    # the artist is gone, the letterer was not among the updated creators
+    assert not CreatorCollaboration.objects.exists()
+
+
+@pytest.mark.django_db
+def test_creator_creators_reads_collaborations(client, series):
+    writer, artist = _creator('Writer'), _creator('Artist')
+    _story(series, '1990-01-00', [(writer, 1), (artist, 2)])
+    update_collaborations(writer)
+
+    response = client.get('/creator/%d/creators/' % writer.id)
+    live_response = client.get('/creator/%d/creators/?country=%d' % (
+                                 writer.id, series.country.id))
+
+    assert response.status_code == 200
+    assert 'pencils (1)' in response.content.decode()
+    assert 'pencils (1)' in live_response.content.decode()
+
+
+@pytest.mark.django_db
+def test_creator_creators_without_story_scan(client, series):
+    writer, artist = _creator('Writer'), _creator('Artist')
+    _story(series, '1990-01-00', [(writer, 1), (artist, 2)])
+    update_collaborations(writer)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/creator/%d/creators/' % writer.id)
+
+    assert 'pencils (1)' in response.content.decode()
+    assert not [query for query in queries.captured_queries
+                if 'gcd_story_credit' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_update_story_collaborations(series):
+    writer, artist, inker = (_creator('Writer'), _creator('Artist'),
+                             _creator('Inker'))
+    story = _story(series, '1990-01-00', [(writer, 1), (artist, 2)])
+    _story(series, '1990-02-00', [(writer, 1), (inker, 3)])
+
+    # the inker was replaced on the second story
+    update_story_collaborations([story.id], [inker.id])
+
+    assert set(CreatorCollaboration.objects.values_list(
+      'creator__gcd_official_name', 'co_creator__gcd_official_name')) == {
+      ('Writer', 'Artist'), ('Artist', 'Writer'), ('Writer', 'Inker'),
+      ('Inker', 'Writer')}
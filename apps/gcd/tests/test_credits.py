@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import pytest
+from django.core.cache import cache
+
+from apps.gcd.models import Story, StoryCredit
+from apps.gcd.models.creator import CreatorNameDetail
+from apps.gcd.templatetags.credits import (
+    invalidate_rendered_credits, rendered_credits, search_creator_credit,
+    show_creator_credit)
+from .test_creator import _creator, _story
+
+
+def _fetch(story):
+    return Story.objects.prefetch_related('credits__creator__creator')\
+                        .get(id=story.id)
+
+
+@pytest.fixture
+def story(series):
+    cache.clear()
+    return _story(series, '1990-01-00', [(_creator('Writer'), 1),
+                                         (_creator('Artist'), 2)])
+
+
+@pytest.mark.django_db
+def test_rendered_credits(story):
+    assert rendered_credits(_fetch(story), 'script', url=False) == ['Writer']
+    assert show_creator_credit(_fetch(story), 'pencils', url=False) == \
+           'Artist'
+    assert rendered_credits(_fetch(story), 'inks') == []
+
+
+@pytest.mark.django_db
+def test_rendered_credits_cached(story):
+    rendered_credits(_fetch(story), 'script', url=False)
+
+    with mock.patch.object(CreatorNameDetail, 'display_credit',
+                           return_value='Writer') as display:
+        assert rendered_credits(_fetch(story), 'script', url=False) == \
+               ['Writer']
+        # the url variant is cached separately
+        rendered_credits(_fetch(story), 'script')
+    assert display.call_count == 1
+
+
+@pytest.mark.django_db
+def test_rendered_credits_not_prefetched(story, django_assert_num_queries):
+    rendered_credits(_fetch(story), 'script', url=False)
+    story = Story.objects.get(id=story.id)
+
+    # the credits with their creators for the cache key
+    with django_assert_num_queries(1):
+        assert rendered_credits(story, 'script', url=False) == ['Writer']
+
+
+@pytest.mark.django_db
+def test_rendered_credits_changed_credit(story):
+    rendered_credits(_fetch(story), 'script', url=False)
+    credit = StoryCredit.objects.get(story=story, credit_type_id=1)
+    credit.credited_as = 'W.'
+    credit.save()
+
+    assert rendered_credits(_fetch(story), 'script', url=False) == \
+           ['Writer (credited as W.)']
+
+
+@pytest.mark.django_db
+def test_rendered_credits_invalidated(story):
+    rendered_credits(_fetch(story), 'script', url=False)
+    invalidate_rendered_credits()
+
+    with mock.patch.object(CreatorNameDetail, 'display_credit',
+                           return_value='Other') as display:
+        assert rendered_credits(_fetch(story), 'script', url=False) == \
+               ['Other']
+    assert display.call_count == 1
+
+
+@pytest.mark.django_db
+def test_search_creator_credit_prefetched(story, django_assert_num_queries):
+    assert search_creator_credit(Story.objects.get(id=story.id), 'script') \
+           == 'Writer'
+
+    story = _fetch(story)
+    with django_assert_num_queries(0):
+        assert search_creator_credit(story, 'script') == 'Writer'
+        assert search_creator_credit(story, 'inks') == ''
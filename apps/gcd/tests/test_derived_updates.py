@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import mock
+
+from apps.gcd import derived_updates
+from apps.gcd.derived_updates import deferred_updates, record_updates
+
+
+def test_deferred_updates_queue_once():
+    callbacks = []
+    with mock.patch.object(derived_updates.transaction, 'on_commit',
+                           side_effect=callbacks.append), \
+         mock.patch.object(derived_updates,
+                           'update_derived_data') as update:
+        with deferred_updates():
+            record_updates(collaboration_story_ids=[2], collaborator_ids={5})
+            with deferred_updates():
+                record_updates(collaboration_story_ids=[2, 1],
+                               collaborator_ids={3})
+        for callback in callbacks:
+            callback()
+
+    update.assert_called_once_with({'collaboration_story_ids': [1, 2],
+                                    'collaborator_ids': [3, 5]})
+
+
+def test_updates_outside_deferral_run_after_commit():
+    callbacks = []
+    with mock.patch.object(derived_updates.transaction, 'on_commit',
+                           side_effect=callbacks.append), \
+         mock.patch.object(derived_updates,
+                           'update_derived_data') as update:
+        record_updates(collaborator_ids={3})
+        update.assert_not_called()
+        for callback in callbacks:
+            callback()
+
+    update.assert_called_once_with({'collaborator_ids': [3]})
+
+
+def test_updates_queued_as_job():
+    django_rq = mock.MagicMock()
+
+    with mock.patch.object(derived_updates.settings, 'INSTALLED_APPS',
+                           ['django_rq']), \
+         mock.patch.dict('sys.modules', {'django_rq': django_rq}):
+        derived_updates._queue_updates({'collaborator_ids': {3}})
+
+    django_rq.get_queue.return_value.enqueue.assert_called_once_with(
+      derived_updates.update_derived_data, {'collaborator_ids': [3]})
+
+
+def test_update_derived_data_collaborations():
+    with mock.patch.object(derived_updates,
+                           'update_story_collaborations') as update:
+        derived_updates.update_derived_data({'collaboration_story_ids': [2],
+                                             'collaborator_ids': [3]})
+
+    update.assert_called_once_with([2], [3])
+
+
+def test_update_derived_data_rollups():
+    with mock.patch.object(derived_updates,
+                           'update_story_rollups') as update:
+        derived_updates.update_derived_data({'rollup_story_ids': [2],
+                                             'rollup_creator_ids': [3],
+                                             'rollup_owner_story_ids': [2]})
+
+    update.assert_called_once_with([2], creator_ids=[3], character_ids=(),
+                                   group_ids=(), series_ids=(),
+                                   feature_ids=(), owner_story_ids=[2])
+
+
+def test_update_derived_data_issues_of_series():
+    with mock.patch.object(derived_updates, 'Series') as series_class, \
+         mock.patch.object(derived_updates,
+                           'invalidate_issue_pages') as invalidate:
+        series = series_class.objects.filter.return_value = [mock.MagicMock()]
+        derived_updates.update_derived_data({'issue_series_ids': [2, 3]})
+
+    series_class.objects.filter.assert_called_once_with(id__in=[2, 3])
+    series[0].set_prev_next_issues.assert_called_once_with()
+    series[0].set_issue_columns.assert_called_once_with()
+    invalidate.assert_called_once_with([2, 3])
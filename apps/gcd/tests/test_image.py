@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import pytest
+
+from apps.gcd.models import image
+
+
+@pytest.fixture
+def detectors():
+    image._face_detectors.clear()
+    create = mock.patch.object(image, '_create_face_detector',
+                               side_effect=lambda size: mock.MagicMock())
+    with create as create_face_detector:
+        yield create_face_detector
+    image._face_detectors.clear()
+
+
+def test_face_detector_reused_for_same_size(detectors):
+    with image.face_detector((300, 400)) as first:
+        pass
+    with image.face_detector((300, 400)) as second:
+        pass
+
+    assert first is second
+    assert detectors.call_count == 1
+    second.setInputSize.assert_not_called()
+
+
+def test_face_detector_adapted_to_other_size(detectors):
+    with image.face_detector((300, 400)) as first:
+        pass
+    with image.face_detector((500, 200)) as second:
+        pass
+
+    assert first is second
+    assert detectors.call_count == 1
+    second.setInputSize.assert_called_once_with((500, 200))
+
+
+def test_face_detector_exclusive_while_in_use(detectors):
+    with image.face_detector((300, 400)) as first:
+        with image.face_detector((300, 400)) as second:
+            assert first is not second
+    assert detectors.call_count == 2
+
+
+def test_face_detector_pool_is_bounded(detectors):
+    size = image.FACE_DETECTOR_POOL_SIZE + 2
+    contexts = [image.face_detector((i, i)) for i in range(size)]
+    for context in contexts:
+        context.__enter__()
+    for context in contexts:
+        context.__exit__(None, None, None)
+
+    assert sum(len(idle) for idle in image._face_detectors.values()) == \
+        image.FACE_DETECTOR_POOL_SIZE
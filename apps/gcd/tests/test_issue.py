@@ -2,14 +2,24 @@
 
 
 
+from datetime import date
+from decimal import Decimal
+
 import mock
 import pytest
 
 from django.db.models import QuerySet
-
-from apps.gcd.models import Series, Issue, Cover
-from apps.gcd.models.issue import INDEXED
+from django.test import RequestFactory
+
+from apps.gcd.models import Series, Issue, Cover, Story, StoryType
+from apps.gcd.models.issue import INDEXED, DATE_PRECISION_NONE, \
+                                  DATE_PRECISION_YEAR, DATE_PRECISION_MONTH, \
+                                  DATE_PRECISION_DAY, parse_issue_date, \
+                                  issues_for_iso_week, issues_for_month, \
+                                  set_indexed_statuses
+from apps.gcd.models.series import prev_next_issue_ids
 from apps.gcd.models.story import STORY_TYPES
+from apps.gcd.views.details import do_on_sale_monthly
 
 
 ISSUE_PATH = 'apps.gcd.models.issue.Issue'
@@ -555,3 +565,126 @@ def test_stat_counts_deleted(any_series):
     i = Issue(number='1', series=any_series)
     i.deleted = True
     assert i.stat_counts() == {}
+
+
+@pytest.mark.django_db
+def test_set_prev_next_issues(series):
+    a, variant, b, c = [
+      Issue.objects.create(number=number, series=series, sort_code=sort_code)
+      for sort_code, number in enumerate(['1', '1', '2', '3'])]
+    variant.variant_of = a
+    variant.save()
+
+    assert series.set_prev_next_issues() == 4
+    assert series.set_prev_next_issues() == 0
+    for issue in Issue.objects.filter(series=series):
+        assert issue.get_prev_next_issue() == issue._get_prev_next_issue()
+    assert Issue.objects.get(id=variant.id).get_prev_next_issue() == [None, b]
+
+    b.deleted = True
+    b.save()
+    assert series.set_prev_next_issues(save=False) == 3
+    assert series.set_prev_next_issues() == 3
+    assert Issue.objects.get(id=a.id).get_prev_next_issue() == [None, c]
+    assert Issue.objects.get(id=c.id).get_prev_next_issue() == [a, None]
+
+
+def test_prev_next_issue_ids():
+    # the variant 2 of 1 and the variant 4 of an issue of another series,
+    # which counts as a base issue
+    issues = [(1, 0, None, None), (2, 1, 1, 7), (3, 2, None, None),
+              (4, 3, 9, 8)]
+
+    assert prev_next_issue_ids(7, issues) == {1: (None, 3), 2: (None, 3),
+                                              3: (1, 4), 4: (3, None)}
+
+
+@pytest.mark.parametrize('issue_date, result', [
+    ('', (None, DATE_PRECISION_NONE)),
+    ('????-05-12', (None, DATE_PRECISION_NONE)),
+    ('1990-00-00', (date(1990, 1, 1), DATE_PRECISION_YEAR)),
+    ('1990', (date(1990, 1, 1), DATE_PRECISION_YEAR)),
+    ('1990-??-12', (date(1990, 1, 1), DATE_PRECISION_YEAR)),
+    ('1990-05-00', (date(1990, 5, 1), DATE_PRECISION_MONTH)),
+    ('1990-05', (date(1990, 5, 1), DATE_PRECISION_MONTH)),
+    ('1990-02-30', (date(1990, 2, 1), DATE_PRECISION_MONTH)),
+    ('1990-13-00', (date(1990, 12, 1), DATE_PRECISION_MONTH)),
+    ('1990-05-12', (date(1990, 5, 12), DATE_PRECISION_DAY)),
+])
+def test_parse_issue_date(issue_date, result):
+    assert parse_issue_date(issue_date) == result
+
+
+@pytest.mark.django_db
+def test_issues_on_sale(series):
+    # 2024-01-29 is the Monday of ISO week 5, which ends in February
+    issues = {
+      on_sale_date: Issue.objects.create(number=str(sort_code), series=series,
+                                         sort_code=sort_code,
+                                         on_sale_date=on_sale_date)
+      for sort_code, on_sale_date in enumerate(
+        ['2024-01-28', '2024-01-29', '2024-02', '2024-02-04', '2024-02-05',
+         '2024'])}
+
+    assert set(issues_for_iso_week(2024, 5)[0]) == {issues['2024-01-29'],
+                                                    issues['2024-02-04']}
+    assert set(issues_for_month(2024, 2)) == {
+      issues['2024-02'], issues['2024-02-04'], issues['2024-02-05']}
+
+    issue = issues['2024-02']
+    issue.on_sale_date = '2024-01-30'
+    issue.save(update_fields=['on_sale_date'])
+    assert issue in issues_for_iso_week(2024, 5)[0]
+
+
+@pytest.mark.django_db
+def test_on_sale_monthly_without_dated_issues(series):
+    Issue.objects.create(number='1', series=series, sort_code=1)
+
+    issues, context = do_on_sale_monthly(RequestFactory().get('/'), 2024, 2)
+
+    assert list(issues) == []
+    assert context['years'][-1] == 2024
+
+
+@pytest.mark.django_db
+def test_set_indexed_statuses(series,
+                              django_assert_max_num_queries):
+    comic_story = StoryType.objects.get_or_create(
+      id=19, defaults={'name': 'comic story', 'sort_code': 19})[0]
+    advertisement = StoryType.objects.get_or_create(
+      id=2, defaults={'name': 'advertisement', 'sort_code': 2})[0]
+    full = Issue.objects.create(number='1', series=series, sort_code=1,
+                                page_count=10)
+    variant = Issue.objects.create(number='1', series=series, sort_code=2,
+                                   variant_of=full, variant_name='Variant')
+    partial = Issue.objects.create(number='2', series=series, sort_code=3,
+                                   page_count=10)
+    empty = Issue.objects.create(number='3', series=series, sort_code=4,
+                                 is_indexed=INDEXED['partial'])
+    Story.objects.create(issue=full, type=comic_story, sequence_number=0,
+                         page_count=4)
+    Story.objects.create(issue=full, type=advertisement, sequence_number=1,
+                         page_count=2)
+    Story.objects.create(issue=partial, type=comic_story, sequence_number=0,
+                         page_count=Decimal('0.5'))
+    Story.objects.create(issue=partial, type=comic_story, sequence_number=1,
+                         page_count=9, deleted=True)
+    issues = list(Issue.objects.filter(series=series))
+    modified = max(issue.modified for issue in issues)
+
+    # stories, reprints, and the saves of the issues and variants
+    with django_assert_max_num_queries(7):
+        changed = set_indexed_statuses(issues)
+
+    assert {issue.id for issue in changed} == {full.id, partial.id, empty.id}
+    # the delta dumps select the changed issues by their modified time
+    assert set(Issue.objects.filter(modified__gt=modified)
+                            .values_list('id', flat=True)) == \
+           {full.id, variant.id, partial.id, empty.id}
+    assert dict(Issue.objects.values_list('id', 'is_indexed')) == {
+      full.id: INDEXED['full'], variant.id: INDEXED['full'],
+      partial.id: INDEXED['partial'], empty.id: INDEXED['skeleton']}
+    empty = Issue.objects.get(id=empty.id)
+    assert empty.index_delta(INDEXED['partial']) == -1
+    assert empty.set_indexed_status() == 0
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from django.core.cache import cache
+
+from apps.gcd.models import Issue
+from apps.gcd.views.issue_page import invalidate_issue_pages, \
+                                      load_issue_page
+
+
+@pytest.fixture
+def issues(series):
+    cache.clear()
+    issues = [Issue.objects.create(number=str(i), series=series, sort_code=i)
+              for i in (1, 3)]
+    series.set_prev_next_issues()
+    return issues
+
+
+def _load_issue_page(issue, preview=False):
+    return load_issue_page(Issue.objects.get(id=issue.id), preview=preview)
+
+
+@pytest.mark.django_db
+def test_load_issue_page(issues):
+    page = _load_issue_page(issues[0])
+
+    assert (page['prev_issue'], page['next_issue']) == (None, issues[1])
+    assert page['oi_indexers'] == []
+    assert page['cover_page'] == 1
+    assert page['variant_image_tags'] == []
+
+
+@pytest.mark.django_db
+def test_load_issue_page_cached(issues, django_assert_max_num_queries):
+    _load_issue_page(issues[0])
+    Issue.objects.create(number='2', series=issues[0].series, sort_code=2)
+    issues[0].series.set_prev_next_issues()
+
+    # only the variant covers are loaded
+    with django_assert_max_num_queries(2):
+        page = _load_issue_page(issues[0])
+    assert page['next_issue'] == issues[1]
+
+
+@pytest.mark.django_db
+def test_load_issue_page_invalidated(issues):
+    _load_issue_page(issues[0])
+    issue = Issue.objects.create(number='2', series=issues[0].series,
+                                 sort_code=2)
+    issue.series.set_prev_next_issues()
+    invalidate_issue_pages([issue.series_id])
+
+    assert _load_issue_page(issues[0])['next_issue'] == issue
+
+
+@pytest.mark.django_db
+def test_load_issue_page_preview(issues):
+    _load_issue_page(issues[0], preview=True)
+    issue = Issue.objects.create(number='2', series=issues[0].series,
+                                 sort_code=2)
+    issue.series.set_prev_next_issues()
+
+    page = _load_issue_page(issues[0], preview=True)
+    assert (page['next_issue'], page['cover_page']) == (issue, 0)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from django.core.cache import cache
+
+from apps.gcd.models import Issue
+from apps.gcd.templatetags.credits import render_markdown
+
+
+@pytest.fixture
+def issues(series):
+    cache.clear()
+    return [Issue.objects.create(number=str(i), series=series, sort_code=i,
+                                 publication_date='May 199%d' % i)
+            for i in (1, 2)]
+
+
+@pytest.mark.django_db
+def test_render_markdown_references(issues, django_assert_max_num_queries):
+    text = 'See [gcd_link_issue](%d), [gcd_link_issue_with_date](%d) and ' \
+           '[gcd_link_name_issue](%d){the second}.  [gcd_link_issue](0)' % (
+             issues[0].id, issues[1].id, issues[1].id)
+
+    # the issues are loaded together, with their series and publisher, the
+    # full names of the two issues check for their code numbers
+    with django_assert_max_num_queries(3):
+        html = render_markdown(text)
+
+    assert '<a href="%s">%s</a>' % (issues[0].get_absolute_url(),
+                                    issues[0].full_name()) in html
+    assert '%s (May 1992)</a>' % issues[1].full_name() in html
+    assert '<a href="%s">the second</a>' % issues[1].get_absolute_url() \
+           in html
+    assert 'No corresponding GCD object found: issue with id 0' in html
+
+
+@pytest.mark.django_db
+def test_render_markdown_cached(issues):
+    text = 'See [gcd_link_issue](%d).' % issues[0].id
+    assert render_markdown(text) == render_markdown(text)
+
+    issues[0].number = '1A'
+    issues[0].save()
+    assert '%s</a>' % Issue.objects.get(id=issues[0].id).full_name() in \
+           render_markdown(text)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Query budgets of the most visited pages, for three rows in each list.  The
+budgets are the current numbers with a little headroom, lower them when a
+page gets cheaper.  With more rows in the lists the number of queries must
+not grow, which catches N+1 patterns below the repeated query threshold.
+"""
+
+import mock
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.gcd.models import Publisher, Series, Issue, Story, StoryType
+from apps.middleware import query_count
+from apps.middleware.query_count import QueryCountMiddleware, count_queries
+from apps.stddata.models import Country
+
+
+@pytest.fixture
+def add_rows(country, language):
+    """
+    Adds rows to the lists of the pages, i.e. series of the publisher,
+    issues of the series and stories of the issue, and returns the issue.
+    """
+    publisher = Publisher.objects.create(
+        name='Budget Publishing', country=country, year_began=1990)
+    story_type, _ = StoryType.objects.get_or_create(
+        id=19, defaults={'name': 'comic story', 'sort_code': 19})
+    series = Series.objects.create(
+      name='Budget', sort_name='Budget', year_began=1990, country=country,
+      language=language, publisher=publisher, is_comics_publication=True,
+      has_gallery=False)
+    issue = Issue.objects.create(number='0', series=series, sort_code=0)
+
+    def add(count):
+        first = Story.objects.filter(issue=issue).count()
+        for i in range(first, first + count):
+            Series.objects.create(
+              name='Budget %d' % i, sort_name='Budget %d' % i,
+              year_began=1990, country=country, language=language,
+              publisher=publisher, is_comics_publication=True,
+              has_gallery=False)
+            Issue.objects.create(number=str(i + 1), series=series,
+                                 sort_code=i + 1)
+            Story.objects.create(issue=issue, sequence_number=i,
+                                 type=story_type, title='Story %d' % i)
+        return issue
+    return add
+
+
+def _page_queries(client, url):
+    cache.clear()
+    with count_queries() as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
+
+
+def _assert_budget(client, url, add_rows, query_budget, queries):
+    with query_budget(queries):
+        few = _page_queries(client, url)
+    add_rows(6)
+    many = _page_queries(client, url)
+    assert many <= few, \
+        "%d queries for 3 rows, %d for 9 rows" % (few, many)
+
+
+@pytest.mark.django_db
+def test_publisher_page_budget(client, add_rows, query_budget):
+    issue = add_rows(3)
+    _assert_budget(client, '/publisher/%d/' % issue.series.publisher.id,
+                   add_rows, query_budget, 22)
+
+
+@pytest.mark.django_db
+def test_series_page_budget(client, add_rows, query_budget):
+    issue = add_rows(3)
+    _assert_budget(client, '/series/%d/' % issue.series.id,
+                   add_rows, query_budget, 40)
+
+
+@pytest.mark.django_db
+def test_issue_page_budget(client, add_rows, query_budget):
+    issue = add_rows(3)
+    _assert_budget(client, '/issue/%d/' % issue.id,
+                   add_rows, query_budget, 40)
+
+
+def _view(queries):
+    def get_response(request):
+        for i in range(queries):
+            Country.objects.filter(id=i).exists()
+        return HttpResponse()
+    return get_response
+
+
+@pytest.mark.django_db
+def test_middleware_headers(settings):
+    settings.DEBUG = True
+    settings.QUERY_COUNT_REPEATED = 3
+    middleware = QueryCountMiddleware(_view(2))
+
+    response = middleware(RequestFactory().get('/'))
+
+    assert response['X-DB-Queries'] == '2'
+    assert response['X-DB-Repeated-Queries'] == '0'
+
+
+@pytest.mark.django_db
+def test_middleware_logs_repeated_queries(settings):
+    settings.DEBUG = False
+    settings.QUERY_COUNT_REPEATED = 3
+    middleware = QueryCountMiddleware(_view(3))
+
+    with mock.patch.object(query_count, 'logger') as logger:
+        response = middleware(RequestFactory().get('/page/'))
+
+    assert 'X-DB-Queries' not in response
+    message = logger.warning.call_args[0][0]
+    assert message.startswith('/page/: 3 queries')
+    assert '3x SELECT' in message
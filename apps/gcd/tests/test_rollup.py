@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from apps.gcd.models import (
+    Character, CharacterNameDetail, CharacterSeriesRollup,
+    CreatorFeatureRollup, CreatorSeriesRollup, Feature, FeatureType,
+    StoryCharacter, StoryCredit)
+from apps.gcd.models.rollup import (
+    update_character_rollups, update_creator_rollups, update_story_rollups)
+from .test_creator import _creator, _story
+
+
+def _character(series):
+    character = Character.objects.create(
+      name='Hero', sort_name='Hero', disambiguation='',
+      language=series.language, description='', notes='')
+    CharacterNameDetail.objects.create(name='Hero', character=character,
+                                       is_official_name=True)
+    return character
+
+
+def _appearance(story, character):
+    StoryCharacter.objects.create(
+      story=story, character=character.character_names.get(), notes='')
+
+
+@pytest.mark.django_db
+def test_update_creator_rollups(series):
+    writer = _creator('Writer')
+    feature = Feature.objects.create(
+      name='Adventures', sort_name='Adventures', genre='',
+      language=series.language, description='', notes='',
+      feature_type=FeatureType.objects.get_or_create(
+        id=1, defaults={'name': 'character'})[0])
+    first = _story(series, '1990-02-00', [(writer, 1), (writer, 2)])
+    first.feature_object.add(feature)
+    _story(series, '1990-01-00', [(writer, 1)])
+    _story(series, '1990-03-00', [(writer, 3)])
+
+    assert update_creator_rollups(writer) == 2
+
+    rollup = CreatorSeriesRollup.objects.get(creator=writer)
+    assert rollup.series == series
+    assert (rollup.issue_count, rollup.script, rollup.pencils,
+            rollup.inks) == (3, 2, 1, 1)
+    assert (rollup.first_key_date, rollup.last_key_date) == \
+           ('1990-01-00', '1990-03-00')
+    rollup = CreatorFeatureRollup.objects.get(creator=writer)
+    assert (rollup.feature, rollup.issue_count, rollup.pencils) == \
+           (feature, 1, 1)
+
+
+@pytest.mark.django_db
+def test_update_creator_rollups_writes_only_changes(series):
+    writer = _creator('Writer')
+    _story(series, '1990-01-00', [(writer, 1)])
+    update_creator_rollups(writer)
+
+    assert update_creator_rollups(writer) == 0
+    StoryCredit.objects.update(deleted=True)
+    assert update_creator_rollups(writer, series_ids=[series.id]) == 1
+    assert not CreatorSeriesRollup.objects.exists()
+
+
+@pytest.mark.django_db
+def test_update_story_rollups(series):
+    writer = _creator('Writer')
+    character = _character(series)
+    story = _story(series, '1990-01-00', [(writer, 1)])
+    _appearance(story, character)
+    _appearance(_story(series, '1990-02-00', []), character)
+
+    update_story_rollups([story.id], creator_ids=())
+
+    assert not CreatorSeriesRollup.objects.exists()
+    rollup = CharacterSeriesRollup.objects.get(character=character)
+    assert (rollup.issue_count, rollup.first_key_date) == (2, '1990-01-00')
+
+
+@pytest.mark.django_db
+def test_update_story_rollups_of_owner_stories(series):
+    writer, artist = _creator('Writer'), _creator('Artist')
+    character = _character(series)
+    story = _story(series, '1990-01-00', [(writer, 1)])
+    _appearance(story, character)
+    other = _story(series, '1990-02-00', [(artist, 2)])
+
+    update_story_rollups([story.id, other.id], creator_ids=[artist.id],
+                         character_ids=(), group_ids=(),
+                         owner_story_ids=[story.id])
+
+    assert set(CreatorSeriesRollup.objects.values_list('creator', flat=True)) \
+        == {writer.id, artist.id}
+    assert CharacterSeriesRollup.objects.get().character == character
+
+
+@pytest.mark.django_db
+def test_series_lists_read_rollups(client, series):
+    writer = _creator('Writer')
+    character = _character(series)
+    story = _story(series, '1990-01-00', [(writer, 2)])
+    _appearance(story, character)
+    update_creator_rollups(writer)
+    update_character_rollups(character)
+
+    creator_page = client.get('/creator/%d/series/' % writer.id)
+    character_page = client.get('/character/%d/series/' % character.id)
+
+    assert 'pencils (1)' in creator_page.content.decode()
+    assert 'Team Ups' in character_page.content.decode()
@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
+import re
+
 import pytest
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import RequestFactory
 
 from apps.stddata.models import Country, Language, Script
@@ -9,7 +14,7 @@ from apps.gcd.models import (
 )
 from apps.gcd.models.creator import Creator, CreatorNameDetail
 from apps.gcd.models.story import CREDIT_TYPES
-from apps.gcd.views.search import do_advanced_search
+from apps.gcd.views.search import cached_advanced_search, do_advanced_search
 
 CREATOR = 'Test Person A'
 
@@ -25,12 +30,16 @@ SEARCH_FIELD = {
 }
 
 
-def advanced_search(**fields):
+def _request(**fields):
     request = RequestFactory().get(
         '/search/advanced/process/',
         dict({'target': 'sequence', 'method': 'icontains'}, **fields))
     request.user = AnonymousUser()
-    items, _target = do_advanced_search(request)
+    return request
+
+
+def advanced_search(**fields):
+    items, _target = do_advanced_search(_request(**fields))
     return set(items.values_list('id', flat=True))
 
 
@@ -123,3 +132,50 @@ def test_empty_creator_segments_do_not_match_every_credit(
 
 def test_unmatched_creator_returns_no_stories(credited_stories):
     assert advanced_search(script='Test Person Absent') == set()
+
+
+def test_cached_advanced_search(credited_stories):
+    cache.clear()
+    items, count, target = cached_advanced_search(
+        _request(script=CREATOR, order1='series'))
+    assert (list(items), count, target) == (
+        [credited_stories['script']], 1, 'sequence')
+
+    # a later page of the same search uses the cached ids
+    StoryCredit.objects.filter(
+        story=credited_stories['script']).update(deleted=True)
+    items, count, target = cached_advanced_search(
+        _request(script=CREATOR, order1='series', page='2'))
+    assert (list(items), count) == ([credited_stories['script']], 1)
+
+    items, count, target = cached_advanced_search(
+        _request(script=CREATOR, order1='date'))
+    assert (list(items), count) == ([], 0)
+
+
+def test_cached_advanced_search_selects_page_ids(credited_stories):
+    cache.clear()
+    stories = sorted(credited_stories.values(), key=lambda story: story.id)
+    items, count, target = cached_advanced_search(
+        _request(series='Test Series', order1='series'))
+    assert count == len(stories)
+    # the order of the search, whose ties are up to the database
+    ids = items.cached_ids
+
+    with CaptureQueriesContext(connection) as context:
+        items, count, target = cached_advanced_search(
+            _request(series='Test Series', order1='series', page='2'))
+        assert count == len(stories)
+        page = items[2:4]
+    assert [story.id for story in page] == ids[2:4]
+    # only the ids of the page, without running the search again
+    assert len(context.captured_queries) == 1
+    selected = re.search(r'IN \(([^)]*)\)',
+                         context.captured_queries[0]['sql']).group(1)
+    assert sorted(selected.replace(' ', '').split(',')) == \
+        sorted(str(id) for id in ids[2:4])
+
+    # a sorted table selects from all ids
+    items, count, target = cached_advanced_search(
+        _request(series='Test Series', order1='series', sort='title'))
+    assert list(items.order_by('-id')) == stories[::-1]
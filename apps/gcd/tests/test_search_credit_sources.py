@@ -12,7 +12,7 @@ from apps.gcd.models import (
 from apps.gcd.models.creator import Creator, CreatorNameDetail
 from apps.gcd.models.issue import IssueCredit
 from apps.gcd.models.story import CREDIT_TYPES
-from apps.gcd.views.search import do_advanced_search, _linked_story_ids
+from apps.gcd.views.search import do_advanced_search, _linked_credit_stories
 
 CREATOR = 'Test Person A'
 
@@ -97,19 +97,47 @@ def test_credit_is_linked_picks_the_credit_source(credit_is_linked, expected,
     assert matched == {linked_and_text[k].id for k in expected}
 
 
-def test_linked_story_ids_materializes_the_creator_ids(linked_and_text):
-    # Creator ids must be materialized before the story lookup; a lazy
-    # queryset becomes IN (subquery), which MySQL optimizes poorly. See
-    # https://docs.djangoproject.com/en/5.2/ref/models/querysets/#nested-queries-performance
+def test_linked_credit_stories_is_a_semi_join(linked_and_text):
+    # Only the creator ids are materialized; the story ids stay in the
+    # database as a subquery on the credits instead of a list of literals.
     with CaptureQueriesContext(connection) as ctx:
-        stories = _linked_story_ids(CREATOR, 'script', 'icontains')
+        stories = _linked_credit_stories(CREATOR, 'script', 'icontains')
+
+    queries = [q['sql'] for q in ctx.captured_queries]
+    assert len(queries) == 1
+    assert 'creator_name_detail' in queries[0]
+    assert list(stories.values_list('story_id', flat=True)) == \
+        [linked_and_text['linked'].id]
+    assert _linked_credit_stories('Test Person Absent', 'script',
+                                  'icontains') is None
+
+
+def test_linked_credit_stories_materializes_the_story_ids(linked_and_text):
+    # Under an OR the subquery cannot run as a semi-join, the ids are
+    # fetched instead and appear as literals in the search.
+    with CaptureQueriesContext(connection) as ctx:
+        stories = _linked_credit_stories(CREATOR, 'script', 'icontains',
+                                         materialize=True)
 
     assert stories == [linked_and_text['linked'].id]
     queries = [q['sql'] for q in ctx.captured_queries]
     assert len(queries) == 2
-    # Ids appear as literals in the story query, not as a nested subquery.
     assert 'creator_name_detail' in queries[0]
     assert 'creator_name_detail' not in queries[1]
+    assert _linked_credit_stories(CREATOR, 'pencils', 'icontains',
+                                  materialize=True) is None
+
+
+def test_both_credit_sources_search_without_credit_subquery(linked_and_text):
+    request = RequestFactory().get(
+        '/search/advanced/process/',
+        {'target': 'sequence', 'method': 'icontains', 'script': CREATOR,
+         'credit_is_linked': BOTH})
+    request.user = AnonymousUser()
+    items, _target = do_advanced_search(request)
+
+    assert 'gcd_story_credit' not in str(items.query)
+    assert set(items) == set(linked_and_text.values())
 
 
 def test_issue_editing_matches_stories_of_the_edited_issue(world):
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import pytest
+
+from apps.gcd import search_updates
+from apps.gcd.models import Series, Story
+from apps.gcd.search_updates import QueuedSignalProcessor, \
+                                    display_object_committed, \
+                                    update_search_objects
+
+
+@pytest.fixture
+def processor():
+    router = mock.MagicMock()
+    router.for_write.return_value = ['default']
+    processor = QueuedSignalProcessor(mock.MagicMock(), router)
+    yield processor
+    processor.teardown()
+
+
+def test_processor_queues_transaction_together(processor):
+    callbacks = []
+    story = Story(id=2)
+    with mock.patch.object(search_updates.transaction, 'on_commit',
+                           side_effect=callbacks.append), \
+         mock.patch.object(search_updates, '_queue_keys') as queue_keys:
+        display_object_committed.send(sender=Story, instance=story)
+        display_object_committed.send(sender=Series, instance=Series(id=1))
+        display_object_committed.send(sender=Story, instance=story)
+        for callback in callbacks:
+            callback()
+
+    queue_keys.assert_called_once_with(['gcd.series:1', 'gcd.story:2'],
+                                       'default')
+
+
+def test_queue_keys_without_queue():
+    with mock.patch.object(search_updates.settings, 'INSTALLED_APPS',
+                           ['apps.gcd']), \
+         mock.patch.object(search_updates,
+                           'update_search_objects') as update:
+        search_updates._queue_keys(['gcd.story:2'], 'default')
+
+    update.assert_called_once_with(['gcd.story:2'], using='default')
+
+
+def test_queue_keys_queues_job_once():
+    django_rq = mock.MagicMock()
+    pipeline = django_rq.get_connection.return_value.pipeline.return_value\
+                        .__enter__.return_value
+    pipeline.execute.side_effect = [[1, True], [1, None]]
+
+    with mock.patch.object(search_updates.settings, 'INSTALLED_APPS',
+                           ['django_rq']), \
+         mock.patch.dict('sys.modules', {'django_rq': django_rq}):
+        search_updates._queue_keys(['gcd.story:2'], 'default')
+        search_updates._queue_keys(['gcd.story:3'], 'default')
+
+    django_rq.get_queue.return_value.enqueue.assert_called_once_with(
+      search_updates.update_search_index, 'default')
+
+
+@pytest.mark.django_db
+def test_update_search_objects(series):
+    connection = mock.MagicMock()
+    index = connection.get_unified_index.return_value.get_index.return_value
+    index.index_queryset.return_value = Series.objects.all()
+    backend = connection.get_backend.return_value
+
+    with mock.patch.object(search_updates, 'connections',
+                           {'default': connection}):
+        update_search_objects(['gcd.series:%d' % series.id,
+                               'gcd.series:%d' % (series.id + 1)])
+
+    backend.update.assert_called_once_with(index, [series])
+    backend.remove.assert_called_once_with('gcd.series.%d' % (series.id + 1))
@@ -6,10 +6,12 @@ import itertools
 import mock
 import pytest
 
+from django.core.cache import cache
 from django.db.models import QuerySet, Count
 
 from apps.gcd.models import Series, Issue, Story
 from apps.gcd.models.issue import INDEXED
+from apps.gcd.views.details import load_series_timeline
 
 
 SERIES_PATH = 'apps.gcd.models.series.Series'
@@ -325,3 +327,47 @@ def test_set_first_last_issues_nonempty():
         assert s.first_issue is i1
         assert s.last_issue is i2
         s.save.assert_called_once_with()
+
+
+@pytest.mark.django_db
+def test_present_issue_columns(series):
+    Issue.objects.create(number='1', series=series, sort_code=1,
+                         volume='2', isbn='9780000000002', rating='All Ages')
+    Issue.objects.create(number='2', series=series, sort_code=2,
+                         title='Deleted', deleted=True)
+    series.has_volume = True
+    series.has_issue_title = True
+
+    assert series.present_issue_columns() == {'volume'}
+    assert Series.objects.get(id=series.id).issue_columns == 0b10001001
+
+    series.has_isbn = True
+    series.has_rating = True
+    assert series.present_issue_columns() == {'volume', 'isbn', 'rating'}
+
+
+@pytest.mark.django_db
+def test_load_series_timeline(series,
+                              django_assert_num_queries):
+    cache.clear()
+    for sort_code, key_date in enumerate(['2001-12-00', '2001-11-15',
+                                          '2002-02-00', '1700-01-00',
+                                          'unknown', '']):
+        Issue.objects.create(number=str(sort_code), series=series,
+                             sort_code=sort_code, key_date=key_date)
+
+    # the issue dates, the issues and their brand emblems
+    with django_assert_num_queries(3):
+        rows, left_over, bad_dates = load_series_timeline(series)
+    # only the ids of the issues are cached
+    with django_assert_num_queries(2):
+        assert load_series_timeline(series)[0] == rows
+
+    assert [(row['date'].isoformat(), [issue.number
+                                       for issue in row['issues']])
+            for row in rows] == [('2001-11-01', ['1']),
+                                 ('2001-12-01', ['0']),
+                                 ('2002-01-01', []),
+                                 ('2002-02-01', ['2'])]
+    assert [issue.number for issue in left_over] == ['3', '4', '5']
+    assert bad_dates == 2
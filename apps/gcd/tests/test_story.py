@@ -5,7 +5,13 @@
 import mock
 import pytest
 
-from apps.gcd.models import Story, Issue, Series
+from apps.gcd.models import (
+    Story, Issue, Series, Character, CharacterNameDetail, CharacterOrder,
+    CharacterOrderType, CharacterRelation, CharacterRelationType, Group,
+    GroupNameDetail, StoryCharacter, StoryGroup, StoryType)
+from apps.gcd.models.story import (
+    CharacterThroughOrder, batch_appearing_characters,
+    process_appearing_characters, process_ordered_appearing_characters)
 
 STORY_PATH = 'apps.gcd.models.story.Story'
 
@@ -56,3 +62,93 @@ def test_to_issue_reprints(re_story_mocks):
     r = s.to_issue_reprints
     assert r == to_mock.all().filter.return_value
     to_mock.all().filter.assert_called_once_with(target=None)
+
+
+def _appearance(story, name, group_name=None):
+    character = Character.objects.create(
+      name=name, sort_name=name, disambiguation='',
+      language=story.issue.series.language, description='', notes='')
+    appearance = StoryCharacter.objects.create(
+      story=story, notes='', character=CharacterNameDetail.objects.create(
+        name=name, sort_name=name, character=character,
+        is_official_name=True))
+    if group_name:
+        appearance.group_name.add(group_name)
+    return appearance
+
+
+@pytest.fixture
+def team_story(series):
+    issue = Issue.objects.create(number='1', series=series, sort_code=1)
+    story = Story.objects.create(
+      issue=issue, sequence_number=1, type=StoryType.objects.get_or_create(
+        id=19, defaults={'name': 'comic story', 'sort_code': 19})[0])
+    group = Group.objects.create(
+      name='Team', sort_name='Team', disambiguation='',
+      language=series.language, description='', notes='')
+    group_name = GroupNameDetail.objects.create(
+      name='Team', sort_name='Team', group=group, is_official_name=True)
+    StoryGroup.objects.create(story=story, group_name=group_name, notes='')
+
+    appearances = {name: _appearance(story, name, group_name)
+                   for name in ('Member B', 'Member A')}
+    appearances.update({name: _appearance(story, name)
+                        for name in ('Spider', 'Peter', 'Solo')})
+    CharacterRelation.objects.create(
+      from_character=appearances['Spider'].character.character,
+      to_character=appearances['Peter'].character.character, notes='',
+      relation_type=CharacterRelationType.objects.get_or_create(
+        id=2, defaults={'type': 'civilian identity',
+                        'reverse_type': 'alias'})[0])
+    return story, appearances
+
+
+def _names(character_list):
+    return [(character.character.name,
+             [civilian.character.name for civilian in civilians])
+            for character, civilians, universe in character_list]
+
+
+@pytest.mark.django_db
+def test_process_appearing_characters(team_story):
+    story, appearances = team_story
+
+    group_list, character_list = process_appearing_characters(story)
+
+    assert [group.group_name.name for group, _, _ in group_list] == ['Team']
+    assert _names(group_list[0][2]) == [('Member A', []), ('Member B', [])]
+    # the civilian identity is shown with its alias
+    assert _names(character_list) == [('Solo', []), ('Spider', ['Peter'])]
+
+
+@pytest.mark.django_db
+def test_process_ordered_appearing_characters(team_story):
+    story, appearances = team_story
+    order = CharacterOrder.objects.create(
+      story=story, type=CharacterOrderType.objects.get_or_create(
+        name='Importance')[0])
+    for order_code, name in enumerate(['Spider', 'Member B']):
+        CharacterThroughOrder.objects.create(
+          order=order, story_character=appearances[name],
+          order_code=order_code)
+
+    group_list, character_list = process_ordered_appearing_characters(order)
+
+    assert _names(group_list[0][2]) == [('Member B', []), ('Member A', [])]
+    assert _names(character_list) == [('Spider', ['Peter']), ('Solo', [])]
+
+
+@pytest.mark.django_db
+def test_batch_appearing_characters(team_story, django_assert_num_queries):
+    story, appearances = team_story
+    other_story = Story.objects.create(issue=story.issue, sequence_number=2,
+                                       type=story.type)
+    _appearance(other_story, 'Other')
+    stories = list(Story.objects.filter(issue=story.issue)
+                                .order_by('sequence_number'))
+    batch_appearing_characters([None] + stories)
+
+    process_appearing_characters(stories[0])
+    with django_assert_num_queries(0):
+        group_list, character_list = process_appearing_characters(stories[1])
+    assert _names(character_list) == [('Other', [])]
@@ -111,9 +111,13 @@ class ResponsePaginator(object):
     http://bitbucket.org/miracle2k/djutils/src/tip/djutils/pagination.py.
     We could reconsider writing our own code.
     """
-    def __init__(self, queryset, vars=None, per_page=100, alpha=False):
+    def __init__(self, queryset, vars=None, per_page=100, alpha=False,
+                 count=None):
         self.vars = vars or {}
         self.p = DiggPaginator(queryset, per_page, body=7, padding=2, tail=1)
+        if count is not None:
+            # an already known count of the queryset
+            self.p.count = count
         if alpha:
             alpha_paginator = AlphaPaginator(queryset, per_page=per_page)
             self.vars['alpha_paginator'] = alpha_paginator
@@ -141,11 +145,8 @@ class ResponsePaginator(object):
                         alpha_page = self.alpha_paginator.page(alpha_page_num)
                         self.vars['pagination_type'] = 'alpha'
                         self.vars['alpha_page'] = alpha_page
-                        issue_count = self.alpha_paginator.number_offset
-                        for i in range(1, alpha_page_num):
-                            issue_count += \
-                              self.alpha_paginator.page(i).count
-                        page_num = int(issue_count/self.p.per_page) + 1
+                        page_num = int(alpha_page.offset /
+                                       self.p.per_page) + 1
                     except ValueError:
                         page_num = 1
                 else:
@@ -1,75 +1,63 @@
 import string
 from django.core.paginator import InvalidPage
+from django.db.models import Count
+from django.db.models.functions import Collate, Substr
 
 # alphabetical pagination is based on
 # https://djangosnippets.org/snippets/2732/
 
-# the get_field-routine comes from
-# http://stackoverflow.com/questions/20235807/how-to-get-foreign-key-values-with-getattr-from-models
-
-
-def get_repr(value):
-    if callable(value):
-        return '%s' % value()
-    return value
-
-
-def get_field(instance, field):
-    field_path = field.split('__')
-    attr = instance
-    for elem in field_path:
-        try:
-            attr = get_repr(getattr(attr, elem))
-        except AttributeError:
-            return None
-    return attr
+# the first characters are grouped and compared as they are stored, the
+# default collation would merge upper and lower case and accented letters
+BINARY_COLLATION = 'utf8mb4_bin'
 
 
 class AlphaPaginator(object):
-    """Pagination for string-based objects"""
+    """
+    Pagination for string-based objects.
+
+    The objects are counted per first character of the first model ordering
+    key with one aggregate query and the characters folded into upper case
+    letters, a page only fetches the objects of its letters when its
+    object_list is used.
+    """
 
     def __init__(self, queryset, per_page=25, orphans=0,
                  allow_empty_first_page=True):
         # ignore allow_empty_first_page and orphans, just here for compliance
         self.page_range = []
         self.object_list = queryset
-        self.count = len(self.object_list)
         self.number_offset = 0
-
-        # chunk up the objects so we don't need to iterate over the whole list
-        # for each letter
-        chunks = {}
-
-        # we sort them by the first model ordering key
-        for obj in self.object_list:
-            if queryset:
-                obj_str = str(get_field(obj, obj._meta.ordering[0]))
-            else:
-                obj_str = str(obj)
-
-            letter = str.upper(obj_str[0])
-
-            if letter not in chunks:
-                chunks[letter] = []
-
-            chunks[letter].append(obj)
+        self.field = queryset.model._meta.ordering[0].lstrip('-')
+
+        letter_counts = {}
+        # the stored first characters of each letter, to select its objects
+        self.letter_chars = {}
+        counts = self._with_letter(queryset.order_by()).values_list(
+          'alpha_letter').annotate(count=Count('pk', distinct=True))
+        for char, count in counts:
+            # empty strings and NULLs have no first letter
+            letter = str.upper(char) if char else ''
+            letter_counts[letter] = letter_counts.get(letter, 0) + count
+            if char:
+                self.letter_chars.setdefault(letter, []).append(char)
+        self.count = sum(letter_counts.values())
 
         # the process for assigning objects to each page
         current_page = NamePage(self)
 
         for letter in string.ascii_uppercase:
-            if letter not in chunks:
-                current_page.add([], letter)
+            if letter not in letter_counts:
+                current_page.add(0, letter)
                 continue
 
-            # the items in object_list starting with this letter
-            sub_list = chunks[letter]
+            # the number of objects starting with this letter
+            letter_count = letter_counts[letter]
 
-            new_page_count = len(sub_list) + current_page.count
-            # First, check to see if sub_list will fit or it needs to go onto
-            # a new page. If assigning this list will cause the page to
+            new_page_count = letter_count + current_page.count
+            # First, check to see if the letter will fit or it needs to go
+            # onto a new page. If assigning it will cause the page to
             # overflow and an underflow is closer to per_page than an overflow.
-            # and the page isn't empty (which means len(sub_list) > per_page)
+            # and the page isn't empty (which means letter_count > per_page)
             if new_page_count > per_page and current_page.count > 0 and \
               abs(per_page - current_page.count) < \
               abs(per_page - new_page_count):
@@ -77,17 +65,35 @@ class AlphaPaginator(object):
                 self.page_range.append(current_page)
                 current_page = NamePage(self)
 
-            current_page.add(sub_list, letter)
+            current_page.add(letter_count, letter)
 
         # count issues for non-ASCII-letters start of series numbers
-        for letter in chunks:
+        for letter in letter_counts:
             if letter not in string.ascii_uppercase:
-                self.number_offset += len(chunks[letter])
+                self.number_offset += letter_counts[letter]
 
         # if we finished the for loop with a page that isn't empty, add it
         if current_page.count > 0:
             self.page_range.append(current_page)
 
+        # the number of objects before each page, to find the matching
+        # page of the numbered pagination
+        offset = self.number_offset
+        for page in self.page_range:
+            page.offset = offset
+            offset += page.count
+
+    def _with_letter(self, queryset):
+        return queryset.annotate(alpha_letter=Collate(
+          Substr(self.field, 1, 1), BINARY_COLLATION))
+
+    def letter_objects(self, letters):
+        """Returns the objects starting with one of the letters."""
+        chars = [char for letter in letters
+                 for char in self.letter_chars.get(letter, [])]
+        return self._with_letter(self.object_list).filter(
+          alpha_letter__in=chars)
+
     def page(self, num):
         """Returns a Page object for the given 1-based page number."""
         if len(self.page_range) == 0:
@@ -106,12 +112,13 @@ class AlphaPaginator(object):
 class NamePage(object):
     def __init__(self, paginator):
         self.paginator = paginator
-        self.object_list = []
+        self.count = 0
+        self.offset = 0
         self.letters = []
 
     @property
-    def count(self):
-        return len(self.object_list)
+    def object_list(self):
+        return self.paginator.letter_objects(self.letters)
 
     @property
     def start_letter(self):
@@ -136,7 +143,7 @@ class NamePage(object):
     # just added the methods I needed to use in the templates
     # feel free to add the ones you need too
     def has_other_pages(self):
-        return len(self.object_list) > 0
+        return self.count > 0
 
     def has_previous(self):
         return self.paginator.page_range.index(self)
@@ -150,9 +157,8 @@ class NamePage(object):
     def previous_page_number(self):
         return self.paginator.page_range.index(self)
 
-    def add(self, new_list, letter=None):
-        if len(new_list) > 0:
-            self.object_list = self.object_list + new_list
+    def add(self, count, letter=None):
+        self.count += count
         if letter:
             self.letters.append(letter)
 
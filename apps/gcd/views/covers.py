@@ -1,11 +1,21 @@
 # -*- coding: utf-8 -*-
+import time
+from random import randint
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Max
 from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape as esc
 
 from apps.gcd.models.cover import ZOOM_SMALL, ZOOM_MEDIUM, ZOOM_LARGE
 from apps.oi import states
 
+RANDOM_COVER_VERSION_KEY = 'random_cover_version'
+# the id ranges depend on stories and issues as well, whose changes do not
+# drop them, so they are kept for a short time only
+RANDOM_COVER_TIMEOUT = 60 * 10
+
 
 def get_generic_image_tag(image, alt_text):
     img_class = 'cover_img'
@@ -135,3 +145,49 @@ def get_image_tags_per_page(page, series=None):
                                                        alt_string,
                                                        ZOOM_SMALL)])
     return cover_tags
+
+
+def _random_cover_version():
+    version = cache.get(RANDOM_COVER_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(RANDOM_COVER_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_random_covers():
+    """
+    Drop the cached id ranges of random_object, needs to be called when
+    covers are added, moved or deleted.
+    """
+    cache.set(RANDOM_COVER_VERSION_KEY, time.time_ns(), None)
+
+
+def random_object(objects, key):
+    """
+    Select a random object of the queryset, e.g. a cover or an issue with
+    a cover, without counting or fetching all of its rows.
+
+    The id range of the objects is cached under the key, which needs to
+    identify the queryset, e.g. 'series__publisher-123'.  A random id within
+    the range is probed with an indexed lookup of the first object with at
+    least this id, the cost does not grow with the number of objects.
+    Objects after larger gaps in the ids are picked more often, which is
+    fine for showing a random cover.
+    """
+    cache_key = 'random_cover:%s:%d' % (key, _random_cover_version())
+    id_range = cache.get(cache_key)
+    if id_range is None:
+        id_range = objects.aggregate(first=Min('id'), last=Max('id'))
+        id_range = (id_range['first'], id_range['last'])
+        cache.set(cache_key, id_range, RANDOM_COVER_TIMEOUT)
+    first, last = id_range
+    if first is None:
+        return None
+    objects = objects.order_by('id')
+    # objects deleted or moved since the range was cached can leave the
+    # probe without a match, in which case we wrap around
+    selected = objects.filter(id__gte=randint(first, last)).first()
+    if selected is None:
+        selected = objects.first()
+    return selected
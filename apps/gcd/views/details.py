@@ -5,20 +5,21 @@
 import re
 from urllib.parse import urlencode, quote
 from datetime import date, datetime, time, timedelta
+from calendar import monthrange
 from operator import attrgetter
-from random import randint, choice
+from random import choice
 
 from django.db.models import F, Q, Min, Count, Sum, Case, When, Value, \
                              OuterRef, Subquery
 from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.cache import cache
 import django.urls as urlresolvers
 from django.shortcuts import get_object_or_404, \
                              render
 from django.http import HttpResponseRedirect, Http404, JsonResponse, \
                         HttpResponse
 from django.contrib.auth.models import User
-from django.contrib.contenttypes.models import ContentType
 from django.template.defaultfilters import pluralize
 from django.views.decorators.clickjacking import xframe_options_sameorigin
 from django.utils.safestring import mark_safe
@@ -33,12 +34,11 @@ from djqscsv import render_to_csv_response
 from taggit.models import Tag, TaggedItem
 
 from apps.indexer.views import ViewTerminationError
-from apps.indexer.models import Indexer
 
 from apps.stddata.models import Country, Language
 from apps.stats.models import CountStats
 
-from apps.gcd.models import Publisher, Series, Issue, StoryType, Image, \
+from apps.gcd.models import Publisher, Series, Issue, StoryType, \
                             IndiciaPublisher, Brand, BrandGroup, BrandUse, \
                             Cover, \
                             SeriesBond, Award, Creator, CreatorMembership, \
@@ -56,7 +56,8 @@ from apps.gcd.models import Publisher, Series, Issue, StoryType, Image, \
 from apps.gcd.models.creator import GenericCreatorTable, \
                                     GenericCreatorNameTable, \
                                     CreatorPortraitTable, \
-                                    NAME_TYPES
+                                    NAME_TYPES, COLLABORATION_ROLES, \
+                                    co_creators
 from apps.gcd.models.character import CharacterTable, CreatorCharacterTable, \
                                       UniverseCharacterTable, \
                                       UniverseGroupTable, \
@@ -90,14 +91,16 @@ from apps.gcd.models.publisher import BrandEmblemPublisherTable, \
                                       DailyChangesPublisherTable
 from apps.gcd.models.series import SeriesTable, CreatorSeriesTable, \
                                    CharacterSeriesTable, GroupSeriesTable, \
-                                   DailyChangesSeriesTable
+                                   DailyChangesSeriesTable, ISSUE_COLUMNS
 from apps.gcd.models.story import CREDIT_TYPES, CORE_TYPES, AD_TYPES, \
-                                  StoryTable
+                                  StoryTable, batch_appearing_characters
 from apps.gcd.views import paginate_response, ORDER_CHRONO, \
                            ResponsePaginator
 from apps.gcd.views.covers import get_image_tag, get_generic_image_tag, \
                                   get_image_tags_per_issue, \
-                                  get_image_tags_per_page
+                                  get_image_tags_per_page, random_object
+from apps.gcd.views.issue_page import COVERS_PER_GALLERY_PAGE, \
+                                      load_issue_page, series_page_version
 from apps.gcd.models.cover import CoverIssuePublisherTable, \
                                   CoverIssueStoryTable, \
                                   CoverIssueStoryPublisherTable, \
@@ -115,7 +118,7 @@ from apps.oi.models import IssueRevision, SeriesRevision, PublisherRevision, \
                            CTYPES
 from apps.select.views import KeywordUsedFilter, filter_series, \
                               filter_issues, filter_covers, filter_sequences, \
-                              FilterForLanguage, \
+                              FilterForLanguage, SequenceFilter, \
                               process_story_type_filter_from_request
 
 KEY_DATE_REGEXP = \
@@ -124,8 +127,9 @@ KEY_DATE_REGEXP = \
 # TODO: Pull this from the DB somehow, but not on every page load.
 MIN_GCD_YEAR = 1800
 
+SERIES_TIMELINE_TIMEOUT = 60 * 60 * 24
+
 COVER_TABLE_WIDTH = 5
-COVERS_PER_GALLERY_PAGE = 50
 
 IS_EMPTY = '[IS_EMPTY]'
 IS_NONE = '[IS_NONE]'
@@ -191,8 +195,9 @@ def get_gcd_object(model, object_id, model_name=None):
 
 
 def generic_sortable_list(request, items, table, template, context,
-                          per_page=100):
-    paginator = ResponsePaginator(items, per_page=per_page, vars=context)
+                          per_page=100, count=None):
+    paginator = ResponsePaginator(items, per_page=per_page, vars=context,
+                                  count=count)
     page_number = paginator.paginate(request).number
     request_get = request.GET.copy()
     request_get.pop('page', None)
@@ -322,12 +327,12 @@ def _get_random_cover_image(request, object, object_filter, object_name):
     image_tag = ''
     selected_issue = None
     if not page or page == '1':
-        pks = Cover.objects.filter(
+        covers = Cover.objects.filter(
           **{'issue__%s' % object_filter: object},
-          deleted=False).values_list('pk', flat=True)
-        if pks:
-            random_pk = choice(pks)
-            selected_cover = Cover.objects.get(pk=random_pk)
+          deleted=False)
+        selected_cover = random_object(covers, '%s-%d' % (object_filter,
+                                                          object.id))
+        if selected_cover:
             selected_issue = selected_cover.issue
             image_tag = get_image_tag(cover=selected_cover,
                                       zoom_level=ZOOM_MEDIUM,
@@ -475,54 +480,33 @@ def creator_characters(request, creator_id, country=None):
 def creator_creators(request, creator_id):
     # list of creators the creator creator_id worked with
     creator = get_gcd_object(Creator, creator_id)
-    names = _get_creator_names_for_checklist(creator)
 
     story_types = process_story_type_filter_from_request(request)
 
-    stories = Story.objects.filter(credits__creator__in=names,
-                                   type__id__in=story_types,
-                                   credits__credit_type__id__lt=6,
-                                   credits__deleted=False).distinct()
-    filter, stories = filter_sequences(request, stories)
-    stories_ids = stories.values_list('id', flat=True)
-
-    creators = Creator.objects.filter(
-      creator_names__storycredit__story__id__in=stories_ids,
-      creator_names__storycredit__deleted=False,
-      creator_names__storycredit__credit_type__id__lt=6).exclude(id=creator.id)
-    creators = creators.annotate(
-      issue_count=Count("creator_names__storycredit__story__issue",
-                        distinct=True))
-    creators = creators.annotate(first_credit=Min(
-      Case(When(creator_names__storycredit__story__issue__key_date="",
-                then=Value("9999-99-99"),
-                ),
-           default=F("creator_names__storycredit__story__issue__key_date"),
-           )))
-
-    target = 'creator_names__storycredit__credit_type__id'
-    script = Count('creator_names__storycredit__story__issue',
-                   filter=Q(**{target: 1}),
-                   distinct=True)
-    pencils = Count('creator_names__storycredit__story__issue',
-                    filter=Q(**{target: 2}),
-                    distinct=True)
-    inks = Count('creator_names__storycredit__story__issue',
-                 filter=Q(**{target: 3}),
-                 distinct=True)
-    colors = Count('creator_names__storycredit__story__issue',
-                   filter=Q(**{target: 4}),
-                   distinct=True)
-    letters = Count('creator_names__storycredit__story__issue',
-                    filter=Q(**{target: 5}),
-                    distinct=True)
-
-    creators = creators.annotate(
-      script=script,
-      pencils=pencils,
-      inks=inks,
-      colors=colors,
-      letters=letters)
+    # The collaborations are precomputed for the own names of a creator and
+    # the core story types.  House names, joint names and studios include
+    # the credits of other names, filtered lists are done on the fly.
+    if story_types == [str(t) for t in CORE_TYPES] and \
+       not any(request.GET.getlist(field)
+               for field in ('country', 'language', 'publisher')) and \
+       _own_names_only(creator):
+        filter = _rollup_sequence_filter(
+          request, Series.objects.filter(creator_rollups__creator=creator))
+        collaboration = 'co_creator_collaborations__'
+        creators = Creator.objects.filter(
+          co_creator_collaborations__creator=creator)
+        creators = _annotate_rollup(creators, collaboration,
+                                    issue_count='issue_count',
+                                    first_credit='first_credit')
+    else:
+        names = _get_creator_names_for_checklist(creator)
+        stories = Story.objects.filter(credits__creator__in=names,
+                                       type__id__in=story_types,
+                                       credits__credit_type__id__lt=6,
+                                       credits__deleted=False).distinct()
+        filter, stories = filter_sequences(request, stories)
+        creators = co_creators(stories.values_list('id', flat=True),
+                               creator)
 
     context = {
         'result_disclaimer': ISSUE_CHECKLIST_DISCLAIMER + MIGRATE_DISCLAIMER,
@@ -541,44 +525,48 @@ def creator_creators(request, creator_id):
 def creator_features(request, creator_id, country=None, language=None):
     # list of features the creator creator_id worked on
     creator = get_gcd_object(Creator, creator_id)
-    names = _get_creator_names_for_checklist(creator)
 
-    features = Feature.objects.filter(story__credits__creator__in=names,
-                                      story__credits__deleted=False).distinct()
+    if _own_names_only(creator):
+        features = Feature.objects.filter(creator_rollups__creator=creator)
+        features = _annotate_rollup(features, 'creator_rollups__',
+                                    issue_count='issue_count',
+                                    first_credit='first_key_date')
+    else:
+        names = _get_creator_names_for_checklist(creator)
+        features = Feature.objects.filter(
+          story__credits__creator__in=names,
+          story__credits__deleted=False).distinct()
+        features = features.annotate(issue_count=Count('story__issue',
+                                                       distinct=True))
+        features = features.annotate(first_credit=Min(
+          Case(When(story__issue__key_date='', then=Value('9999-99-99')),
+               default=F('story__issue__key_date'))))
+        script = Count('story__issue',
+                       filter=Q(story__credits__credit_type__id=1),
+                       distinct=True)
+        pencils = Count('story__issue',
+                        filter=Q(story__credits__credit_type__id=2),
+                        distinct=True)
+        inks = Count('story__issue',
+                     filter=Q(story__credits__credit_type__id=3),
+                     distinct=True)
+        colors = Count('story__issue',
+                       filter=Q(story__credits__credit_type__id=4),
+                       distinct=True)
+        letters = Count('story__issue',
+                        filter=Q(story__credits__credit_type__id=5),
+                        distinct=True)
+
+        features = features.annotate(
+          script=script,
+          pencils=pencils,
+          inks=inks,
+          colors=colors,
+          letters=letters)
     if language:
         language = get_object_or_404(Language, code=language)
         features = features.filter(language=language)
 
-    features = features.annotate(issue_count=Count('story__issue',
-                                                   distinct=True))
-    features = features.annotate(first_credit=Min(
-                                 Case(When(story__issue__key_date='',
-                                           then=Value('9999-99-99'),
-                                           ),
-                                      default=F('story__issue__key_date'))))
-    script = Count('story__issue',
-                   filter=Q(story__credits__credit_type__id=1),
-                   distinct=True)
-    pencils = Count('story__issue',
-                    filter=Q(story__credits__credit_type__id=2),
-                    distinct=True)
-    inks = Count('story__issue',
-                 filter=Q(story__credits__credit_type__id=3),
-                 distinct=True)
-    colors = Count('story__issue',
-                   filter=Q(story__credits__credit_type__id=4),
-                   distinct=True)
-    letters = Count('story__issue',
-                    filter=Q(story__credits__credit_type__id=5),
-                    distinct=True)
-
-    features = features.annotate(
-      script=script,
-      pencils=pencils,
-      inks=inks,
-      colors=colors,
-      letters=letters)
-
     context = {
         'result_disclaimer': MIGRATE_DISCLAIMER,
         'item_name': 'feature',
@@ -666,6 +654,40 @@ def _get_creator_names_for_checklist(creator):
     return creator_names
 
 
+def _own_names_only(creator):
+    # House names, joint names and studios include the credits of other
+    # names, precomputed data only covers the own names of a creator.
+    return creator.official_creator_detail.type_id not in [
+      NAME_TYPES['house'], NAME_TYPES['joint'], NAME_TYPES['studio']]
+
+
+def _annotate_rollup(objects, rollup, roles=COLLABORATION_ROLES, **fields):
+    """
+    Annotate the objects with the values of their rollup rows, under the
+    names used by the tables.
+    """
+    fields.update({role: role for role in roles})
+    return objects.annotate(**{name: F(rollup + field)
+                               for name, field in fields.items()})
+
+
+def _rollup_sequence_filter(request, series):
+    """
+    The filter of filter_sequences for a list read from rollups, with the
+    countries, languages and publishers of the series of the rollups as
+    choices instead of those of the stories.
+    """
+    filter = SequenceFilter(request.GET, queryset=Story.objects.none(),
+                            language_filter=True)
+    filter.form['country'].field.queryset = Country.objects.filter(
+      id__in=series.values('country'))
+    filter.form['language'].field.queryset = Language.objects.filter(
+      id__in=series.values('language'))
+    filter.form['publisher'].field.queryset = Publisher.objects.filter(
+      id__in=series.values('publisher'))
+    return filter
+
+
 def creator_series(request, creator_id, country=None, language=None):
     if '_export' in request.GET:
         if request.GET['_export'] in ['db_csv', 'db_json']:
@@ -673,45 +695,51 @@ def creator_series(request, creator_id, country=None, language=None):
                           {'error_text':
                            'There is no raw export for these objects.'})
     creator = get_gcd_object(Creator, creator_id)
-    names = _get_creator_names_for_checklist(creator)
 
-    series = Series.objects.filter(
-      issue__story__credits__creator__in=names,
-      issue__story__type__id__in=CORE_TYPES,
-      issue__story__credits__deleted=False,
-      issue__story__credits__credit_type__id__lt=6).distinct()
+    if _own_names_only(creator):
+        series = Series.objects.filter(creator_rollups__creator=creator)
+        series = _annotate_rollup(series, 'creator_rollups__',
+                                  issue_credits_count='issue_count',
+                                  first_credit='first_key_date')
+    else:
+        names = _get_creator_names_for_checklist(creator)
+        series = Series.objects.filter(
+          issue__story__credits__creator__in=names,
+          issue__story__type__id__in=CORE_TYPES,
+          issue__story__credits__deleted=False,
+          issue__story__credits__credit_type__id__lt=6).distinct()
+        series = series.annotate(issue_credits_count=Count('issue',
+                                                           distinct=True))
+        series = series.annotate(first_credit=Min('issue__key_date'))
+        script = Count('issue',
+                       filter=Q(issue__story__credits__credit_type__id=1),
+                       distinct=True)
+        pencils = Count('issue',
+                        filter=Q(issue__story__credits__credit_type__id=2),
+                        distinct=True)
+        inks = Count('issue',
+                     filter=Q(issue__story__credits__credit_type__id=3),
+                     distinct=True)
+        colors = Count('issue',
+                       filter=Q(issue__story__credits__credit_type__id=4),
+                       distinct=True)
+        letters = Count('issue',
+                        filter=Q(issue__story__credits__credit_type__id=5),
+                        distinct=True)
+        series = series.annotate(
+          script=script,
+          pencils=pencils,
+          inks=inks,
+          colors=colors,
+          letters=letters)
     if country:
         country = get_object_or_404(Country, code=country)
         series = series.filter(country=country)
     if language:
         language = get_object_or_404(Language, code=language)
         series = series.filter(language=language)
-
-    series = series.annotate(issue_credits_count=Count('issue', distinct=True))
-    series = series.annotate(first_credit=Min('issue__key_date'))
-    script = Count('issue',
-                   filter=Q(issue__story__credits__credit_type__id=1),
-                   distinct=True)
-    pencils = Count('issue',
-                    filter=Q(issue__story__credits__credit_type__id=2),
-                    distinct=True)
-    inks = Count('issue',
-                 filter=Q(issue__story__credits__credit_type__id=3),
-                 distinct=True)
-    colors = Count('issue',
-                   filter=Q(issue__story__credits__credit_type__id=4),
-                   distinct=True)
-    letters = Count('issue',
-                    filter=Q(issue__story__credits__credit_type__id=5),
-                    distinct=True)
     filter = filter_series(request, series)
     series = filter.qs
-    series = series.annotate(
-      script=script,
-      pencils=pencils,
-      inks=inks,
-      colors=colors,
-      letters=letters)
 
     context = {
         'result_disclaimer': ISSUE_CHECKLIST_DISCLAIMER + MIGRATE_DISCLAIMER,
@@ -1926,10 +1954,9 @@ def show_brand_use(request, brand_use_id):
     issues_with_cover = brand_issues.filter(cover__isnull=False)
 
     image_tag = ''
-    selected_issue = None
-    if issues_with_cover.count() > 0:
-        issue_count = issues_with_cover.count()
-        selected_issue = issues_with_cover[randint(0, issue_count-1)]
+    selected_issue = random_object(issues_with_cover,
+                                   'brand_use-%d' % brand_use.id)
+    if selected_issue:
         selected_cover = selected_issue.cover_set.first()
         image_tag = get_image_tag(cover=selected_cover,
                                   zoom_level=ZOOM_MEDIUM,
@@ -2311,94 +2338,11 @@ def series_details(request, series_id, by_date=False):
     with special handling for issues whose date cannot be resolved.
     """
     series = get_gcd_object(Series, series_id)
-    issues_by_date = []
-    issues_left_over = []
-    bad_key_dates = []
-    if by_date:
-        no_key_date_q = Q(key_date__isnull=True) | Q(key_date='')
-        with_key_dates = series.active_issues().exclude(no_key_date_q)
-
-        prev_year = None
-        prev_month = None
-        for issue in with_key_dates.order_by('key_date', 'sort_code'):
-            m = re.search(KEY_DATE_REGEXP, issue.key_date)
-            if m is None:
-                bad_key_dates.append(issue.id)
-                continue
-
-            year, month, day = m.groups()
-            month = int(month)
-            if month < 1:
-                month = 1
-            elif month > 12:
-                month = 12
-
-            # Note that we ignore the key_date's day field as it rarely
-            # indicates an actual day and we are not arranging the grid
-            # at the weekly level anyway.
-            try:
-                grid_date = date(int(year), month, 1)
-            except ValueError:
-                bad_key_dates.append(issue.id)
-                continue
-
-            if (grid_date.year > (date.today().year + 1) or
-               grid_date.year < MIN_GCD_YEAR):
-                bad_key_dates.append(issue.id)
-                continue
-
-            _handle_key_date(issue, grid_date,
-                             prev_year, prev_month,
-                             issues_by_date)
-
-            prev_year = grid_date.year
-            prev_month = grid_date.month
-
-        issues_left_over = series.active_issues().filter(
-          no_key_date_q | Q(id__in=bad_key_dates))
-
-    volume_present = (series.has_volume and
-                      series.active_issues().filter(no_volume=False)
-                                            .exclude(volume='').exists())
-    brand_present = (series.active_issues().filter(no_brand=False)
-                           .exclude(brand_emblem__isnull=True).exists())
-    frequency_present = (series.has_indicia_frequency and
-                         series.active_issues()
-                               .filter(no_indicia_frequency=False)
-                               .exclude(indicia_frequency='').exists())
-    isbn_present = (series.has_isbn and
-                    series.active_issues().filter(no_isbn=False)
-                                          .exclude(isbn='').exists())
-    barcode_present = (series.has_barcode and
-                       series.active_issues().filter(no_barcode=False)
-                                             .exclude(barcode='').exists())
-    title_present = (series.has_issue_title and
-                     series.active_issues().filter(no_title=False)
-                                           .exclude(title='').exists())
-    on_sale_date_present = (series.active_issues()
-                                  .exclude(on_sale_date='').exists())
-    rating_present = (series.has_rating and
-                      series.active_issues().filter(no_rating=False)
-                                            .exclude(rating='').exists())
+    present_columns = series.present_issue_columns()
 
     if not by_date:
-        exclude_columns = []
-        if not volume_present:
-            exclude_columns.append('volume')
-        if not brand_present:
-            exclude_columns.append('brand_emblem')
-        if not frequency_present:
-            exclude_columns.append('indicia_frequency')
-        if not isbn_present:
-            exclude_columns.append('isbn')
-        if not barcode_present:
-            exclude_columns.append('barcode')
-        if not title_present:
-            exclude_columns.append('title')
-        if not on_sale_date_present:
-            exclude_columns.append('on_sale_date')
-        if not rating_present:
-            exclude_columns.append('rating')
+        exclude_columns = [column for column in ISSUE_COLUMNS
+                           if column not in present_columns]
 
         context = {
             'series': series,
@@ -2413,6 +2357,8 @@ def series_details(request, series_id, by_date=False):
         return generic_sortable_list(request, issues, table, template,
                                      context, 500)
 
+    issues_by_date, issues_left_over, bad_dates = \
+      load_series_timeline(series)
     return render(
       request, 'gcd/details/series_timeline.html',
       {
@@ -2420,18 +2366,85 @@ def series_details(request, series_id, by_date=False):
         'by_date': by_date,
         'rows': issues_by_date,
         'no_date_rows': issues_left_over,
-        'volume_present': volume_present,
-        'brand_present': brand_present,
-        'frequency_present': frequency_present,
-        'isbn_present': isbn_present,
-        'barcode_present': barcode_present,
-        'title_present': title_present,
-        'on_sale_date_present': on_sale_date_present,
-        'rating_present': rating_present,
-        'bad_dates': len(bad_key_dates),
+        'volume_present': 'volume' in present_columns,
+        'brand_present': 'brand_emblem' in present_columns,
+        'frequency_present': 'indicia_frequency' in present_columns,
+        'isbn_present': 'isbn' in present_columns,
+        'barcode_present': 'barcode' in present_columns,
+        'title_present': 'title' in present_columns,
+        'on_sale_date_present': 'on_sale_date' in present_columns,
+        'rating_present': 'rating' in present_columns,
+        'bad_dates': bad_dates,
       })
 
 
+def _series_timeline(series):
+    """
+    Returns the rows of the timeline of the ids of the issues by key date,
+    the ids of the issues which cannot be placed in it in their sort order,
+    and how many of those have a key date, from one scan of the issue dates.
+    """
+    first_date = date(MIN_GCD_YEAR, 1, 1)
+    end_date = date(date.today().year + 2, 1, 1)
+    issues = series.active_issues().order_by('key_date_value', 'sort_code')\
+                                   .values_list('id', 'key_date_value',
+                                                'key_date', 'sort_code')
+    issues_by_date = []
+    issues_left_over = []
+    bad_dates = 0
+    prev_year = None
+    prev_month = None
+    for issue_id, key_date_value, key_date, sort_code in issues:
+        if key_date_value is None or \
+           not first_date <= key_date_value < end_date:
+            issues_left_over.append((sort_code, issue_id))
+            if key_date:
+                bad_dates += 1
+            continue
+
+        # Note that we ignore the key_date's day field as it rarely
+        # indicates an actual day and we are not arranging the grid
+        # at the weekly level anyway.
+        grid_date = key_date_value.replace(day=1)
+
+        _handle_key_date(issue_id, grid_date,
+                         prev_year, prev_month,
+                         issues_by_date)
+
+        prev_year = grid_date.year
+        prev_month = grid_date.month
+
+    issues_left_over.sort()
+    return issues_by_date, [issue_id for sort_code, issue_id
+                            in issues_left_over], bad_dates
+
+
+def load_series_timeline(series):
+    """
+    The series timeline, the ids of its issues are cached until changes of
+    the issues of the series are approved, the issues are fetched for each
+    page view.
+    """
+    key = 'series_timeline:%d:%d' % (series.id,
+                                     series_page_version(series.id))
+    timeline = cache.get(key)
+    if timeline is None:
+        timeline = _series_timeline(series)
+        cache.set(key, timeline, SERIES_TIMELINE_TIMEOUT)
+    rows, left_over, bad_dates = timeline
+
+    issues = series.active_issues().select_related('series',
+                                                   'indicia_publisher')\
+                                   .prefetch_related('brand_emblem')
+    issues = {issue.id: issue for issue in issues}
+    rows = [{'date': row['date'],
+             'issues': [issues[issue_id] for issue_id in row['issues']
+                        if issue_id in issues]} for row in rows]
+    left_over = [issues[issue_id] for issue_id in left_over
+                 if issue_id in issues]
+    return rows, left_over, bad_dates
+
+
 def _annotate_creator_list(creators):
     creators = creators.annotate(
       first_credit=Min(Case(When(
@@ -2886,8 +2899,9 @@ def _get_scan_table(series, show_cover=True):
     scans.extend(list_covers)
     scans.sort(key=attrgetter('sort_code'))
 
-    if covers and show_cover:
-        selected_cover = covers[randint(0, covers.count()-1)]
+    if list_covers and show_cover:
+        # the covers are all fetched anyway for the scan list
+        selected_cover = choice(list_covers)
         image_tag = get_image_tag(cover=selected_cover,
                                   zoom_level=ZOOM_MEDIUM,
                                   alt_text='Random Cover from Series')
@@ -3373,18 +3387,17 @@ def do_on_sale_monthly(request, year=None, month=None):
             year = int(return_val[0])
             month = int(return_val[1])
 
-    issues_on_sale = Issue.objects.filter(
-      on_sale_date__gte='%d-%02d-50' % (year, month-1),
-      on_sale_date__lte='%d-%02d-32' % (year, month))
+    from apps.gcd.models.issue import issues_for_month
+    issues_on_sale = issues_for_month(year, month)
 
     start_date = datetime(year, month, 1)
     heading = "on-sale in %s" % (start_date.strftime('%B %Y'))
     query_val = {'target': 'issue',
                  'method': 'icontains'}
     query_val['use_on_sale_date'] = True
-    query_val['start_date'] = '%d-%02d-32' % (year, month-1)
-    query_val['end_date'] = '%d-%02d-32' % (year, month)
-    issues_on_sale = issues_on_sale.filter(deleted=False)
+    query_val['start_date'] = '%d-%02d-01' % (year, month)
+    query_val['end_date'] = '%d-%02d-%02d' % (year, month,
+                                              monthrange(year, month)[1])
     date_before = start_date + timedelta(-1)
     date_after = start_date + timedelta(31)
     choose_url = urlresolvers.reverse("on_sale_monthly",
@@ -3398,7 +3411,12 @@ def do_on_sale_monthly(request, year=None, month=None):
                                             kwargs={
                                               'year': date_after.year,
                                               'month': date_after.month})
-    oldest = Issue.objects.exclude(on_sale_date='').order_by('on_sale_date')[0]
+    oldest = Issue.objects.filter(on_sale_date_value__isnull=False)\
+                          .order_by('on_sale_date_value')\
+                          .values_list('on_sale_date_value', flat=True)\
+                          .first()
+    # without any dated issues the picker offers the years up to the shown
+    oldest_year = oldest.year if oldest else min(year, date.today().year) - 1
 
     cross_link = urlresolvers.reverse("on_sale_weekly",
                                       kwargs={'year': start_date.year,
@@ -3407,7 +3425,7 @@ def do_on_sale_monthly(request, year=None, month=None):
 
     vars = {
         'items': issues_on_sale,
-        'years': range(date.today().year, int(oldest.on_sale_date[:4]), -1),
+        'years': range(date.today().year, oldest_year, -1),
         'heading': heading,
         'choose_url': choose_url,
         'choose_url_after': choose_url_after,
@@ -3547,8 +3565,9 @@ def show_story_arc(request, story_arc, preview=False):
 
     cover_issues = Issue.objects.filter(Q(**query)).distinct()\
                                 .select_related('series__publisher')
-    if cover_issues:
-        selected_issue = cover_issues[randint(0, cover_issues.count()-1)]
+    selected_issue = random_object(cover_issues,
+                                   'story_arc-%d' % story_arc.id)
+    if selected_issue:
         image_tag = get_image_tag(cover=selected_issue.cover_set.first(),
                                   zoom_level=ZOOM_MEDIUM,
                                   alt_text='Random Cover from Story Arc')
@@ -3609,8 +3628,8 @@ def show_feature(request, feature, preview=False):
                                   cover__isnull=False,
                                   cover__deleted=False).distinct()
 
-    if issues:
-        selected_issue = issues[randint(0, issues.count()-1)]
+    selected_issue = random_object(issues, 'feature-%d' % feature.id)
+    if selected_issue:
         image_tag = get_image_tag(cover=selected_issue.cover_set.first(),
                                   zoom_level=ZOOM_MEDIUM,
                                   alt_text='Random Cover from Feature')
@@ -4178,8 +4197,9 @@ def show_character(request, character, preview=False):
     issues = Issue.objects.filter(Q(**query)).distinct()\
                           .select_related('series__publisher')
 
-    if issues:
-        selected_issue = issues[randint(0, issues.count()-1)]
+    selected_issue = random_object(issues, 'character-%d-%s' % (
+                                     filter_character.id, universe_id))
+    if selected_issue:
         image_tag = get_image_tag(cover=selected_issue.cover_set.first(),
                                   zoom_level=ZOOM_MEDIUM,
                                   alt_text='Random Cover from Character')
@@ -4441,9 +4461,9 @@ def character_origin_universe(request, character_id, universe_id):
     issues = Issue.objects.filter(Q(**cover_query)).distinct()\
                           .select_related('series__publisher')
 
-    issues_count = issues.count()
-    if issues_count:
-        selected_issue = issues[randint(0, issues_count - 1)]
+    selected_issue = random_object(issues, 'character-%d-origin-%s' % (
+                                     character.id, universe_id))
+    if selected_issue:
         image_tag = get_image_tag(
           cover=selected_issue.cover_set.first(),
           zoom_level=ZOOM_MEDIUM,
@@ -4682,15 +4702,22 @@ def character_series(request, character_id, universe_id=None):
       'with character %s',
       (character,))
 
-    series = Series.objects.filter(**query).distinct()\
-        .select_related('publisher')
+    if universe_id is None:
+        series = Series.objects.filter(character_rollups__character=character,
+                                       deleted=False)
+        series = _annotate_rollup(series, 'character_rollups__', roles=(),
+                                  appearances_count='issue_count',
+                                  first_appearance='first_key_date')
+    else:
+        series = Series.objects.filter(**query).distinct()
+        series = series.annotate(appearances_count=Count('issue',
+                                                         distinct=True))
+        series = series.annotate(first_appearance=Min('issue__key_date'))
+    series = series.select_related('publisher')
     filter = filter_series(request, series)
     filter.filters.pop('language')
     series = filter.qs
 
-    series = series.annotate(appearances_count=Count('issue', distinct=True))
-    series = series.annotate(first_appearance=Min('issue__key_date'))
-
     context = {
         'result_disclaimer': CHAR_MIGRATE_DISCLAIMER,
         'item_name': 'series',
@@ -4971,8 +4998,9 @@ def show_group(request, group, preview=False):
     issues = Issue.objects.filter(Q(**query)).distinct()\
                           .select_related('series__publisher')
 
-    if issues:
-        selected_issue = issues[randint(0, issues.count()-1)]
+    selected_issue = random_object(issues, 'group-%d-%s' % (filter_group.id,
+                                                            universe_id))
+    if selected_issue:
         image_tag = get_image_tag(cover=selected_issue.cover_set.first(),
                                   zoom_level=ZOOM_MEDIUM,
                                   alt_text='Random Cover from Group')
@@ -5017,9 +5045,9 @@ def group_origin_universe(request, group_id, universe_id):
     issues = Issue.objects.filter(Q(**cover_query)).distinct()\
                           .select_related('series__publisher')
 
-    issues_count = issues.count()
-    if issues_count:
-        selected_issue = issues[randint(0, issues_count - 1)]
+    selected_issue = random_object(issues, 'group-%d-origin-%s' % (
+                                     group.id, universe_id))
+    if selected_issue:
         image_tag = get_image_tag(
           cover=selected_issue.cover_set.first(),
           zoom_level=ZOOM_MEDIUM,
@@ -5367,15 +5395,22 @@ def group_series(request, group_id, universe_id=None):
       'with group %s',
       (group,))
 
-    series = Series.objects.filter(**query).distinct()\
-        .select_related('publisher')
+    if universe_id is None:
+        series = Series.objects.filter(group_rollups__group=group,
+                                       deleted=False)
+        series = _annotate_rollup(series, 'group_rollups__', roles=(),
+                                  appearances_count='issue_count',
+                                  first_appearance='first_key_date')
+    else:
+        series = Series.objects.filter(**query).distinct()
+        series = series.annotate(appearances_count=Count('issue',
+                                                         distinct=True))
+        series = series.annotate(first_appearance=Min('issue__key_date'))
+    series = series.select_related('publisher')
     filter = filter_series(request, series)
     filter.filters.pop('language')
     series = filter.qs
 
-    series = series.annotate(appearances_count=Count('issue', distinct=True))
-    series = series.annotate(first_appearance=Min('issue__key_date'))
-
     context = {
         'result_disclaimer': MIGRATE_DISCLAIMER,
         'item_name': 'series',
@@ -5570,7 +5605,9 @@ def cover(request, issue_id, size):
     if size not in [ZOOM_SMALL, ZOOM_MEDIUM, ZOOM_LARGE]:
         raise Http404
 
-    issue = get_object_or_404(Issue, id=issue_id)
+    issue = get_object_or_404(
+              Issue.objects.select_related('prev_issue', 'next_issue'),
+              id=issue_id)
 
     if issue.deleted:
         return HttpResponseRedirect(
@@ -5607,7 +5644,9 @@ def issue_images(request, issue_id):
     Display the images for a single issue on its own page.
     """
 
-    issue = get_gcd_object(Issue, issue_id)
+    issue = get_gcd_object(Issue.objects.select_related('prev_issue',
+                                                        'next_issue'),
+                           issue_id, model_name='issue')
     [prev_issue, next_issue] = issue.get_prev_next_issue()
 
     indicia_image = issue.indicia_image
@@ -5665,7 +5704,8 @@ def issue(request, issue_id):
     Display the issue details page, including story details.
     """
     issue = get_object_or_404(
-              Issue.objects.select_related('series__publisher'),
+              Issue.objects.select_related('series__publisher', 'prev_issue',
+                                           'next_issue'),
               id=issue_id)
 
     if issue.deleted:
@@ -5709,29 +5749,9 @@ def show_issue(request, issue, preview=False):
     image_tag = get_image_tags_per_issue(issue=issue,
                                          zoom_level=zoom_level,
                                          alt_text=alt_text)
-    images_count = Image.objects.filter(
-      object_id=issue.id, deleted=False,
-      content_type=ContentType.objects.get_for_model(issue)).count()
-
-    if preview:
-        cover_page = 0
-    else:
-        covers = Cover.objects.filter(issue__series=issue.series,
-                                      issue__sort_code__lt=issue.sort_code,
-                                      deleted=False)
-        cover_page = int(covers.count()/COVERS_PER_GALLERY_PAGE) + 1
-
-    variant_image_tags = []
-    for variant_cover in issue.variant_covers():
-        variant_image_tags.append(
-          [variant_cover.issue,
-           get_image_tag(variant_cover, zoom_level=ZOOM_SMALL,
-                         alt_text='Cover Thumbnail for %s' %
-                                  str(variant_cover.issue),
-                         title=variant_cover.issue.display_full_descriptor)])
+    issue_page = load_issue_page(issue, preview=preview)
 
     series = issue.series
-    [prev_issue, next_issue] = issue.get_prev_next_issue()
 
     # TODO: Since the number of stories per issue is typically fairly small,
     # it seems more efficient to grab the whole list and only do one database
@@ -5740,24 +5760,7 @@ def show_issue(request, issue, preview=False):
     # to send the cover and interior stories to the UI separately, as the
     # UI should not be concerned with the designation of story 0 as the cover.
     cover_story, stories = issue.shown_stories()
-
-    # get reservations which got approved and make unique for indexers
-    oi_indexers = []
-    if not preview:
-        res = issue.reservation_set.filter(status=3)
-        for i in res:
-            oi_indexers.append(i.indexer.id)
-
-    revs = issue.revisions.filter(changeset__state=states.APPROVED)\
-                .exclude(changeset__indexer__username=settings.ANON_USER_NAME)\
-                .select_related('changeset')
-    oi_indexers.extend(revs.values_list('changeset__indexer_id', flat=True))
-    revs = issue.cover_revisions.filter(changeset__state=states.APPROVED)\
-                .exclude(changeset__indexer__username=settings.ANON_USER_NAME)\
-                .select_related('changeset')
-    oi_indexers.extend(revs.values_list('changeset__indexer_id', flat=True))
-    oi_indexers = list(set(oi_indexers))
-    oi_indexers = Indexer.objects.filter(user__id__in=oi_indexers)
+    batch_appearing_characters([cover_story] + stories)
 
     if series.is_singleton:
         country = series.country
@@ -5774,15 +5777,9 @@ def show_issue(request, issue, preview=False):
     return render(
       request, 'gcd/details/tw_issue.html',
       {'issue': issue,
-       'prev_issue': prev_issue,
-       'next_issue': next_issue,
        'cover_story': cover_story,
        'stories': stories,
-       'oi_indexers': oi_indexers,
        'image_tag': image_tag,
-       'variant_image_tags': variant_image_tags,
-       'images_count': images_count,
-       'cover_page': cover_page,
        'country': country,
        'language': language,
        'error_subject': '%s' % issue,
@@ -5793,8 +5790,8 @@ def show_issue(request, issue, preview=False):
        'absolute': 'absolute',  # for small screen
        'among_others': issue.created and issue.created.year <=
                         settings.NEW_SITE_CREATION_DATE.year,
-       'RANDOM_IMAGE': _publisher_image_content(issue.series.publisher_id)
-       })
+       'RANDOM_IMAGE': _publisher_image_content(issue.series.publisher_id),
+       **issue_page})
 
 
 def show_issue_modal(request, issue_id):
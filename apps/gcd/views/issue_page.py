@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Loading of the issue page data besides the stories, with a fixed number of
+queries.  The parts which only change with approved changesets, i.e. the
+previous and next issue, the indexers who modified the issue and the page
+of the series cover gallery, are cached per issue.  The cache is versioned
+per series, approving a changeset with issues or covers of a series drops
+the cached parts of all its issues, and its cached timeline.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.gcd.models import Cover
+from apps.gcd.models.cover import ZOOM_SMALL
+from apps.gcd.views.covers import get_image_tag
+from apps.indexer.models import Indexer
+from apps.oi import states
+
+ISSUE_PAGE_VERSION_KEY = 'issue_page_version:%d'
+ISSUE_PAGE_TIMEOUT = 60 * 60 * 24
+
+COVERS_PER_GALLERY_PAGE = 50
+
+
+def series_page_version(series_id):
+    """
+    The version of the cached pages of the series and its issues.
+    """
+    key = ISSUE_PAGE_VERSION_KEY % series_id
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+    return version
+
+
+def invalidate_issue_pages(series_ids):
+    """
+    Drop the cached issue page parts of the issues of the series, needs to
+    be called when issues or covers of the series are changed.
+    """
+    version = time.time_ns()
+    cache.set_many({ISSUE_PAGE_VERSION_KEY % series_id: version
+                    for series_id in series_ids if series_id}, None)
+
+
+def _oi_indexers(issue, preview):
+    """
+    The indexers with approved changes of the issue or its covers, and for
+    old data the ones with an approved reservation, in one union query.
+    """
+    indexer_ids = issue.revisions.filter(changeset__state=states.APPROVED)\
+      .exclude(changeset__indexer__username=settings.ANON_USER_NAME)\
+      .values_list('changeset__indexer_id', flat=True).order_by()
+    cover_indexer_ids = issue.cover_revisions\
+      .filter(changeset__state=states.APPROVED)\
+      .exclude(changeset__indexer__username=settings.ANON_USER_NAME)\
+      .values_list('changeset__indexer_id', flat=True).order_by()
+    indexer_ids = indexer_ids.union(cover_indexer_ids)
+    if not preview:
+        indexer_ids = indexer_ids.union(
+          issue.reservation_set.filter(status=3)
+                               .values_list('indexer_id', flat=True)
+                               .order_by())
+    return list(Indexer.objects.filter(user__id__in=list(indexer_ids))
+                               .select_related('user'))
+
+
+def _stable_parts(issue, preview):
+    prev_issue, next_issue = issue.get_prev_next_issue()
+    if preview:
+        cover_page = 0
+    else:
+        covers = Cover.objects.filter(issue__series=issue.series_id,
+                                      issue__sort_code__lt=issue.sort_code,
+                                      deleted=False)
+        cover_page = int(covers.count()/COVERS_PER_GALLERY_PAGE) + 1
+    return {'prev_issue': prev_issue,
+            'next_issue': next_issue,
+            'oi_indexers': _oi_indexers(issue, preview),
+            'cover_page': cover_page}
+
+
+def load_issue_page(issue, preview=False):
+    """
+    Returns the context of the issue page besides the stories and the
+    request dependent parts.  Previews are not cached.
+    """
+    if preview:
+        page = _stable_parts(issue, preview)
+    else:
+        key = 'issue_page:%d:%d' % (issue.id,
+                                    series_page_version(issue.series_id))
+        page = cache.get(key)
+        if page is None:
+            page = _stable_parts(issue, preview)
+            cache.set(key, page, ISSUE_PAGE_TIMEOUT)
+
+    variant_image_tags = []
+    for variant_cover in issue.variant_covers()\
+                              .select_related('issue__series'):
+        variant_image_tags.append(
+          [variant_cover.issue,
+           get_image_tag(variant_cover, zoom_level=ZOOM_SMALL,
+                         alt_text='Cover Thumbnail for %s' %
+                                  str(variant_cover.issue),
+                         title=variant_cover.issue.display_full_descriptor)])
+    return dict(page, variant_image_tags=variant_image_tags)
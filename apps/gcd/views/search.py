@@ -3,6 +3,7 @@
 View methods related to displaying search and search results pages.
 """
 
+import hashlib
 from re import match, split, sub
 from urllib.parse import urlencode, parse_qsl
 from decimal import Decimal
@@ -10,8 +11,10 @@ from haystack.backends import SQ
 from stdnum import isbn as stdisbn
 from random import randint
 
-from django.db.models import Q, Count, Min, Case, When, Value, F
+from django.apps import apps as django_apps
+from django.db.models import Q, Count, Min, Case, When, Value, F, QuerySet
 from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponseRedirect
 import django.urls as urlresolvers
 from django.shortcuts import render
@@ -35,7 +38,7 @@ from apps.gcd.models import Publisher, Series, Issue, Cover, Story, \
                             CreatorArtInfluence, CreatorNonComicWork, \
                             CreatorNameDetail, SeriesPublicationType, \
                             Award, ReceivedAward, Character, Group, Universe, \
-                            Printer, StoryArc
+                            Printer, StoryArc, StoryCredit, IssueCredit
 from apps.gcd.models.character import CharacterSearchTable
 from apps.gcd.models.cover import CoverIssuePublisherEditTable
 from apps.gcd.models.creator import CreatorSearchTable
@@ -1613,20 +1616,146 @@ def used_search(search_values):
     return target, method, logic, used_search_terms
 
 
+ADVANCED_SEARCH_TIMEOUT = 60 * 5
+ADVANCED_SEARCH_MAX_RESULTS = 50000
+
+
+def _advanced_search_key(request):
+    """
+    The cache key of the search parameters, i.e. without the page, sorting
+    and export of the result table, in a fixed order.  Searches within
+    collections depend on the user.
+    """
+    search_values = request.GET.copy()
+    for name in ['page', 'sort', '_export', 'random_search']:
+        search_values.pop(name, None)
+    parameters = urlencode(sorted(search_values.lists()), doseq=True)
+    return 'advanced_search:%d:%s' % (
+      request.user.id or 0,
+      hashlib.md5(parameters.encode('utf-8')).hexdigest())
+
+
+def _select_related_paths(select_related, prefix=''):
+    for name, related in select_related.items():
+        if related:
+            yield from _select_related_paths(related, prefix + name + '__')
+        else:
+            yield prefix + name
+
+
+def _search_fields(items):
+    """
+    The model, ordering and related objects of the items, as plain values
+    which can be cached with their ids.
+    """
+    select_related = items.query.select_related
+    if isinstance(select_related, dict):
+        select_related = list(_select_related_paths(select_related))
+    else:
+        select_related = []
+    return (items.model._meta.label, list(items.query.order_by),
+            select_related, list(items._prefetch_related_lookups))
+
+
+class _CachedIdsQuerySet(QuerySet):
+    """
+    The items of a cached search, filtered by their ids.  Slices, as taken
+    by the paginators, only select the items with the ids in the slice, in
+    the order of the ids.  Querysets made from it, e.g. with the ordering
+    of a sorted table, are plain ones selecting from all ids.
+    """
+    cached_ids = None
+    page_items = None
+
+    def count(self):
+        if self.cached_ids is None:
+            return super().count()
+        return len(self.cached_ids)
+
+    def order_by(self, *field_names):
+        # the table sets the ordering of the search again
+        if self.cached_ids is not None and \
+           list(field_names) == list(self.query.order_by):
+            return self
+        return super().order_by(*field_names)
+
+    def __getitem__(self, k):
+        if self.cached_ids is None or not isinstance(k, slice) or \
+           self._result_cache is not None:
+            return super().__getitem__(k)
+        ids = self.cached_ids[k]
+        items = self.page_items.in_bulk(ids)
+        return [items[id] for id in ids if id in items]
+
+
+def _items_by_ids(fields, ids, in_order=False):
+    """
+    The items with the ids, with the ordering and related objects of the
+    search fields.  With in_order the items are sliced in the order of the
+    ids, which needs to be the one of the search.
+    """
+    label, order_by, select_related, prefetch_related = fields
+    model = django_apps.get_model(label)
+    items = model.objects.all()
+    if select_related:
+        items = items.select_related(*select_related)
+    items = items.prefetch_related(*prefetch_related)
+    if not in_order:
+        return items.filter(id__in=ids).order_by(*order_by)
+    items_by_ids = _CachedIdsQuerySet(model).filter(id__in=ids)\
+                                            .order_by(*order_by)
+    items_by_ids.cached_ids = ids
+    items_by_ids.page_items = items
+    return items_by_ids
+
+
+def cached_advanced_search(request):
+    """
+    Runs do_advanced_search, with the ordered ids of the result and their
+    count cached for a short time.  Page turns, sorting and exports of the
+    same search then select the items by their ids, instead of running the
+    search again.  Without sorting of the table the pages select only the
+    ids of the page.  For more than ADVANCED_SEARCH_MAX_RESULTS only the
+    count is cached, and the items are the search itself.
+
+    Returns the items, their count and the search target.
+    """
+    key = _advanced_search_key(request)
+    result = cache.get(key)
+    if result is None:
+        items, target = do_advanced_search(request)
+        count = items.count()
+        if count > ADVANCED_SEARCH_MAX_RESULTS:
+            result = (None, count, target, None)
+        else:
+            # distinct with the ordering columns, ids might repeat
+            ids = list(dict.fromkeys(items.values_list('id', flat=True)))
+            result = (ids, len(ids), target, _search_fields(items))
+        cache.set(key, result, ADVANCED_SEARCH_TIMEOUT)
+    elif result[0] is None:
+        items, target = do_advanced_search(request)
+
+    ids, count, target, fields = result
+    if ids is not None:
+        items = _items_by_ids(fields, ids,
+                              in_order='sort' not in request.GET)
+    return items, count, target
+
+
 def process_advanced(request, export_csv=False):
     """
     Runs advanced searches.
     """
 
     try:
-        items, target = do_advanced_search(request)
+        items, count, target = cached_advanced_search(request)
     except ViewTerminationError as response:
         return response.response
 
     if 'random_search' in request.GET:
-        if items.count():
+        if count:
             # using DB random via order_by('?') is rather expensive
-            select = randint(0, items.count()-1)
+            select = randint(0, count-1)
             # nullify imposed ordering, use db one
             item = items.order_by()[select]
             return HttpResponseRedirect(item.get_absolute_url())
@@ -1649,7 +1778,7 @@ def process_advanced(request, export_csv=False):
     display_target, method, logic, used_search_terms = used_search(get_copy)
     query_string = urlencode(parse_qsl(query_string))
 
-    if items.count() > 50000:
+    if count > ADVANCED_SEARCH_MAX_RESULTS:
         return render_error(
           request,
           'More than 50,000 results, please limit the search range. '
@@ -1678,7 +1807,7 @@ def process_advanced(request, export_csv=False):
         table = CoverIssuePublisherEditTable(
           items, template_name=TW_SORT_GRID_TEMPLATE)
         return generic_sortable_list(request, items, table, template, context,
-                                     50)
+                                     50, count=count)
 
     if target == 'sequence':
         table = StoryTable(items, template_name=TW_SORT_TABLE_TEMPLATE)
@@ -1717,7 +1846,8 @@ def process_advanced(request, export_csv=False):
           items, template_name=TW_SORT_TABLE_TEMPLATE)
         context['item_name'] = 'brand emblem'
 
-    return generic_sortable_list(request, items, table, template, context)
+    return generic_sortable_list(request, items, table, template, context,
+                                 count=count)
 
     raise ValueError
 
@@ -2016,17 +2146,6 @@ def search_series(data, op):
     return compute_qobj(data, q_and_only, q_objs)
 
 
-def issue_date_formatter(date, start_end):
-    month = date.month
-    if start_end and date.day == 1:
-        day = 0
-        if month == 1:
-            month = 0
-    else:
-        day = date.day
-    return '%04d-%02d-%02d' % (date.year, month, day)
-
-
 def search_issues(data, op, stories_q=None):
     """
     Handle issue fields.
@@ -2036,14 +2155,14 @@ def search_issues(data, op, stories_q=None):
 
     q_and_only = []
     if target in ['issue', 'cover', 'issue_cover', 'feature', 'sequence']:
+        # The date columns hold the first day of partial dates, which are
+        # found if that day is in the range.
         if data['use_on_sale_date']:
-            q_and_only.extend(search_dates(data, issue_date_formatter,
-                                           '%son_sale_date' % prefix,
-                                           '%son_sale_date' % prefix))
+            date_name = '%son_sale_date_value' % prefix
         else:
-            q_and_only.extend(search_dates(data, issue_date_formatter,
-                                           '%skey_date' % prefix,
-                                           '%skey_date' % prefix))
+            date_name = '%skey_date_value' % prefix
+        q_and_only.extend(search_dates(data, lambda d, start_end: d,
+                                       date_name, date_name))
 
     if data['price']:
         q_and_only.append(Q(**{'%sprice__%s' % (prefix, op): data['price']}))
@@ -2213,23 +2332,42 @@ def handle_numbers(field, data, prefix):
     return reduce(lambda x, y: x | y, q_or_only)
 
 
-def _linked_story_ids(creator, credit_field, op):
+def _linked_creator_ids(creator, op):
     creator_q_obj = Q(**{'name__%s' % op: creator})
     creator_q_obj |= Q(**{
         'creator__gcd_official_name__%s' % op: creator,
     })
-    # Materialize the ids; MySQL optimizes IN (subquery) poorly. See
-    # https://docs.djangoproject.com/en/5.2/ref/models/querysets/#nested-queries-performance
-    creators = list(CreatorNameDetail.objects.filter(creator_q_obj)
-                    .values_list('id', flat=True))
-    return list(Story.objects.filter(
-        credits__creator__id__in=creators,
-        credits__deleted=False,
-        credits__credit_type__id=CREDIT_TYPES[credit_field])
-        .values_list('id', flat=True))
-
-
-def _linked_story_credit_filters(search_value, credit_field, prefix, op):
+    # Materialize the few ids of the matching names, as literals the credit
+    # lookup uses the index on the creator.
+    return list(CreatorNameDetail.objects.filter(creator_q_obj)
+                .values_list('id', flat=True))
+
+
+def _linked_credit_stories(creator, credit_field, op, materialize=False):
+    """
+    The ids of the stories with linked credits of the creator as a subquery
+    on the credits, which the database runs as a semi-join, instead of
+    shipping the ids of all the stories of a prolific creator.  None if no
+    creator name matches.
+
+    Under an OR MySQL cannot run the subquery as a semi-join, but once per
+    row of the search, so with materialize the ids are fetched instead, and
+    None is also returned if no story matches.
+    """
+    creators = _linked_creator_ids(creator, op)
+    if not creators:
+        return None
+    stories = StoryCredit.objects.filter(
+        creator_id__in=creators,
+        credit_type_id=CREDIT_TYPES[credit_field],
+        deleted=False).values('story_id')
+    if materialize:
+        return list(stories.values_list('story_id', flat=True)) or None
+    return stories
+
+
+def _linked_story_credit_filters(search_value, credit_field, prefix, op,
+                                 materialize=False):
     creator_names = [creator.strip()
                      for creator in search_value.split(';')
                      if creator.strip()]
@@ -2239,8 +2377,10 @@ def _linked_story_credit_filters(search_value, credit_field, prefix, op):
     filters = []
     for creator in creator_names:
         # Keep unmatched terms represented so AND searches cannot drop them.
-        stories = _linked_story_ids(creator, credit_field, op) or [-1]
-        filters.append(Q(**{'%sid__in' % prefix: stories}))
+        stories = _linked_credit_stories(creator, credit_field, op,
+                                         materialize)
+        filters.append(Q(**{'%sid__in' % prefix:
+                            [-1] if stories is None else stories}))
     return filters
 
 
@@ -2265,6 +2405,8 @@ def search_stories(data, op):
         'letters': 'letters',
         'story_editing': 'editing',
     }
+    # the linked credits are ORed with the text credits or each other
+    materialize = data['logic'] is True or data['credit_is_linked'] is True
     for search_field, credit_field in story_credit_fields.items():
         search_value = data[search_field]
         if not search_value:
@@ -2273,7 +2415,7 @@ def search_stories(data, op):
         text_credits_q_objs.append(
             Q(**{'%s%s__%s' % (prefix, credit_field, op): search_value}))
         linked_credits_q_objs.extend(_linked_story_credit_filters(
-            search_value, credit_field, prefix, op))
+            search_value, credit_field, prefix, op, materialize))
 
     for field in ('title', 'first_line', 'job_number', 'characters',
                   'synopsis', 'reprint_notes', 'notes'):
@@ -2339,21 +2481,20 @@ def search_stories(data, op):
 
     # since issue_editing is credit use it here to allow correct 'OR' behavior
     if data['issue_editing']:
-        creator_q_obj = Q(**{'name__%s' % (op): data['issue_editing']})
-        creator_q_obj |= Q(**{'creator__gcd_official_name__%s' % (op):
-                              data['issue_editing']})
-        creators = list(CreatorNameDetail.objects.filter(creator_q_obj)
-                                                 .values_list('id', flat=True))
-        issues = list(Issue.objects.filter(
-            credits__creator__id__in=creators,
-            credits__deleted=False,
-            credits__credit_type__id=CREDIT_TYPES['editing'])
-            .values_list('id', flat=True))
+        creators = _linked_creator_ids(data['issue_editing'], op)
+        issues = IssueCredit.objects.filter(
+          creator_id__in=creators,
+          credit_type_id=CREDIT_TYPES['editing'],
+          deleted=False).values('issue_id')
+        if materialize:
+            issues = list(issues.values_list('issue_id', flat=True))
+        if not creators or not (issues if materialize else issues.exists()):
+            issues = None
         # if linked credits only is selected and if there is no issue matching,
         # the search should return no match.
-        if not issues and data['credit_is_linked'] is None:
+        if issues is None and data['credit_is_linked'] is None:
             issues = [-1]  # force no match
-        if issues:
+        if issues is not None:
             if target == 'sequence':  # no prefix in this case
                 linked_credits_q_objs.append((Q(**{'issue__id__in': issues})))
             else:  # cut off 'story__'
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Counting of the SQL queries of a request, to find pages with too many
+queries and N+1 patterns, i.e. the same query run again and again for
+each row of a list.
+
+The SQL of a query without its parameters is used as its shape, a shape
+run QUERY_COUNT_REPEATED or more times in a request is reported as
+repeated.  Requests with repeated shapes and a sample of QUERY_COUNT_SAMPLE
+of all requests are logged, with DEBUG on the numbers are also added as
+response headers.
+"""
+
+import time
+import random
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter(object):
+    """
+    Database execute wrapper counting the queries, their time and shapes.
+    """
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.monotonic() - started
+            self.count += 1
+            self.shapes[sql] += 1
+
+    def repeated(self, threshold):
+        """
+        Returns the (shape, count) of the query shapes run at least
+        threshold times, most frequent first.
+        """
+        return [(sql, count) for sql, count in self.shapes.most_common()
+                if count >= threshold]
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the queries run within the block, yields the QueryCounter.
+    """
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+class QueryCountMiddleware(object):
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+
+        repeated = counter.repeated(settings.QUERY_COUNT_REPEATED)
+        if settings.DEBUG:
+            response['X-DB-Queries'] = '%d' % counter.count
+            response['X-DB-Time'] = '%.1f' % (counter.time * 1000)
+            response['X-DB-Repeated-Queries'] = '%d' % len(repeated)
+
+        if repeated:
+            logger.warning(
+              "%s: %d queries in %.1f ms, repeated: %s" % (
+                request.path, counter.count, counter.time * 1000,
+                '; '.join('%dx %s' % (count, sql[:200])
+                          for sql, count in repeated)))
+        elif random.random() < settings.QUERY_COUNT_SAMPLE:
+            logger.info("%s: %d queries in %.1f ms" % (
+              request.path, counter.count, counter.time * 1000))
+        return response
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import PIL.Image as pyImage
 import os
+import math
+import logging
 import shutil
 import glob
 
@@ -8,6 +10,7 @@ import django.urls as urlresolvers
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.core.files import File
+from django.db import transaction
 from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape as esc
 from django.http import HttpResponseRedirect
@@ -29,6 +32,8 @@ from apps.oi.templatetags.editing import is_locked
 
 from apps.gcd.models.cover import ZOOM_SMALL, ZOOM_MEDIUM, ZOOM_LARGE
 
+logger = logging.getLogger(__name__)
+
 # table width for displaying the medium sized current and active covers
 UPLOAD_WIDTH = 3
 
@@ -74,14 +79,23 @@ def get_preview_image_tag(revision, alt_text, zoom_level, request=None):
     img_class = 'cover_img'
     if zoom_level == ZOOM_SMALL:
         width = 100
+        size = 'small'
         if revision.is_wraparound:
             img_class = 'wraparound_cover_img'
     elif zoom_level == ZOOM_MEDIUM:
         width = 200
+        size = 'medium'
         if revision.is_wraparound:
             img_class = 'wraparound_cover_img'
     elif zoom_level == ZOOM_LARGE:
         width = 400
+        size = 'large'
+
+    if not revision.deleted and cover_is_processing(revision, width):
+        return mark_safe('<img src="' + settings.STATIC_URL +
+                         'img/placeholder_' + size + '.jpg" alt="' +
+                         esc(alt_text) + '" title="The cover is being '
+                         'processed" class="' + img_class + '"/>')
 
     if revision.changeset.state == states.APPROVED:
         current_cover = CoverRevision.objects.filter(
@@ -173,75 +187,253 @@ def check_cover_dir(scan_dir):
             _create_cover_dir(scan_dir + "/w" + str(width))
 
 
+def _uploaded_revision_file(cover_revision):
+    uploaded = glob.glob('%s%d.*' % (cover_revision.base_dir(),
+                                     cover_revision.id))
+    return uploaded[0] if uploaded else None
+
+
 def copy_approved_cover(cover_revision):
+    """
+    Moves the uploaded and the scaled files of an approved cover revision
+    to the cover.  Files which were moved already are skipped, so that an
+    interrupted or repeated run completes the move.
+    """
     cover = cover_revision.cover
+    source_name = _uploaded_revision_file(cover_revision)
+    if source_name is None:
+        # already done
+        return
+
     # here we want a server error to get notice to the admins
     # that the file transfer did not take place
     check_cover_dir(cover.base_dir())
 
     # replacement cover
     if cover_revision.is_replacement:
-        # get current cover
+        # get current cover, the approval of this revision might be done
         old_cover = CoverRevision.objects.filter(
                     cover=cover,
                     changeset__change_type=CTYPES['cover'],
-                    changeset__state=states.APPROVED).order_by('-created')[0]
+                    changeset__state=states.APPROVED)\
+                    .exclude(id=cover_revision.id).order_by('-created')[0]
         if old_cover.created <= settings.NEW_SITE_COVER_CREATION_DATE:
             # uploaded file too old, not stored, copy large file
             suffix = "/uploads/%d_%s.jpg" % (
                      cover.id,
                      old_cover.changeset.created.strftime('%Y%m%d_%H%M%S'))
             target_name = cover.base_dir() + suffix
-            source_name = cover.base_dir() + "/w400/%d.jpg" % cover.id
-            shutil.move(source_name, target_name)
+            if not os.path.exists(target_name):
+                shutil.move(cover.base_dir() + "/w400/%d.jpg" % cover.id,
+                            target_name)
 
-    source_name = glob.glob(cover_revision.base_dir() +
-                            str(cover_revision.id) + '*')[0]
+    for width in [100, 200, 400]:
+        scaled_name = "%s/w%d/%d.jpg" % (cover_revision.base_dir(), width,
+                                         cover_revision.id)
+        if os.path.exists(scaled_name):
+            target_name = "%s/w%d/%d.jpg" % (cover.base_dir(), width,
+                                             cover.id)
+            shutil.move(scaled_name, target_name)
 
+    # the uploaded file is moved last, it marks the move as done
     target_name = "%s/uploads/%d_%s%s" % (
                   cover.base_dir(), cover.id,
                   cover_revision.changeset.created.strftime('%Y%m%d_%H%M%S'),
                   os.path.splitext(source_name)[1])
     shutil.move(source_name, target_name)
 
-    for width in [100, 200, 400]:
-        source_name = "%s/w%d/%d.jpg" % (cover_revision.base_dir(), width,
-                                         cover_revision.id)
-        target_name = "%s/w%d/%d.jpg" % (cover.base_dir(), width, cover.id)
-        shutil.move(source_name, target_name)
+
+def _report_failed_job(job, connection, type, value, traceback):
+    logger.error("Cover job %s failed" % job.id,
+                 exc_info=(type, value, traceback))
+
+
+def _enqueue(job_id, function, *args, depends_on=None):
+    """
+    Runs the function as a background job if the RQ queue is in use, and
+    otherwise right away.  Jobs are queued after the commit of the current
+    transaction and only once for a job_id, unless the earlier job failed.
+    A job runs after the job it depends on, also if that one failed, and
+    failed jobs are logged.
+    """
+    if 'django_rq' not in settings.INSTALLED_APPS:
+        function(*args)
+        return
+
+    import django_rq
+    queue = django_rq.get_queue('default')
+
+    def enqueue():
+        job = queue.fetch_job(job_id)
+        if job and not job.is_failed:
+            return
+        dependency = queue.fetch_job(depends_on) if depends_on else None
+        if dependency and (dependency.is_finished or dependency.is_failed):
+            dependency = None
+        if dependency:
+            from rq.job import Dependency
+            # otherwise a failed dependency leaves the job deferred forever
+            dependency = Dependency(jobs=[dependency], allow_failure=True)
+        queue.enqueue(function, *args, job_id=job_id, depends_on=dependency,
+                      on_failure=_report_failed_job)
+
+    transaction.on_commit(enqueue)
+
+
+def _sizes_job_id(cover_revision):
+    return 'cover-sizes-%d' % cover_revision.id
+
+
+def _generate_revision_sizes(revision):
+    with pyImage.open(_uploaded_revision_file(revision)) as im:
+        generate_sizes(revision, im)
+
+
+def generate_revision_sizes(revision_id):
+    """
+    Job generating the scaled files for an uploaded cover revision.
+    """
+    _generate_revision_sizes(CoverRevision.objects.get(id=revision_id))
+
+
+def promote_approved_cover(revision_id):
+    """
+    Job moving the files of an approved cover revision to the cover.  The
+    scaled files are generated first if the job for them failed.
+    """
+    revision = CoverRevision.objects.get(id=revision_id)
+    if _uploaded_revision_file(revision) and \
+       any(not os.path.exists("%s/w%d/%d.jpg" % (revision.base_dir(), width,
+                                                 revision.id))
+           for width in COVER_WIDTHS):
+        _generate_revision_sizes(revision)
+    copy_approved_cover(revision)
+
+
+def queue_revision_sizes(cover_revision):
+    _enqueue(_sizes_job_id(cover_revision), generate_revision_sizes,
+             cover_revision.id)
+
+
+def _approve_job_id(cover_revision):
+    return 'cover-approve-%d' % cover_revision.id
+
+
+def queue_approved_cover(cover_revision):
+    _enqueue(_approve_job_id(cover_revision), promote_approved_cover,
+             cover_revision.id, depends_on=_sizes_job_id(cover_revision))
+
+
+def _job_is_outstanding(job_id):
+    """
+    The job is queued, waits for the job it depends on, or runs.  Without
+    the RQ queue the jobs run right away and none is outstanding.
+    """
+    if 'django_rq' not in settings.INSTALLED_APPS:
+        return False
+
+    import django_rq
+    job = django_rq.get_queue('default').fetch_job(job_id)
+    return job is not None and (job.is_queued or job.is_deferred or
+                                job.is_started)
+
+
+def cover_is_processing(cover_revision, width):
+    """
+    The job generating the scaled files of a pending revision is not done
+    yet, or the one moving the files of the current approved revision to
+    the cover.  Revisions of other states, or whose job failed, show their
+    files as usual.
+    """
+    scaled_name = "%s/w%d/%d.jpg" % (cover_revision.base_dir(), width,
+                                     cover_revision.id)
+    state = cover_revision.changeset.state
+    if state == states.APPROVED:
+        return os.path.exists(scaled_name) and \
+          _job_is_outstanding(_approve_job_id(cover_revision))
+    if state in states.ACTIVE:
+        return not os.path.exists(scaled_name) and \
+          _job_is_outstanding(_sizes_job_id(cover_revision))
+    return False
+
+
+# the widths of the scaled covers, in the order they are generated
+COVER_WIDTHS = [400, 200, 100]
+
+
+def _cover_sizes(cover, full_size):
+    """
+    Returns the size of each scaled cover, and if it is scaled from the full
+    image, which is the case for the large size of wraparound covers, or
+    from the front cover.
+    """
+    if cover.is_wraparound:
+        front_size = (cover.front_right - cover.front_left,
+                      cover.front_bottom - cover.front_top)
+    else:
+        front_size = full_size
+
+    sizes = {}
+    for width in COVER_WIDTHS:
+        if cover.is_wraparound and width == 400:
+            # ratio between widths of full cover and its front part times 400
+            width = float(full_size[0]) / float(front_size[0])*400.
+            size = int(width), int(width / full_size[0] * full_size[1])
+            if size[1] < 400:
+                size = int(full_size[0]*400./full_size[1]), 400
+            sizes[400] = size, True
+        elif width == 400 and front_size[0] > front_size[1]:
+            # for landscape covers use height as base size
+            sizes[width] = (int(float(width)/front_size[1]*front_size[0]),
+                            width), False
+        else:
+            sizes[width] = (width,
+                            int(float(width)/front_size[0]*front_size[1])), \
+                           False
+    return sizes, front_size
 
 
 def generate_sizes(cover, im):
+    """
+    Generates the scaled covers from the image with a single decode.  JPEG
+    images are only decoded at the resolution needed for the largest size,
+    and the smaller sizes are scaled down from the next larger one.
+    """
     base_dir = cover.base_dir()
+    full_size = im.size
+    sizes, front_size = _cover_sizes(cover, full_size)
+
+    if im.format == 'JPEG':
+        scale = max(size[0] / (full_size[0] if from_full else front_size[0])
+                    for size, from_full in sizes.values())
+        if scale < 1:
+            # draft keeps a size of at least the requested one
+            im.draft('RGB', (math.ceil(full_size[0]*scale),
+                             math.ceil(full_size[1]*scale)))
     if im.mode != "RGB":
         im = im.convert("RGB")
+    factor = float(im.size[0]) / full_size[0]
 
+    full_cover = im
     if cover.is_wraparound:
         # coordinates in PIL are measured from the top/left corner
-        front_part = im.crop((cover.front_left, cover.front_top,
-                              cover.front_right, cover.front_bottom))
-        full_cover = im
-        im = front_part
-
-    for width in [100, 200, 400]:
-        scaled_name = "%s/w%d/%d.jpg" % (base_dir, width, cover.id)
-        if cover.is_wraparound and width == 400:
-            # ratio between widths of full cover and its front part times 400
-            width = float(full_cover.size[0]) / \
-                    float(cover.front_right - cover.front_left)*400.
-            size = int(width), \
-                   int(width / full_cover.size[0] * full_cover.size[1])
-            if size[1] < 400:
-                size = int(full_cover.size[0]*400./full_cover.size[1]), 400
-            scaled = full_cover.resize(size, pyImage.LANCZOS)
+        im = im.crop((round(cover.front_left*factor),
+                      round(cover.front_top*factor),
+                      round(cover.front_right*factor),
+                      round(cover.front_bottom*factor)))
+
+    previous = None
+    for width in COVER_WIDTHS:
+        size, from_full = sizes[width]
+        if previous and previous[1] == from_full and \
+           previous[0].size[0] >= size[0]:
+            source = previous[0]
         else:
-            if width == 400 and im.size[0] > im.size[1]:
-                # for landscape covers use height as base size
-                size = int(float(width)/im.size[1]*im.size[0]), width
-            else:
-                size = width, int(float(width)/im.size[0]*im.size[1])
-            scaled = im.resize(size, pyImage.LANCZOS)
-        scaled.save(scaled_name, subsampling='4:4:4')
+            source = full_cover if from_full else im
+        scaled = source.resize(size, pyImage.LANCZOS)
+        scaled.save("%s/w%d/%d.jpg" % (base_dir, width, cover.id),
+                    subsampling='4:4:4')
+        previous = scaled, from_full
 
 
 @login_required
@@ -401,7 +593,6 @@ def process_edited_gatefold_cover(request):
 
     shutil.move(tmp_name, destination_name)
 
-    im = pyImage.open(destination_name)
     revision.is_wraparound = True
     # convert from scaled to real values
     width = cd['width']
@@ -413,7 +604,7 @@ def process_edited_gatefold_cover(request):
     revision.front_top = top
     revision.front_bottom = top + height
     revision.save()
-    generate_sizes(revision, im)
+    queue_revision_sizes(revision)
 
     return finish_cover_revision(request, revision, cd)
 
@@ -585,6 +776,9 @@ def handle_uploaded_cover(request, cover, issue, variant=False,
     try:
         # generate different sizes we are using
         im = pyImage.open(destination.name)
+        # the sizes are generated in a job, decode the file here to catch
+        # truncated or corrupt uploads
+        im.load()
         large_enough = False
         if form.cleaned_data['is_wraparound']:
             # wraparounds need to have twice the width
@@ -600,7 +794,7 @@ def handle_uploaded_cover(request, cover, issue, variant=False,
                 revision.front_bottom = im.size[1]
                 revision.front_top = 0
                 revision.save()
-            generate_sizes(revision, im)
+            queue_revision_sizes(revision)
         else:
             changeset.delete()
             os.remove(destination.name)
@@ -5,13 +5,14 @@ import re
 import calendar
 import os
 import glob
+import threading
 from stdnum import isbn
 from datetime import timedelta
 
 from django import forms
 from django.conf import settings
 from django.db import models, transaction, IntegrityError
-from django.db.models import F, Manager
+from django.db.models import Manager
 from django.db.models.fields import Field, related
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
@@ -52,15 +53,20 @@ from apps.gcd.models import (
 
 from apps.gcd.models.gcddata import GcdData, GcdLink
 
-from apps.gcd.models.issue import issue_descriptor
+from apps.gcd.models.issue import issue_descriptor, set_indexed_statuses
 from apps.gcd.models.story import show_feature, show_feature_as_text, \
                                   show_characters, show_title, \
                                   _get_civilian_identity, \
                                   CharacterThroughOrder
 from apps.gcd.models.image import CropToFace
+from apps.gcd.search_updates import display_object_committed
+from apps.gcd.derived_updates import deferred_updates, record_updates
+from apps.gcd.views.covers import invalidate_random_covers
+from apps.gcd.views.issue_page import invalidate_issue_pages
+from apps.gcd.templatetags.credits import invalidate_rendered_credits
 from apps.indexer.views import ErrorWithMessage
 
-from functools import reduce
+from functools import reduce, partial
 
 LANGUAGE_STATS = ['de']
 
@@ -158,33 +164,40 @@ IMP_IMAGE_VALUE = 5
 IMP_APPROVER_VALUE = 3
 IMP_DELETE = 1
 
+# During an approval the issues of the committed stories are collected, and
+# their index status is set once at the end, see Changeset.approve.
+_deferred_indexed_status = threading.local()
+
 
 def update_count(field, delta, language=None, country=None):
     '''
     updates statistics, for all, per language, and per country
     CountStats with language=None is for all languages
     '''
-    stat = CountStats.objects.get(name=field, language=None, country=None)
-    stat.count = F('count') + delta
-    stat.save()
-
-    if language:
-        stat = CountStats.objects.filter(name=field, language=language)
-        if stat.count():
-            stat = stat[0]
-            stat.count = F('count') + delta
-            stat.save()
-        else:
-            CountStats.objects.init_stats(language=language)
-
-    if country:
-        stat = CountStats.objects.filter(name=field, country=country)
-        if stat.count():
-            stat = stat[0]
-            stat.count = F('count') + delta
-            stat.save()
-        else:
-            CountStats.objects.init_stats(country=country)
+    CountStats.objects.update_count(field, delta,
+                                    language=language, country=country)
+
+
+def _update_index_stats(issue, delta):
+    if delta:
+        CountStats.objects.update_all_counts(
+            {'issue indexes': delta},
+            country=issue.series.country,
+            language=issue.series.language)
+    # this does not result in double entries in RecentIndexedIssue,
+    # check is in update_recents
+    if issue.is_indexed and not issue.variant_of_id:
+        RecentIndexedIssue.objects.update_recents(issue)
+
+
+def _set_deferred_indexed_statuses(issue_ids):
+    issues = list(Issue.objects.filter(id__in=issue_ids)
+                               .select_related('series__country',
+                                               'series__language'))
+    was_indexed = {issue.id: issue.is_indexed for issue in issues}
+    set_indexed_statuses(issues)
+    for issue in issues:
+        _update_index_stats(issue, issue.index_delta(was_indexed[issue.id]))
 
 
 def set_series_first_last(series):
@@ -857,6 +870,30 @@ class Changeset(models.Model):
             raise ErrorWithMessage(
                   "Only REVIEWING changes with an approver can be approved.")
 
+        # the stats are written and the derived data is updated once for
+        # all revisions
+        with CountStats.objects.deferred_updates(), deferred_updates():
+            _deferred_indexed_status.issue_ids = set()
+            try:
+                self._commit_revisions()
+                issue_ids = _deferred_indexed_status.issue_ids
+            finally:
+                _deferred_indexed_status.issue_ids = None
+            _set_deferred_indexed_statuses(issue_ids)
+
+        self.comments.create(commenter=self.approver,
+                             text=notes,
+                             old_state=self.state,
+                             new_state=states.APPROVED)
+
+        self.state = states.APPROVED
+        self.save()
+        transaction.on_commit(partial(invalidate_issue_pages,
+                                      self._issue_page_series_ids()))
+        self.indexer.indexer.add_imps(self.total_imps())
+        self.approver.indexer.add_imps(IMP_APPROVER_VALUE)
+
+    def _commit_revisions(self):
         for revision in self.revisions:
             # TODO rethink the depency handling during committing
             #
@@ -885,21 +922,26 @@ class Changeset(models.Model):
                 # first free the lock, commit_to_display might delete source
                 revision.commit_to_display()
 
-        self.comments.create(commenter=self.approver,
-                             text=notes,
-                             old_state=self.state,
-                             new_state=states.APPROVED)
-
-        self.state = states.APPROVED
-        self.save()
-        self.indexer.indexer.add_imps(self.total_imps())
-        self.approver.indexer.add_imps(IMP_APPROVER_VALUE)
-
         # TODO remove once all type of revisions are re-factored
         for revision in self.revisions:
             revision.committed = True
             revision.save()
 
+    def _issue_page_series_ids(self):
+        """
+        The series with issue pages changed by the approval, i.e. of the
+        issues and covers, including the previous series of moved issues,
+        and of renamed series.
+        """
+        series_ids = set(self.seriesrevisions.values_list('series_id',
+                                                          flat=True))
+        for series_id, previous_series_id in self.issuerevisions.values_list(
+          'series_id', 'previous_revision__series_id'):
+            series_ids.update((series_id, previous_series_id))
+        series_ids.update(self.coverrevisions.values_list('issue__series_id',
+                                                          flat=True))
+        return series_ids
+
     def disapprove(self, notes=''):
         """
         Send the change back to the indexer for more work.
@@ -2131,6 +2173,10 @@ class Revision(models.Model):
             new_rp.set_value(self.source, old_rp.get_value(self))
 
         self._post_save_object(changes)
+        source = deleted_source if self.deleted else self.source
+        if source:
+            display_object_committed.send(sender=type(source),
+                                          instance=source)
         if self.deleted:
             deleted_source.delete()
         # some source objects get deleted, but these do not have stats
@@ -3276,6 +3322,7 @@ class CoverRevision(Revision):
     def commit_to_display(self):
         # the file handling is in the view/covers code
         cover = self.cover
+        transaction.on_commit(invalidate_random_covers)
 
         if cover is None:
             # check for variants having added issue records
@@ -3332,7 +3379,7 @@ class CoverRevision(Revision):
                 # implement in case we do different kind if cover moves
                 raise NotImplementedError
         else:
-            from apps.oi.covers import copy_approved_cover
+            from apps.oi.covers import queue_approved_cover
             if self.cover is None:
                 self.cover = cover
                 self.save()
@@ -3343,7 +3390,7 @@ class CoverRevision(Revision):
                     series = cover.issue.series
                     series.has_gallery = True
                     series.save()
-            copy_approved_cover(self)
+            queue_approved_cover(self)
             cover.marked = self.marked
             cover.last_upload = self.changeset.comments \
                                     .latest('created').created
@@ -4390,9 +4437,12 @@ class IssueRevision(Revision):
 
     def _post_save_object(self, changes):
         self.series.set_first_last_issues()
+        # on commit, since a deleted issue is only marked later
+        record_updates(issue_series_ids=[self.series.id])
         if self.series_changed:
             old_series = self.previous_revision.series
             old_series.set_first_last_issues()
+            record_updates(issue_series_ids=[old_series.id])
 
             # new series might have gallery after move
             if not self.series.has_gallery and \
@@ -5341,6 +5391,19 @@ class StoryCreditRevision(Revision):
     def _pre_save_object(self, changes):
         self.story_credit.story = self.story_revision.story
 
+    def _post_save_object(self, changes):
+        # The collaborations among the creators of the story, including a
+        # creator replaced by this revision, and the rollups of the changed
+        # creators are recomputed after the commit.
+        changed_ids = {self.creator.creator_id}
+        if self.previous_revision:
+            changed_ids.add(self.previous_revision.creator.creator_id)
+        story_ids = [self.story_revision.story.id]
+        record_updates(collaboration_story_ids=story_ids,
+                       collaborator_ids=changed_ids,
+                       rollup_story_ids=story_ids,
+                       rollup_creator_ids=changed_ids)
+
     def _do_complete_added_revision(self, story_revision):
         self.story_revision = story_revision
 
@@ -5427,6 +5490,13 @@ class StoryCharacterRevision(Revision):
     def _pre_save_object(self, changes):
         self.story_character.story = self.story_revision.story
 
+    def _post_save_object(self, changes):
+        character_ids = {self.character.character_id}
+        if self.previous_revision:
+            character_ids.add(self.previous_revision.character.character_id)
+        record_updates(rollup_story_ids=[self.story_revision.story.id],
+                       rollup_character_ids=character_ids)
+
     def _do_complete_added_revision(self, story_revision):
         self.story_revision = story_revision
 
@@ -5689,6 +5759,13 @@ class StoryGroupRevision(Revision):
     def _pre_save_object(self, changes):
         self.story_group.story = self.story_revision.story
 
+    def _post_save_object(self, changes):
+        group_ids = {revision.group_name.group_id
+                     for revision in (self, self.previous_revision)
+                     if revision and revision.group_name}
+        record_updates(rollup_story_ids=[self.story_revision.story.id],
+                       rollup_group_ids=group_ids)
+
     def _do_complete_added_revision(self, story_revision):
         self.story_revision = story_revision
 
@@ -6326,23 +6403,33 @@ class StoryRevision(Revision):
         if changes['issue changed'] and not self.deleted:
             issues.append(changes['new issue'])
 
-        # import pytest
-        for issue in issues:
-            delta = issue.set_indexed_status()
-            if delta:
-                if self.edited:
+        deferred_issue_ids = getattr(_deferred_indexed_status, 'issue_ids',
+                                     None)
+        if deferred_issue_ids is not None:
+            # set once per issue at the end of the approval
+            deferred_issue_ids.update(issue.id for issue in issues)
+        else:
+            for issue in issues:
+                delta = issue.set_indexed_status()
+                if delta and self.edited:
                     assert issue.series.country is not None
                     assert issue.series.language is not None
-                CountStats.objects.update_all_counts(
-                    {'issue indexes': delta},
-                    country=issue.series.country,
-                    language=issue.series.language)
-            # this is done for every story, but does not result in double
-            # entries in RecentIndexedIssue, check is in update_recents
-            #
-            # maybe can be done using changes[] on the changeset level ?
-            if issue.is_indexed and not issue.variant_of:
-                RecentIndexedIssue.objects.update_recents(issue)
+                _update_index_stats(issue, delta)
+
+        # The rollups of all creators, characters and groups of the story
+        # depend on its issue, type and features.
+        if self.previous_revision:
+            old_features = set(self.previous_revision.feature_object.all()
+                               .values_list('id', flat=True))
+            if changes['issue changed'] or self.deleted or \
+               self.type_id != self.previous_revision.type_id or \
+               old_features != set(self.feature_object.all()
+                                   .values_list('id', flat=True)):
+                record_updates(
+                  rollup_story_ids=[self.source.id],
+                  rollup_owner_story_ids=[self.source.id],
+                  rollup_series_ids=[issue.series_id for issue in issues],
+                  rollup_feature_ids=old_features)
 
     def extra_forms(self, request):
         from apps.oi.forms.story import StoryRevisionFormSet, \
@@ -9822,6 +9909,7 @@ class CreatorRelationRevision(Revision):
 
     def commit_to_display(self):
         creator_relation = self.creator_relation
+        transaction.on_commit(invalidate_rendered_credits)
 
         if creator_relation is None:
             creator_relation = CreatorRelation()
@@ -9901,6 +9989,10 @@ class CreatorNameDetailRevision(Revision):
     def _post_create_for_add(self, changes):
         self.creator = self.creator_revision.creator
 
+    def _post_save_object(self, changes):
+        # credits show names of related creators, e.g. for house names
+        transaction.on_commit(invalidate_rendered_credits)
+
     def __str__(self):
         if self.creator.disambiguation:
             extra = ' [%s]' % self.creator.disambiguation
@@ -9986,6 +10078,7 @@ class CreatorSignatureRevision(Revision):
 
     def _handle_dependents(self, changes):
         self._handle_dependent_image_revision()
+        transaction.on_commit(invalidate_rendered_credits)
 
     def full_name(self):
         return str(self)
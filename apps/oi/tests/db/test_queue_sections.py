@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from apps.oi import states
+from apps.oi.models import Changeset, CTYPES, ACTION_ADD
+from apps.oi.views import _queue_sections
+
+
+def _section(data, object_name):
+    return [section for section in data
+            if section['object_name'] == object_name][0]
+
+
+@pytest.mark.django_db
+def test_queue_sections_by_change_type(any_added_publisher_rev, any_indexer):
+    award = Changeset.objects.create(state=states.OPEN, indexer=any_indexer,
+                                     change_type=CTYPES['award'])
+
+    data = _queue_sections(Changeset.objects.all())
+
+    publishers = _section(data, 'Publishers')['changesets']
+    assert publishers == [any_added_publisher_rev.changeset]
+    assert publishers[0].country == any_added_publisher_rev.country.id
+    assert _section(data, 'Awards')['changesets'] == [award]
+    assert _section(data, 'Series')['changesets'] == []
+
+
+@pytest.mark.django_db
+def test_queue_sections_state_ordered(any_indexer):
+    pending, editing = [
+      Changeset.objects.create(state=state, indexer=any_indexer,
+                               change_type=CTYPES['image'])
+      for state in (states.PENDING, states.OPEN)]
+
+    data = _queue_sections(Changeset.objects.all())
+
+    assert _section(data, 'Images')['changesets'] == [editing, pending]
+
+
+@pytest.mark.django_db
+def test_queue_sections_prefetch_revisions(any_added_publisher_rev,
+                                           django_assert_num_queries):
+    data = _queue_sections(Changeset.objects.all())
+    changeset = _section(data, 'Publishers')['changesets'][0]
+
+    with django_assert_num_queries(0):
+        assert changeset.changeset_action() == ACTION_ADD
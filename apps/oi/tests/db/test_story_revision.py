@@ -9,7 +9,8 @@ from apps.gcd.models import (
     Creator, CreatorNameDetail, CreditType, Character, CharacterNameDetail,
     Group, GroupNameDetail, INDEXED)
 from apps.oi.models import (
-    StoryCreditRevision, StoryCharacterRevision, StoryGroupRevision)
+    StoryCreditRevision, StoryCharacterRevision, StoryGroupRevision,
+    _deferred_indexed_status)
 from apps.stddata.models import Country, Language, Script
 from apps.stats.models import CountStats
 
@@ -91,6 +92,23 @@ def test_commit_added_revision(any_added_story_rev, story_add_values,
             assert getattr(rev.story, k) == v
 
 
+@pytest.mark.django_db
+def test_commit_added_revision_deferred_indexed_status(any_added_story_rev):
+    rev = any_added_story_rev
+
+    with mock.patch(UPDATE_ALL), \
+            mock.patch('apps.gcd.models.issue.Issue.set_indexed_status') \
+            as set_mock, \
+            mock.patch.object(_deferred_indexed_status, 'issue_ids', set(),
+                              create=True):
+        rev.commit_to_display()
+        issue_ids = _deferred_indexed_status.issue_ids
+
+    # during an approval the status is set after all commits
+    assert not set_mock.called
+    assert issue_ids == {rev.issue.id}
+
+
 # Changing the story type can change the index status, but this is measured
 # in the Issue class, so we just mock it and set the status directly rather
 # than dealing with story types.  The code only checks skeleton vs
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+import mock
+import PIL.Image as pyImage
+import pytest
+
+from apps.oi import covers, states
+from apps.oi.covers import cover_is_processing, generate_sizes
+
+
+def _cover(tmp_path, **kwargs):
+    for width in (100, 200, 400):
+        (tmp_path / ('w%d' % width)).mkdir()
+    values = dict(id=7, is_wraparound=False, front_left=0, front_right=0,
+                  front_top=0, front_bottom=0,
+                  base_dir=lambda: str(tmp_path))
+    values.update(kwargs)
+    return SimpleNamespace(**values)
+
+
+def _scan(tmp_path, size, format='JPEG', back_color=(200, 30, 30)):
+    name = str(tmp_path / ('scan.' + format.lower()))
+    scan = pyImage.new('RGB', size, (200, 30, 30))
+    scan.paste(back_color, (0, 0, size[0]//2, size[1]))
+    scan.save(name, format)
+    return pyImage.open(name)
+
+
+def _sizes(tmp_path):
+    return {width: pyImage.open(tmp_path / ('w%d' % width) / '7.jpg').size
+            for width in (100, 200, 400)}
+
+
+@pytest.mark.parametrize('format', ['JPEG', 'PNG'])
+def test_generate_sizes_portrait(tmp_path, format):
+    cover = _cover(tmp_path)
+
+    generate_sizes(cover, _scan(tmp_path, (1700, 2600), format))
+
+    assert _sizes(tmp_path) == {100: (100, 152), 200: (200, 305),
+                                400: (400, 611)}
+
+
+def test_generate_sizes_landscape(tmp_path):
+    cover = _cover(tmp_path)
+
+    generate_sizes(cover, _scan(tmp_path, (2600, 1700)))
+
+    assert _sizes(tmp_path) == {100: (100, 65), 200: (200, 130),
+                                400: (611, 400)}
+
+
+def test_generate_sizes_wraparound_uses_front_part(tmp_path):
+    cover = _cover(tmp_path, is_wraparound=True, front_left=1600,
+                   front_right=3200, front_top=0, front_bottom=2400)
+
+    generate_sizes(cover, _scan(tmp_path, (3200, 2400),
+                                back_color=(30, 30, 200)))
+
+    assert _sizes(tmp_path) == {100: (100, 150), 200: (200, 300),
+                                400: (800, 600)}
+    red, _, blue = pyImage.open(tmp_path / 'w200' / '7.jpg').getpixel((5, 5))
+    assert red > 150 and blue < 80
+
+
+def _revision(tmp_path, state):
+    (tmp_path / 'w200').mkdir(exist_ok=True)
+    return SimpleNamespace(id=11, base_dir=lambda: str(tmp_path) + '/',
+                           changeset=SimpleNamespace(state=state))
+
+
+def _job_is_outstanding(outstanding=True):
+    return mock.patch.object(covers, '_job_is_outstanding',
+                             return_value=outstanding)
+
+
+def test_pending_cover_processing_until_scaled(tmp_path):
+    revision = _revision(tmp_path, states.PENDING)
+    with _job_is_outstanding() as outstanding:
+        assert cover_is_processing(revision, 200)
+    outstanding.assert_called_once_with('cover-sizes-11')
+
+    (tmp_path / 'w200' / '11.jpg').touch()
+    with _job_is_outstanding():
+        assert not cover_is_processing(revision, 200)
+
+
+def test_pending_cover_not_processing_after_failed_job(tmp_path):
+    revision = _revision(tmp_path, states.OPEN)
+    with _job_is_outstanding(False):
+        assert not cover_is_processing(revision, 200)
+
+
+def test_discarded_cover_not_processing(tmp_path):
+    revision = _revision(tmp_path, states.DISCARDED)
+    with _job_is_outstanding() as outstanding:
+        assert not cover_is_processing(revision, 200)
+    outstanding.assert_not_called()
+
+
+def test_approved_cover_processing_until_moved(tmp_path):
+    revision = _revision(tmp_path, states.APPROVED)
+    (tmp_path / 'w200' / '11.jpg').touch()
+    with _job_is_outstanding() as outstanding:
+        assert cover_is_processing(revision, 200)
+    outstanding.assert_called_once_with('cover-approve-11')
+
+    (tmp_path / 'w200' / '11.jpg').unlink()
+    with _job_is_outstanding():
+        assert not cover_is_processing(revision, 200)
+
+
+def test_job_is_outstanding():
+    queue = mock.MagicMock()
+    django_rq = mock.MagicMock()
+    django_rq.get_queue.return_value = queue
+
+    with mock.patch.object(covers.settings, 'INSTALLED_APPS', ['django_rq']), \
+         mock.patch.dict('sys.modules', {'django_rq': django_rq}):
+        queue.fetch_job.return_value = None
+        assert not covers._job_is_outstanding('job-1')
+        queue.fetch_job.return_value = mock.MagicMock(
+          is_queued=False, is_deferred=False, is_started=True)
+        assert covers._job_is_outstanding('job-1')
+        queue.fetch_job.return_value = mock.MagicMock(
+          is_queued=False, is_deferred=False, is_started=False)
+        assert not covers._job_is_outstanding('job-1')
+    queue.fetch_job.assert_called_with('job-1')
+
+
+def test_enqueue_runs_directly_without_queue():
+    job = mock.MagicMock()
+
+    with mock.patch.object(covers.settings, 'INSTALLED_APPS', ['apps.oi']):
+        covers._enqueue('job-1', job, 3)
+
+    job.assert_called_once_with(3)
+
+
+def test_enqueue_queues_job_once():
+    queue = mock.MagicMock()
+    queue.fetch_job.side_effect = [None, None,
+                                   mock.MagicMock(is_failed=False)]
+    django_rq = mock.MagicMock()
+    django_rq.get_queue.return_value = queue
+    job = mock.MagicMock()
+
+    with mock.patch.object(covers.settings, 'INSTALLED_APPS', ['django_rq']), \
+         mock.patch.dict('sys.modules', {'django_rq': django_rq}), \
+         mock.patch.object(covers.transaction, 'on_commit',
+                           side_effect=lambda enqueue: enqueue()):
+        covers._enqueue('job-1', job, 3, depends_on='job-0')
+        covers._enqueue('job-1', job, 3)
+
+    job.assert_not_called()
+    queue.enqueue.assert_called_once_with(
+      job, 3, job_id='job-1', depends_on=None,
+      on_failure=covers._report_failed_job)
+
+
+def test_enqueue_runs_after_failed_dependency():
+    queue = mock.MagicMock()
+    dependency = mock.MagicMock(is_finished=False, is_failed=False)
+    queue.fetch_job.side_effect = [None, dependency]
+    django_rq = mock.MagicMock()
+    django_rq.get_queue.return_value = queue
+    rq_job = mock.MagicMock()
+
+    with mock.patch.object(covers.settings, 'INSTALLED_APPS', ['django_rq']), \
+         mock.patch.dict('sys.modules', {'django_rq': django_rq,
+                                         'rq': mock.MagicMock(),
+                                         'rq.job': rq_job}), \
+         mock.patch.object(covers.transaction, 'on_commit',
+                           side_effect=lambda enqueue: enqueue()):
+        covers._enqueue('job-1', mock.MagicMock(), 3, depends_on='job-0')
+
+    rq_job.Dependency.assert_called_once_with(jobs=[dependency],
+                                              allow_failure=True)
+    assert queue.enqueue.call_args.kwargs['depends_on'] == \
+        rq_job.Dependency.return_value
+
+
+def test_promote_generates_missing_sizes(tmp_path):
+    revision = _cover(tmp_path, base_dir=lambda: str(tmp_path) + '/')
+    _scan(tmp_path, (1700, 2600)).save(tmp_path / '7.jpg')
+
+    with mock.patch.object(covers.CoverRevision.objects, 'get',
+                           return_value=revision), \
+         mock.patch.object(covers, 'copy_approved_cover') as copy:
+        covers.promote_approved_cover(7)
+
+    assert _sizes(tmp_path)[400] == (400, 611)
+    copy.assert_called_once_with(revision)
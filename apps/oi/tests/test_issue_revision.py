@@ -69,7 +69,13 @@ def test_classification():
         'awards': gf('awards'),
         'valid_isbn': gf('valid_isbn'),
         'on_sale_date': gf('on_sale_date'),
+        'key_date_value': gf('key_date_value'),
+        'key_date_precision': gf('key_date_precision'),
+        'on_sale_date_value': gf('on_sale_date_value'),
+        'on_sale_date_precision': gf('on_sale_date_precision'),
         'sort_code': gf('sort_code'),
+        'prev_issue': gf('prev_issue'),
+        'next_issue': gf('next_issue'),
         'is_indexed': gf('is_indexed'),
         'external_link': gf('external_link'),
     }
@@ -516,6 +522,7 @@ def test_handle_prerequisites_exit_infinite_loop(
 @pytest.fixture
 def patch_for_optional_move():
     with mock.patch('%s.set_first_last_issues' % SERIES), \
+            mock.patch('apps.oi.models.transaction.on_commit'), \
             mock.patch('%s.scan_count' % SERIES), \
             mock.patch('%s.active_covers' % ISSUE), \
             mock.patch('%s.series_changed' % IREV,
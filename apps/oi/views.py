@@ -4,6 +4,7 @@
 import re
 import sys
 import glob
+from operator import attrgetter
 import PIL.Image as pyImage
 from urllib.parse import unquote
 
@@ -14,7 +15,7 @@ from django.urls import reverse, NoReverseMatch
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render, redirect
 from django.db import transaction, IntegrityError
-from django.db.models import Min, Max, Count, F, Q
+from django.db.models import Min, Max, Count, F, Q, prefetch_related_objects
 from django.db.models.fields import Field
 from django.utils.html import mark_safe, conditional_escape as esc
 
@@ -51,7 +52,8 @@ from apps.gcd.views.details import (  # noqa: F401
     show_universe)
 
 from apps.gcd.views.covers import get_image_tag, get_image_tags_per_issue
-from apps.gcd.views.search import do_advanced_search, used_search
+from apps.gcd.views.issue_page import invalidate_issue_pages
+from apps.gcd.views.search import cached_advanced_search, used_search
 from apps.gcd.models.cover import ZOOM_LARGE, ZOOM_MEDIUM
 from apps.oi.templatetags.editing import show_revision_short
 from apps.select.views import store_select_data, get_cached_stories, \
@@ -1707,7 +1709,7 @@ def edit_issues_in_bulk(request):
     target, method, logic, used_search_terms = used_search(search_values)
 
     try:
-        items, target_name = do_advanced_search(request)
+        items, nr_items, target_name = cached_advanced_search(request)
     except ViewTerminationError:
         return render_error(
           request,
@@ -1717,7 +1719,6 @@ def edit_issues_in_bulk(request):
 
     ids = list(items.values_list('id', flat=True))
     items = Issue.objects.filter(id__in=ids)
-    nr_items = items.count()
     items_reserved = RevisionLock.objects.filter(
       object_id__in=ids,
       content_type=ContentType.objects.get_for_model(items[0]))
@@ -5636,6 +5637,9 @@ def _reorder_series(request, series, issues):
 
     if 'commit' in request.POST:
         set_series_first_last(series)
+        series.set_prev_next_issues()
+        # the neighbours and gallery pages of the cached issue pages changed
+        transaction.on_commit(lambda: invalidate_issue_pages([series.id]))
         return HttpResponseRedirect(urlresolvers.reverse(
           'show_series', kwargs={'series_id': series.id}))
 
@@ -5829,6 +5833,138 @@ def _reorder_children(request, parent, children, sort_field, child_set,
 ##############################################################################
 
 
+# The sections of the standard queues, in display order, as
+# (object name, object type, change types, country lookup, prefetches).
+# Sections listed in QUEUE_STATE_ORDERED are ordered by state first.
+QUEUE_SECTIONS = (
+  ('Awards', 'award', ('award',), None, ('awardrevisions',)),
+  ('Creators', 'creator', ('creator',),
+   'creatorrevisions__birth_country__id', ('creatorrevisions',)),
+  ('Creator Signatures', 'creator_signature', ('creator_signature',),
+   'creatorsignaturerevisions__creator__birth_country__id',
+   ('creatorsignaturerevisions',)),
+  ('Publishers', 'publisher', ('publisher',),
+   'publisherrevisions__country__id',
+   ('publisherrevisions', 'publisherrevisions__country')),
+  ('Indicia / Colophon Publishers', 'indicia_publisher',
+   ('indicia_publisher',), 'indiciapublisherrevisions__country__id',
+   ('indiciapublisherrevisions',)),
+  ('Brand Groups', 'brand_groups', ('brand_group',),
+   'brandgrouprevisions__parent__country__id', ('brandgrouprevisions',)),
+  ('Brand Emblems', 'brands', ('brand',),
+   'brandrevisions__group__parent__country__id', ('brandrevisions',)),
+  ('Brand Uses', 'brand_uses', ('brand_use',),
+   'branduserevisions__publisher__country__id', ('branduserevisions',)),
+  ('Printers', 'printer', ('printer',), 'printerrevisions__country__id',
+   ('printerrevisions', 'printerrevisions__country')),
+  ('Indicia Printers', 'indicia_printer', ('indicia_printer',),
+   'indiciaprinterrevisions__country__id', ('indiciaprinterrevisions',)),
+  ('Series', 'series', ('series',), 'seriesrevisions__country__id',
+   ('seriesrevisions', 'seriesrevisions__series')),
+  ('Features', 'feature', ('feature',), None, ('featurerevisions',)),
+  ('Feature Logos', 'feature_logo', ('feature_logo',), None,
+   ('featurelogorevisions',)),
+  ('Story Arcs', 'story_arc', ('story_arc',), None, ('storyarcrevisions',)),
+  ('Universes', 'universe', ('universe',), None, ('universerevisions',)),
+  ('Characters', 'character', ('character',), None,
+   ('characterrevisions',)),
+  ('Groups', 'group', ('group',), None, ('grouprevisions',)),
+  ('Issue Skeletons', 'issue', ('issue_add',),
+   'issuerevisions__series__country__id',
+   ('issuerevisions__issue', 'issuerevisions__series')),
+  ('Issue Bulk Changes', 'issue', ('issue_bulk',),
+   'issuerevisions__series__country__id', ('issuerevisions',)),
+  ('Issues', 'issue', ('issue', 'variant_add', 'two_issues'),
+   'issuerevisions__series__country__id',
+   ('issuerevisions__issue', 'issuerevisions__variant_of',
+    'issuerevisions__series')),
+  ('Received Awards', 'received_award', ('received_award',), None,
+   ('receivedawardrevisions',)),
+  ('Creator Art Influences', 'creator_art_influence',
+   ('creator_art_influence',),
+   'creatorartinfluencerevisions__creator__birth_country__id',
+   ('creatorartinfluencerevisions',)),
+  ('Creator Degrees', 'creator_degree', ('creator_degree',),
+   'creatordegreerevisions__creator__birth_country__id',
+   ('creatordegreerevisions',)),
+  ('Creator Memberships', 'creator_membership', ('creator_membership',),
+   'creatormembershiprevisions__creator__birth_country__id',
+   ('creatormembershiprevisions',)),
+  ('Creator Non Comic Works', 'creator_non_comic_work',
+   ('creator_non_comic_work',),
+   'creatornoncomicworkrevisions__creator__birth_country__id',
+   ('creatornoncomicworkrevisions',)),
+  ('Creator Relations', 'creator_relation', ('creator_relation',),
+   'creatorrelationrevisions__from_creator__birth_country__id',
+   ('creatorrelationrevisions',)),
+  ('Creator Schools', 'creator_school', ('creator_school',),
+   'creatorschoolrevisions__creator__birth_country__id',
+   ('creatorschoolrevisions',)),
+  ('Series Bonds', 'series_bond', ('series_bond',),
+   'seriesbondrevisions__origin__country__id', ()),
+  ('Feature Relations', 'feature_relation', ('feature_relation',), None,
+   ('featurerelationrevisions',)),
+  ('Story Arc Relations', 'story_arc_relation', ('story_arc_relation',),
+   None, ('storyarcrelationrevisions',)),
+  ('Character Relations', 'character_relation', ('character_relation',),
+   None, ('characterrelationrevisions',)),
+  ('Group Relations', 'group_relation', ('group_relation',), None,
+   ('grouprelationrevisions',)),
+  ('Group Memberships', 'group_membership', ('group_membership',), None,
+   ('groupmembershiprevisions',)),
+  ('Covers', 'cover', ('cover',),
+   'coverrevisions__issue__series__country__id',
+   ('coverrevisions__cover',)),
+  ('Images', 'image', ('image',), None, ('imagerevisions',)),
+)
+
+QUEUE_STATE_ORDERED = ('Issue Bulk Changes', 'Issues', 'Covers', 'Images')
+
+
+def _queue_sections(changes):
+    """
+    Fetch the changesets of a queue with one query and split them into the
+    sections by change type.  The revisions the queue displays and the
+    countries are then loaded per section for all of its changesets at once.
+    """
+    sections_by_type = {}
+    for section in QUEUE_SECTIONS:
+        for change_type in section[2]:
+            sections_by_type[CTYPES[change_type]] = section[0]
+
+    section_changesets = {section[0]: [] for section in QUEUE_SECTIONS}
+    for changeset in changes.order_by('modified', 'id'):
+        if changeset.change_type in sections_by_type:
+            section_changesets[sections_by_type[changeset.change_type]] \
+              .append(changeset)
+
+    data = []
+    for object_name, object_type, change_types, country_lookup, \
+            prefetches in QUEUE_SECTIONS:
+        changesets = section_changesets[object_name]
+        if object_name in QUEUE_STATE_ORDERED:
+            # the sort is stable, within a state the modified order is kept
+            changesets.sort(key=attrgetter('state'))
+        if changesets and prefetches:
+            # revisions and their previous revisions are used for the name
+            # and the action color of a changeset
+            revisions = prefetches[0].split('__')[0]
+            prefetch_related_objects(changesets, *prefetches,
+                                     revisions + '__previous_revision')
+        if changesets and country_lookup:
+            changeset_countries = dict(
+              Changeset.objects.filter(id__in=[c.id for c in changesets])
+                               .order_by().values('id')
+                               .annotate(country=Max(country_lookup))
+                               .values_list('id', 'country'))
+            for changeset in changesets:
+                changeset.country = changeset_countries[changeset.id]
+        data.append({'object_name': object_name,
+                     'object_type': object_type,
+                     'changesets': changesets})
+    return data
+
+
 @permission_required('indexer.can_reserve')
 def show_queue(request, queue_name):
     kwargs = {}
@@ -5853,67 +5989,11 @@ def show_queue(request, queue_name):
 
     changes = Changeset.objects.filter(**kwargs).select_related(
       'indexer__indexer', 'approver__indexer')
-
-    awards = changes.filter(change_type=CTYPES['award'])
-    creators = changes.filter(change_type=CTYPES['creator'])
-    creator_art_influences = changes.filter(
-      change_type=CTYPES['creator_art_influence'])
-    received_awards = changes.filter(change_type=CTYPES['received_award'])
-    creator_memberships = changes.filter(
-      change_type=CTYPES['creator_membership'])
-    creator_non_comic_works = changes.filter(
-      change_type=CTYPES['creator_non_comic_work'])
-    creator_relations = changes.filter(change_type=CTYPES['creator_relation'])
-    creator_schools = changes.filter(change_type=CTYPES['creator_school'])
-    creator_signatures = changes.filter(
-      change_type=CTYPES['creator_signature'])
-    creator_degres = changes.filter(change_type=CTYPES['creator_degree'])
-    publishers = changes.filter(
-      change_type=CTYPES['publisher']) \
-        .prefetch_related('publisherrevisions__previous_revision',
-                          'publisherrevisions__country')
-    indicia_publishers = changes.filter(
-      change_type=CTYPES['indicia_publisher'])
-    brand_groups = changes.filter(change_type=CTYPES['brand_group'])
-    brands = changes.filter(change_type=CTYPES['brand'])
-    brand_uses = changes.filter(change_type=CTYPES['brand_use'])
-    printers = changes.filter(change_type=CTYPES['printer']) \
-                      .prefetch_related('printerrevisions__previous_revision',
-                                        'printerrevisions__country')
-    indicia_printers = changes.filter(change_type=CTYPES['indicia_printer'])
-    series = changes.filter(change_type=CTYPES['series'])\
-                    .prefetch_related('seriesrevisions__series')
-    series_bonds = changes.filter(change_type=CTYPES['series_bond'])
-    issue_adds = changes.filter(change_type=CTYPES['issue_add']) \
-                        .prefetch_related('issuerevisions__issue',
-                                          'issuerevisions__series')
-    issues = changes.filter(change_type__in=[CTYPES['issue'],
-                                             CTYPES['variant_add'],
-                                             CTYPES['two_issues']])\
-                    .prefetch_related('issuerevisions__issue',
-                                      'issuerevisions__variant_of',
-                                      'issuerevisions__series',
-                                      'issuerevisions__previous_revision')
-    issue_bulks = changes.filter(change_type=CTYPES['issue_bulk'])
-    covers = changes.filter(change_type=CTYPES['cover'])\
-                    .prefetch_related('coverrevisions__previous_revision',
-                                      'coverrevisions__cover')
-    story_arcs = changes.filter(change_type=CTYPES['story_arc'])
-    story_arc_relations = changes.filter(
-      change_type=CTYPES['story_arc_relation'])
-    features = changes.filter(change_type=CTYPES['feature'])
-    feature_logos = changes.filter(change_type=CTYPES['feature_logo'])
-    feature_relations = changes.filter(change_type=CTYPES['feature_relation'])
-    universes = changes.filter(change_type=CTYPES['universe'])
-    characters = changes.filter(change_type=CTYPES['character'])
-    character_relations = changes.filter(
-      change_type=CTYPES['character_relation'])
-    groups = changes.filter(change_type=CTYPES['group'])
-    group_relations = changes.filter(change_type=CTYPES['group_relation'])
-    group_memberships = changes.filter(change_type=CTYPES['group_membership'])
-    images = changes.filter(change_type=CTYPES['image'])
-    countries = dict(Country.objects.values_list('id', 'code'))
-    country_names = dict(Country.objects.values_list('id', 'name'))
+    countries = {}
+    country_names = {}
+    for id, code, name in Country.objects.values_list('id', 'code', 'name'):
+        countries[id] = code
+        country_names[id] = name
     response = oi_render(
       request,
       'oi/queues/%s.html' % queue_name,
@@ -5923,233 +6003,7 @@ def show_queue(request, queue_name):
         'states': states,
         'countries': countries,
         'country_names': country_names,
-        'data': [
-          {
-            'object_name': 'Awards',
-            'object_type': 'award',
-            'changesets': awards.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Creators',
-            'object_type': 'creator',
-            'changesets': creators.order_by('modified', 'id')
-                                  .annotate(
-              country=Max('creatorrevisions__birth_country__id'))
-          },
-          {
-            'object_name': 'Creator Signatures',
-            'object_type': 'creator_signature',
-            'changesets': creator_signatures.order_by('modified', 'id')
-                                            .annotate(
-              country=Max(
-                'creatorsignaturerevisions__creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Publishers',
-            'object_type': 'publisher',
-            'changesets': publishers.order_by('modified', 'id')
-                                    .annotate(
-              country=Max('publisherrevisions__country__id')),
-          },
-          {
-            'object_name': 'Indicia / Colophon Publishers',
-            'object_type': 'indicia_publisher',
-            'changesets': indicia_publishers.order_by('modified', 'id')
-                                            .annotate(
-              country=Max('indiciapublisherrevisions__country__id')),
-          },
-          {
-            'object_name': 'Brand Groups',
-            'object_type': 'brand_groups',
-            'changesets': brand_groups.order_by('modified', 'id')
-                                      .annotate(
-              country=Max('brandgrouprevisions__parent__country__id')),
-          },
-          {
-            'object_name': 'Brand Emblems',
-            'object_type': 'brands',
-            'changesets': brands.order_by('modified', 'id')
-                                .annotate(
-              country=Max('brandrevisions__group__parent__country__id')),
-          },
-          {
-            'object_name': 'Brand Uses',
-            'object_type': 'brand_uses',
-            'changesets': brand_uses.order_by('modified', 'id')
-                                    .annotate(
-              country=Max('branduserevisions__publisher__country__id')),
-          },
-          {
-            'object_name': 'Printers',
-            'object_type': 'printer',
-            'changesets': printers.order_by('modified', 'id')
-                                  .annotate(
-              country=Max('printerrevisions__country__id')),
-          },
-          {
-            'object_name': 'Indicia Printers',
-            'object_type': 'indicia_printer',
-            'changesets': indicia_printers.order_by('modified', 'id')
-                                          .annotate(
-              country=Max('indiciaprinterrevisions__country__id')),
-          },
-          {
-            'object_name': 'Series',
-            'object_type': 'series',
-            'changesets': series.order_by('modified', 'id')
-                                .annotate(country=Max(
-                                          'seriesrevisions__country__id')),
-          },
-          {
-            'object_name': 'Features',
-            'object_type': 'feature',
-            'changesets': features.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Feature Logos',
-            'object_type': 'feature_logo',
-            'changesets': feature_logos.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Story Arcs',
-            'object_type': 'story_arc',
-            'changesets': story_arcs.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Universes',
-            'object_type': 'universe',
-            'changesets': universes.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Characters',
-            'object_type': 'character',
-            'changesets': characters.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Groups',
-            'object_type': 'group',
-            'changesets': groups.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Issue Skeletons',
-            'object_type': 'issue',
-            'changesets': issue_adds.order_by('modified', 'id')
-                                    .annotate(
-              country=Max('issuerevisions__series__country__id')),
-          },
-          {
-            'object_name': 'Issue Bulk Changes',
-            'object_type': 'issue',
-            'changesets': issue_bulks.order_by('state', 'modified', 'id')
-                                     .annotate(
-              country=Max('issuerevisions__series__country__id')),
-          },
-          {
-            'object_name': 'Issues',
-            'object_type': 'issue',
-            'changesets': issues.order_by('state', 'modified', 'id')
-                                .annotate(
-              country=Max('issuerevisions__series__country__id')),
-          },
-          {
-            'object_name': 'Received Awards',
-            'object_type': 'received_award',
-            'changesets': received_awards.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Creator Art Influences',
-            'object_type': 'creator_art_influence',
-            'changesets': creator_art_influences.order_by('modified',
-                                                          'id')
-                                                .annotate(
-              country=Max(
-                'creatorartinfluencerevisions__creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Creator Degrees',
-            'object_type': 'creator_degree',
-            'changesets': creator_degres.order_by('modified', 'id')
-                                        .annotate(
-              country=Max(
-                'creatordegreerevisions__creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Creator Memberships',
-            'object_type': 'creator_membership',
-            'changesets': creator_memberships.order_by('modified', 'id')
-                                             .annotate(
-              country=Max(
-                'creatormembershiprevisions__creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Creator Non Comic Works',
-            'object_type': 'creator_non_comic_work',
-            'changesets': creator_non_comic_works.order_by('modified', 'id')
-                                                 .annotate(
-              country=Max(
-                'creatornoncomicworkrevisions__creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Creator Relations',
-            'object_type': 'creator_relation',
-            'changesets': creator_relations.order_by('modified', 'id')
-                                           .annotate(
-              country=Max(
-                'creatorrelationrevisions__from_creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Creator Schools',
-            'object_type': 'creator_school',
-            'changesets': creator_schools.order_by('modified', 'id')
-                                         .annotate(
-              country=Max(
-                'creatorschoolrevisions__creator__birth_country__id'))
-          },
-          {
-            'object_name': 'Series Bonds',
-            'object_type': 'series_bond',
-            'changesets': series_bonds.order_by('modified', 'id')
-                                      .annotate(
-              country=Max('seriesbondrevisions__origin__country__id')),
-          },
-          {
-            'object_name': 'Feature Relations',
-            'object_type': 'feature_relation',
-            'changesets': feature_relations.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Story Arc Relations',
-            'object_type': 'story_arc_relation',
-            'changesets': story_arc_relations.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Character Relations',
-            'object_type': 'character_relation',
-            'changesets': character_relations.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Group Relations',
-            'object_type': 'group_relation',
-            'changesets': group_relations.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Group Memberships',
-            'object_type': 'group_membership',
-            'changesets': group_memberships.order_by('modified', 'id')
-          },
-          {
-            'object_name': 'Covers',
-            'object_type': 'cover',
-            'changesets': covers.order_by('state', 'modified', 'id')
-                                .annotate(
-              country=Max('coverrevisions__issue__series__country__id')),
-          },
-          {
-            'object_name': 'Images',
-            'object_type': 'image',
-            'changesets': images.order_by('state', 'modified', 'id'),
-          },
-        ],
+        'data': _queue_sections(changes),
       }
     )
     response['Cache-Control'] = "no-cache, no-store, max-age=0," \
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
+import threading
+from contextlib import contextmanager
+
 from django.db import models
+from django.db.models import F, Q, Case, When, Value
 from django.conf import settings
 from django.contrib.auth.models import User
 
@@ -8,29 +12,47 @@ from apps.gcd.models import Publisher, Series, Issue, INDEXED, Story, Cover, \
                             Creator
 
 
+# The deltas gathered by CountStatsManager.deferred_updates per thread.
+_pending_counts = threading.local()
+
+
 class CountStatsManager(models.Manager):
 
     def init_stats(self, language=None, country=None):
         if language and country:
             raise ValueError('either country or language stats')
         self.filter(language=language, country=country).delete()
+        for stat in self.computed_stats(language=language, country=country):
+            self.create(**stat)
+
+    def computed_stats(self, language=None, country=None):
+        """
+        Counts the statistics of the language, the country, or the generic
+        ones from the data, returned as the fields of their rows.
+        """
+        if language and country:
+            raise ValueError('either country or language stats')
+        stats = []
         if country:
             kwargs = {'country': country, 'deleted': False}
         else:
             kwargs = {'deleted': False}
 
         if language is None:
-            self.create(name='publishers', country=country,
-                        count=Publisher.objects.filter(**kwargs).count())
+            stats.append(dict(
+              name='publishers', country=country,
+              count=Publisher.objects.filter(**kwargs).count()))
             if not country:
-                self.create(name='creators',
-                            count=Creator.objects.filter(**kwargs).count())
+                stats.append(dict(
+                  name='creators',
+                  count=Creator.objects.filter(**kwargs).count()))
         else:
             kwargs['language'] = language
 
-        self.create(name='series', language=language, country=country,
-                    count=Series.objects.filter(is_comics_publication=True,
-                                                **kwargs).count())
+        stats.append(dict(
+          name='series', language=language, country=country,
+          count=Series.objects.filter(is_comics_publication=True,
+                                      **kwargs).count()))
         if 'language' in kwargs:
             kwargs['series__language'] = kwargs['language']
             kwargs.pop('language')
@@ -39,18 +61,20 @@ class CountStatsManager(models.Manager):
             kwargs.pop('country')
         kwargs['series__is_comics_publication'] = True
 
-        self.create(name='issues', language=language, country=country,
-                    count=Issue.objects.filter(variant_of=None,
-                                               **kwargs).count())
+        stats.append(dict(
+          name='issues', language=language, country=country,
+          count=Issue.objects.filter(variant_of=None, **kwargs).count()))
 
-        self.create(name='variant issues', language=language, country=country,
-                    count=Issue.objects.filter(**kwargs)
-                                       .exclude(variant_of=None).count())
+        stats.append(dict(
+          name='variant issues', language=language, country=country,
+          count=Issue.objects.filter(**kwargs)
+                             .exclude(variant_of=None).count()))
 
-        self.create(name='issue indexes', language=language, country=country,
-                    count=Issue.objects.filter(variant_of=None, **kwargs)
-                               .filter(is_indexed__gt=INDEXED['some_data'])
-                               .count())
+        stats.append(dict(
+          name='issue indexes', language=language, country=country,
+          count=Issue.objects.filter(variant_of=None, **kwargs)
+                             .filter(is_indexed__gt=INDEXED['some_data'])
+                             .count()))
 
         if 'series__language' in kwargs:
             kwargs['issue__series__language'] = kwargs['series__language']
@@ -60,11 +84,14 @@ class CountStatsManager(models.Manager):
             kwargs.pop('series__country')
         kwargs.pop('series__is_comics_publication')
 
-        self.create(name='covers', language=language, country=country,
-                    count=Cover.objects.filter(**kwargs).count())
+        stats.append(dict(
+          name='covers', language=language, country=country,
+          count=Cover.objects.filter(**kwargs).count()))
 
-        self.create(name='stories', language=language, country=country,
-                    count=Story.objects.filter(**kwargs).count())
+        stats.append(dict(
+          name='stories', language=language, country=country,
+          count=Story.objects.filter(**kwargs).count()))
+        return stats
 
     def update_count(self, field, delta, language=None, country=None):
         """
@@ -72,8 +99,19 @@ class CountStatsManager(models.Manager):
 
         The generic statistic is always updated.  The language and/or
         country statistics are updated if their respective parameters
-        are not None.
+        are not None.  Within deferred_updates the delta is only gathered.
         """
+        pending = getattr(_pending_counts, 'deltas', None)
+        if pending is not None:
+            keys = [(field, None, None)]
+            if language:
+                keys.append((field, language.id, None))
+            if country:
+                keys.append((field, None, country.id))
+            for key in keys:
+                pending[key] = pending.get(key, 0) + delta
+            return
+
         stat = self.get(name=field, language=None, country=None)
         stat.count = models.F('count') + delta
         stat.save()
@@ -131,6 +169,64 @@ class CountStatsManager(models.Manager):
                 self.update_count(field=field, delta=delta,
                                   language=language, country=country)
 
+    @contextmanager
+    def deferred_updates(self):
+        """
+        Gathers the deltas of update_count in memory and writes them on
+        exit, with one query for all affected rows instead of one per row
+        and delta.  Nested uses are part of the outermost one.  On errors
+        the gathered deltas are dropped.
+        """
+        if getattr(_pending_counts, 'deltas', None) is not None:
+            yield
+            return
+        _pending_counts.deltas = {}
+        try:
+            yield
+            deltas = _pending_counts.deltas
+        finally:
+            _pending_counts.deltas = None
+        self.write_deltas(deltas)
+
+    def write_deltas(self, deltas):
+        """
+        Adds the deltas, keyed by the name, language id and country id of
+        the stats, in one update.  Languages and countries without stats
+        are initialized instead, as in update_count.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        language_ids = {language_id for name, language_id, country_id
+                        in deltas if language_id}
+        country_ids = {country_id for name, language_id, country_id
+                       in deltas if country_id}
+        rows = self.filter(name__in={name for name, language_id, country_id
+                                     in deltas})\
+                   .filter(Q(language=None, country=None) |
+                           Q(language__in=language_ids, country=None) |
+                           Q(language=None, country__in=country_ids))\
+                   .values_list('name', 'language', 'country', 'id')
+        ids = {(name, language_id, country_id): stat_id
+               for name, language_id, country_id, stat_id in rows}
+
+        whens = [When(id=ids[key], then=Value(delta))
+                 for key, delta in deltas.items() if key in ids]
+        if whens:
+            self.filter(id__in=[ids[key] for key in deltas if key in ids])\
+                .update(count=F('count') + Case(*whens, default=Value(0)))
+
+        missing = {(language_id, country_id)
+                   for name, language_id, country_id in deltas
+                   if (name, language_id, country_id) not in ids}
+        for language_id, country_id in missing:
+            if language_id:
+                self.init_stats(language=Language.objects.get(id=language_id))
+            elif country_id:
+                self.init_stats(country=Country.objects.get(id=country_id))
+            else:
+                raise CountStats.DoesNotExist('No generic stats.')
+
 
 class CountStats(models.Model):
     """
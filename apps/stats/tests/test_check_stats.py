@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+The statistics check compares the stored rows with a recount of the data and
+initializes the differing languages and countries again with --fix.
+"""
+
+import pytest
+
+from apps.gcd.models import Publisher, Series
+from apps.stats.models import CountStats
+from scripts.check_stats import check_scope, main
+
+
+@pytest.fixture
+def language(country, language):
+    publisher = Publisher.objects.create(
+        name='Stats Publishing', country=country, year_began=1990)
+    Series.objects.create(
+        name='Alpha', sort_name='Alpha', year_began=1990, country=country,
+        language=language, publisher=publisher,
+        is_comics_publication=True, has_gallery=False)
+    CountStats.objects.all().delete()
+    CountStats.objects.init_stats(language=language)
+    return language
+
+
+@pytest.mark.django_db
+def test_check_scope(language):
+    assert check_scope({'language': language}) == {}
+
+    CountStats.objects.filter(name='series').update(count=5)
+
+    assert check_scope({'language': language}) == {'series': (5, 1)}
+
+
+@pytest.mark.django_db
+def test_main_fixes_drift(language):
+    CountStats.objects.init_stats()
+    CountStats.objects.filter(name='series', language=language)\
+                      .update(count=5)
+
+    with pytest.raises(SystemExit):
+        main()
+    main('--fix')
+
+    assert CountStats.objects.get(name='series', language=language).count \
+        == 1
+    main()
@@ -459,3 +459,38 @@ def test_update_all_negate(mocks_for_update_all):
         mock.call(field='bar', delta=-5,
                   language=ANY_LANGUAGE, country=ANY_COUNTRY)])
     assert uc_mock.call_count == 2
+
+
+@pytest.mark.django_db
+def test_deferred_updates(language, django_assert_num_queries):
+    CountStats.objects.all().delete()
+    CountStats.objects.create(name='stories', count=5)
+    CountStats.objects.create(name='stories', language=language, count=3)
+    CountStats.objects.create(name='covers', count=2)
+
+    # the ids of the rows and one update
+    with django_assert_num_queries(2):
+        with CountStats.objects.deferred_updates():
+            CountStats.objects.update_count('stories', 2, language=language)
+            with CountStats.objects.deferred_updates():
+                CountStats.objects.update_count('stories', -1,
+                                                language=language)
+            CountStats.objects.update_count('covers', 1)
+            CountStats.objects.update_count('covers', -1)
+
+    assert set(CountStats.objects.values_list('name', 'language', 'count')) \
+        == {('stories', None, 6), ('stories', language.id, 4),
+            ('covers', None, 2)}
+
+
+@pytest.mark.django_db
+def test_deferred_updates_dropped_on_error():
+    CountStats.objects.all().delete()
+    CountStats.objects.create(name='stories', count=5)
+
+    with pytest.raises(ValueError):
+        with CountStats.objects.deferred_updates():
+            CountStats.objects.update_count('stories', 2)
+            raise ValueError
+
+    assert CountStats.objects.get(name='stories').count == 5
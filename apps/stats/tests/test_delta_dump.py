@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Delta dumps select rows by their modified timestamp: changed rows are
+upserted, flagged data objects are listed as deleted.
+"""
+
+import json
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.utils import timezone
+
+from apps.gcd.models import Publisher
+from scripts.delta_dump import dump_delta, full_dump_timestamp, id_ranges
+
+
+def test_id_ranges():
+    assert id_ranges([]) == []
+    assert id_ranges([1, 2, 3, 7, 9, 10]) == [[1, 3], [7, 7], [9, 10]]
+
+
+def test_chain_starts_at_the_snapshot_of_the_full_dump(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    (tmp_path / settings.DUMP_DIR).mkdir()
+    # written when the dump started, the dump itself is finished later
+    (tmp_path / settings.DUMP_DIR / settings.DELTA_DUMP_SNAPSHOT)\
+        .write_text('20260101T020000Z\n')
+    (tmp_path / settings.DUMP_DIR / settings.MYSQL_DUMP).write_bytes(b'')
+
+    assert full_dump_timestamp() == datetime(2026, 1, 1, 2,
+                                             tzinfo=dt_timezone.utc)
+
+
+@pytest.mark.django_db
+def test_delta_contains_changed_and_deleted_rows(settings, tmp_path,
+                                                 country):
+    settings.MEDIA_ROOT = str(tmp_path)
+    (tmp_path / settings.DUMP_DIR / settings.DELTA_DUMP_DIR).mkdir(
+      parents=True)
+    since = timezone.now() - timedelta(minutes=1)
+    kept = Publisher.objects.create(name='Kept', country=country,
+                                    year_began=1990)
+    gone = Publisher.objects.create(name='Gone', country=country,
+                                    year_began=1990, deleted=True)
+    until = timezone.now() + timedelta(minutes=1)
+
+    entry = dump_delta(since, until)
+
+    assert entry['tables']['gcd_publisher'] == {'upserted': 1, 'deleted': 1}
+    path = tmp_path / settings.DUMP_DIR / settings.DELTA_DUMP_DIR / \
+        entry['file']
+    with zipfile.ZipFile(path) as archive:
+        rows = [json.loads(line) for line in
+                archive.read('gcd_publisher.jsonl').splitlines()]
+        summary = json.loads(archive.read('delta.json'))
+    assert [row['id'] for row in rows] == [kept.id]
+    assert rows[0]['name'] == 'Kept'
+    assert summary['tables']['gcd_publisher']['deleted'] == [gone.id]
+
+
+@pytest.mark.django_db
+def test_delta_excludes_rows_outside_window(settings, tmp_path, country):
+    settings.MEDIA_ROOT = str(tmp_path)
+    (tmp_path / settings.DUMP_DIR / settings.DELTA_DUMP_DIR).mkdir(
+      parents=True)
+    Publisher.objects.create(name='Later', country=country, year_began=1990)
+    until = timezone.now() - timedelta(minutes=1)
+
+    entry = dump_delta(until - timedelta(days=1), until)
+
+    assert entry['tables']['gcd_publisher'] == {'upserted': 0, 'deleted': 0}
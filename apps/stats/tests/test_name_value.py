@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+The parallel name-value dump splits the tables into the same id windows the
+sequential dump walks through, and merges the shards back in that order.
+The Parquet export writes the same fields as typed columns.
+"""
+
+import io
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from apps.gcd.models import Publisher, Series, Issue
+from scripts import name_value
+from scripts import name_value_parquet
+from scripts.name_value import _dump_range, _issues, _ranges, DELTA
+
+
+def test_ranges_cover_all_ids_without_overlap():
+    max = 3 * DELTA + 17
+    ranges = _ranges(max)
+
+    assert ranges[0] == (0, DELTA)
+    assert ranges[-1][1] == max
+    for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert next_start == end + 1
+
+
+def test_ranges_small_and_empty_tables():
+    assert _ranges(5) == [(0, 5)]
+    assert _ranges(None) == []
+
+
+def test_shard_names_sort_in_range_order(tmp_path):
+    shards = [name_value._shard_name(str(tmp_path), 'issues', start, end)
+              for start, end in _ranges(12 * DELTA)]
+    assert sorted(shards) == shards
+
+
+@pytest.fixture
+def series(country, language):
+    publisher = Publisher.objects.create(
+        name='Dump Publishing', country=country, year_began=1990)
+    return Series.objects.create(
+        name='Dumped', sort_name='Dumped', year_began=1990, country=country,
+        language=language, publisher=publisher,
+        is_comics_publication=True, has_gallery=False)
+
+
+@pytest.mark.django_db
+def test_dump_range_counts_rows_within_range(series):
+    first = Issue.objects.create(number='1', series=series, sort_code=1)
+    second = Issue.objects.create(number='2', series=series, sort_code=2)
+
+    dumpfile = io.BytesIO()
+    rows = _dump_range(dumpfile, _issues(), first.id, first.id,
+                       name_value.ISSUE_FIELDS, lambda i: i.id,
+                       'brand_emblem__group')
+
+    assert rows == 1
+    lines = dumpfile.getvalue().decode('utf-8').splitlines()
+    assert '"%d"\t"series name"\t"Dumped"' % first.id in lines
+    assert not any(line.startswith('"%d"' % second.id) for line in lines)
+
+
+def test_parquet_values_are_typed():
+    typed = name_value_parquet._typed_value
+    assert typed('', pa.string()) is None
+    assert typed(False, pa.bool_()) is False
+    assert typed('True', pa.bool_()) is True
+    assert typed(Decimal('32.000'), pa.float64()) == 32.0
+    assert typed(17, pa.int64()) == 17
+    assert typed('None', pa.timestamp('s', tz='UTC')) is None
+
+
+@pytest.mark.django_db
+def test_parquet_dump_has_one_row_per_issue(series, tmp_path):
+    Issue.objects.create(number='1', series=series, sort_code=1,
+                         page_count=Decimal('36'))
+    Issue.objects.create(number='2', series=series, sort_code=2)
+    filename = str(tmp_path / 'dump_issues.parquet')
+
+    rows = name_value_parquet._dump_table(filename, 'issues')
+
+    table = pq.read_table(filename)
+    assert rows == table.num_rows == 2
+    assert table.schema.field('issue page count').type == pa.float64()
+    assert table.column('issue page count').to_pylist() == [36.0, None]
+    assert table.column('series name').to_pylist() == ['Dumped', 'Dumped']
+
+
+@pytest.mark.django_db
+def test_parquet_dump_walks_id_ranges(series, tmp_path, monkeypatch):
+    issues = [Issue.objects.create(number=str(number), series=series,
+                                   sort_code=number) for number in range(3)]
+    ranges = [(0, issues[0].id), (issues[0].id + 1, issues[2].id)]
+    monkeypatch.setattr(name_value_parquet, '_ranges', lambda max: ranges)
+    filename = str(tmp_path / 'dump_issues.parquet')
+
+    rows = name_value_parquet._dump_table(filename, 'issues')
+
+    assert rows == pq.read_table(filename).num_rows == 3
@@ -5,6 +5,7 @@ import os
 import os.path
 import stat
 import errno
+import json
 from datetime import datetime, timedelta
 
 from django.conf import settings
@@ -19,6 +20,22 @@ from apps.gcd.models import Creator, Publisher, Series
 from apps.indexer.models import Indexer
 from apps.stddata.models import Country
 
+
+def _delta_dumps():
+    """
+    The manifest of the delta dumps since the last full dump, if any.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR,
+                        settings.DELTA_DUMP_DIR, settings.DELTA_DUMP_MANIFEST)
+    try:
+        with open(path) as manifest:
+            return json.load(manifest)
+    except OSError as ose:
+        if ose.errno == errno.ENOENT:
+            return None
+        raise
+
+
 @login_required
 def download(request):
 
@@ -31,8 +48,25 @@ def download(request):
             file = settings.MYSQL_DUMP
             if ('name-value' in request.POST):
                 file = settings.NAME_VALUE_DUMP
+            if ('parquet' in request.POST):
+                file = settings.PARQUET_DUMP
             if ('sqlite' in request.POST):
                 file = settings.SQLITE_DUMP
+            content_type = 'application/zip'
+            filename = 'current.zip'
+            if ('delta' in request.POST):
+                manifest = _delta_dumps()
+                deltas = [delta['file'] for delta in manifest['deltas']] \
+                    if manifest else []
+                if request.POST['delta'] not in deltas:
+                    return render_error(request,
+                                        'This delta dump is not available.')
+                filename = request.POST['delta']
+                file = os.path.join(settings.DELTA_DUMP_DIR, filename)
+            if ('delta-manifest' in request.POST):
+                filename = settings.DELTA_DUMP_MANIFEST
+                file = os.path.join(settings.DELTA_DUMP_DIR, filename)
+                content_type = 'application/json'
             path = os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR, file)
 
             delta = settings.DOWNLOAD_DELTA
@@ -58,9 +92,9 @@ def download(request):
             record.save()
 
             response = FileResponse(open(path, 'rb'),
-                                    content_type='application/zip')
+                                    content_type=content_type)
             response['Content-Disposition'] = \
-                'attachment; filename=current.zip'
+                'attachment; filename=%s' % filename
             return response
     else:
         form = DownloadForm()
@@ -69,13 +103,16 @@ def download(request):
                           settings.MYSQL_DUMP)
     nv_path = os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR,
                            settings.NAME_VALUE_DUMP)
+    parquet_path = os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR,
+                                settings.PARQUET_DUMP)
     sqlite_path = os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR,
                                settings.SQLITE_DUMP)
 
     # Use a list of tuples because we want the MySQL dump (our primary format)
     # to be first.
     timestamps = []
-    for dump_info in (('MySQL', m_path), ('Name-Value', nv_path), ('SQLite', sqlite_path), ):
+    for dump_info in (('MySQL', m_path), ('Name-Value', nv_path),
+                      ('Parquet', parquet_path), ('SQLite', sqlite_path), ):
         try:
             timestamps.append(
                 (dump_info[0],
@@ -90,6 +127,7 @@ def download(request):
     return render(request, 'stats/download.html',
                   {'method': request.method,
                    'timestamps': timestamps,
+                   'delta_dumps': _delta_dumps(),
                    'form': form, })
 
 
@@ -0,0 +1,84 @@
+"""
+This script benchmarks the issue page, giving the number of queries and the
+latency of rendering it for a sample of issues.  Each issue is rendered
+with cold issue page caches, i.e. with the cached parts being loaded, and
+then repeatedly with warm caches.  Without issue ids the issues are taken
+from the latest ones.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import statistics
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from apps.gcd.models import Issue
+from apps.gcd.views.details import issue as issue_view
+from apps.gcd.views.issue_page import invalidate_issue_pages
+from apps.middleware.query_count import count_queries
+
+
+def _render(request, issue_id):
+    started = time.monotonic()
+    with count_queries() as counter:
+        response = issue_view(request, issue_id)
+    return counter.count, (time.monotonic() - started) * 1000, response
+
+
+def _log_results(mode, results):
+    queries = [result[0] for result in results]
+    latencies = sorted(result[1] for result in results)
+    logging.info("%s: %d pages, queries mean %.1f max %d, latency median "
+                 "%.1f ms 95%% %.1f ms" %
+                 (mode, len(results), statistics.mean(queries),
+                  max(queries), statistics.median(latencies),
+                  latencies[int(0.95 * (len(latencies) - 1))]))
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='benchmark_issue_page.py')
+    parser.add_argument('issue_ids', nargs='*', type=int)
+    parser.add_argument('--count', type=int, default=100,
+                        help='number of issues if none are given')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of renderings with warm caches')
+    options = parser.parse_args(args)
+
+    issues = Issue.objects.filter(deleted=False)
+    if options.issue_ids:
+        issues = issues.filter(id__in=options.issue_ids)
+    else:
+        issues = issues.order_by('-id')[:options.count]
+    issues = list(issues.values_list('id', 'series_id'))
+
+    request = RequestFactory().get('/issue/')
+    request.user = AnonymousUser()
+    cold = []
+    warm = []
+    for issue_id, series_id in issues:
+        invalidate_issue_pages([series_id])
+        cold.append(_render(request, issue_id))
+        for i in range(options.repeat):
+            warm.append(_render(request, issue_id))
+
+    if not issues:
+        logging.info("No issues to benchmark")
+        return
+    _log_results('cold caches', cold)
+    _log_results('warm caches', warm)
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
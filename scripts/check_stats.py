@@ -0,0 +1,84 @@
+"""
+This script compares the stored statistics with their recount from the data,
+as done by CountStats.objects.init_stats, for the generic statistics and the
+languages and countries with statistics.  Differing statistics are logged,
+with --fix the statistics of the affected languages and countries are
+initialized again.  Approvals during the check can show up as differences.
+"""
+
+import sys
+import time
+import logging
+import argparse
+
+from apps.stats.models import CountStats
+from apps.stddata.models import Country, Language
+
+
+def _scopes():
+    yield 'Generic', {}
+    for language in Language.objects.filter(
+      id__in=CountStats.objects.filter(country=None)
+                               .exclude(language=None)
+                               .values('language')).order_by('code'):
+        yield 'Language %s' % language.code, {'language': language}
+    for country in Country.objects.filter(
+      id__in=CountStats.objects.filter(language=None)
+                               .exclude(country=None)
+                               .values('country')).order_by('code'):
+        yield 'Country %s' % country.code, {'country': country}
+
+
+def check_scope(scope):
+    """
+    Returns the names of the differing statistics of the scope, with their
+    stored and recounted values.
+    """
+    stored = dict(CountStats.objects.filter(language=scope.get('language'),
+                                            country=scope.get('country'))
+                                    .values_list('name', 'count'))
+    counted = {stat['name']: stat['count']
+               for stat in CountStats.objects.computed_stats(**scope)}
+    return {name: (stored.get(name), counted.get(name))
+            for name in set(stored) | set(counted)
+            if stored.get(name) != counted.get(name)}
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='check_stats.py')
+    parser.add_argument('--fix', action='store_true',
+                        help='initialize the differing statistics again')
+    options = parser.parse_args(args)
+
+    done = 0
+    drifted = 0
+    started = time.monotonic()
+    for label, scope in _scopes():
+        differences = check_scope(scope)
+        for name, (stored, counted) in sorted(differences.items()):
+            logging.warning("%s: %s stored %s, counted %s" %
+                            (label, name, stored, counted))
+        if differences:
+            drifted += 1
+            if options.fix:
+                CountStats.objects.init_stats(**scope)
+        done += 1
+
+    logging.info("Checked the statistics of %d scopes in %.1f s, %d "
+                 "differing%s" % (done, time.monotonic() - started, drifted,
+                                  ', fixed' if options.fix else ''))
+    if drifted and not options.fix:
+        sys.exit(1)
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+This script regenerates the scaled w100/w200/w400 cover files from the
+uploaded cover files, e.g. after a change of the scaling.  The covers can
+be selected by series, publisher, and date of the last upload, and are
+processed by a pool of worker processes.
+
+The id of the last cover of the finished part is written to a checkpoint
+file, with --resume an interrupted run continues after it.  Covers from the
+old site before NEW_SITE_COVER_CREATION_DATE only have their scaled files,
+these are skipped.
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import multiprocessing
+from datetime import date, datetime, time as day_time, timezone
+
+import PIL.Image as pyImage
+
+from apps.gcd.models import Cover
+from apps.oi.covers import check_cover_dir, generate_sizes
+from scripts.workers import worker_pool, log_progress
+
+CHUNK_SIZE = 100
+
+
+def _parse_date(value):
+    return date.fromisoformat(value)
+
+
+def _covers(options):
+    covers = Cover.objects.filter(deleted=False).order_by('id')
+    if options.series:
+        covers = covers.filter(issue__series__id__in=options.series)
+    if options.publisher:
+        covers = covers.filter(
+          issue__series__publisher__id__in=options.publisher)
+    if options.since:
+        covers = covers.filter(last_upload__gte=datetime.combine(
+          options.since, day_time.min, tzinfo=timezone.utc))
+    if options.until:
+        covers = covers.filter(last_upload__lte=datetime.combine(
+          options.until, day_time.max, tzinfo=timezone.utc))
+    return covers
+
+
+def uploaded_file(cover):
+    """
+    The most recently uploaded file of the cover, which is the current one.
+    Files are named <cover_id>_<date>_<time>.<extension>.
+    """
+    uploads = sorted(glob.glob('%s/uploads/%d_*' % (cover.base_dir(),
+                                                    cover.id)))
+    return uploads[-1] if uploads else None
+
+
+def _regenerate(cover_ids):
+    """
+    Regenerate the scaled files of the covers, returns the number of
+    regenerated and of skipped covers.
+    """
+    done = skipped = 0
+    for cover in Cover.objects.filter(id__in=cover_ids):
+        filename = uploaded_file(cover)
+        if filename is None:
+            skipped += 1
+            continue
+        try:
+            check_cover_dir(cover.base_dir())
+            with pyImage.open(filename) as im:
+                generate_sizes(cover, im)
+            done += 1
+        except (IOError, OSError, ValueError) as e:
+            logging.error("Could not regenerate cover %d: %s" %
+                          (cover.id, e))
+            skipped += 1
+    return cover_ids[-1], done, skipped
+
+
+def _read_checkpoint(checkpoint):
+    try:
+        with open(checkpoint) as checkpoint_file:
+            return int(checkpoint_file.read())
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(checkpoint, cover_id):
+    with open(checkpoint + '.part', 'w') as checkpoint_file:
+        checkpoint_file.write('%d\n' % cover_id)
+    os.replace(checkpoint + '.part', checkpoint)
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='cover_sizes.py')
+    parser.add_argument('--series', type=int, action='append')
+    parser.add_argument('--publisher', type=int, action='append')
+    parser.add_argument('--since', type=_parse_date,
+                        help='last upload on or after this date')
+    parser.add_argument('--until', type=_parse_date,
+                        help='last upload on or before this date')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--checkpoint', default='cover_sizes.checkpoint')
+    parser.add_argument('--resume', action='store_true')
+    options = parser.parse_args(args)
+
+    covers = _covers(options)
+    if options.resume:
+        covers = covers.filter(id__gt=_read_checkpoint(options.checkpoint))
+    cover_ids = list(covers.values_list('id', flat=True))
+    chunks = [cover_ids[i:i + CHUNK_SIZE]
+              for i in range(0, len(cover_ids), CHUNK_SIZE)]
+    logging.info("Regenerating %d covers with %d workers" %
+                 (len(cover_ids), options.workers))
+
+    done = skipped = 0
+    started = time.monotonic()
+    with worker_pool(options.workers) as pool:
+        # imap returns the chunks in order, so everything up to the last
+        # cover of a returned chunk is finished
+        for last_id, chunk_done, chunk_skipped in pool.imap(_regenerate,
+                                                            chunks):
+            done += chunk_done
+            skipped += chunk_skipped
+            _write_checkpoint(options.checkpoint, last_id)
+            log_progress(done + skipped, len(cover_ids), 'covers', started)
+
+    logging.info("Regenerated %d covers in %.1f s, %d skipped" %
+                 (done, time.monotonic() - started, skipped))
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+This script rebuilds the precomputed collaborations of the creators, which
+are added by their migration and otherwise kept up to date when story
+credits are committed.  A rebuild picks up changes which do not go through
+story credits, e.g. of story types or issue key dates.  The creators are
+processed by a pool of worker processes.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from apps.gcd.models import Creator
+from apps.gcd.models.creator import update_collaborations
+from scripts.workers import worker_pool, log_progress
+
+CHUNK_SIZE = 100
+
+
+def _rebuild(creator_ids):
+    for creator in Creator.objects.filter(id__in=creator_ids):
+        update_collaborations(creator)
+    return len(creator_ids)
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='creator_collaborations.py')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    options = parser.parse_args(args)
+
+    creator_ids = list(Creator.objects.order_by('id')
+                                      .values_list('id', flat=True))
+    chunks = [creator_ids[i:i + CHUNK_SIZE]
+              for i in range(0, len(creator_ids), CHUNK_SIZE)]
+    logging.info("Rebuilding the collaborations of %d creators with %d "
+                 "workers" % (len(creator_ids), options.workers))
+
+    done = 0
+    started = time.monotonic()
+    with worker_pool(options.workers) as pool:
+        for chunk_done in pool.imap_unordered(_rebuild, chunks):
+            done += chunk_done
+            log_progress(done, len(creator_ids), 'creators', started)
+
+    logging.info("Rebuilt the collaborations of %d creators in %.1f s" %
+                 (done, time.monotonic() - started))
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+This script regenerates the face crops of the creator portraits, e.g. after
+a migration of the image files or a change of the face detection.  The
+portraits are processed by a pool of worker processes, each of which keeps
+its face detectors for all the portraits it processes.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from django.contrib.contenttypes.models import ContentType
+
+from apps.gcd.models import Creator, Image
+from scripts.workers import worker_pool, log_progress
+
+CHUNK_SIZE = 100
+
+
+def _portraits():
+    return Image.objects.filter(
+      content_type=ContentType.objects.get_for_model(Creator),
+      type_id=4, deleted=False).order_by('id')
+
+
+def _regenerate(image_ids):
+    """
+    Regenerate the face crop and the face portrait based on it for the
+    images, returns the number of processed and of failed images.
+    """
+    failed = 0
+    for image in Image.objects.filter(id__in=image_ids):
+        try:
+            image.cropped_face.generate(force=True)
+            image.face_portrait.generate(force=True)
+        except (IOError, OSError, ValueError) as e:
+            logging.error("Could not regenerate portrait %d: %s" %
+                          (image.id, e))
+            failed += 1
+    return len(image_ids), failed
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='creator_portraits.py')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    options = parser.parse_args(args)
+
+    image_ids = list(_portraits().values_list('id', flat=True))
+    chunks = [image_ids[i:i + CHUNK_SIZE]
+              for i in range(0, len(image_ids), CHUNK_SIZE)]
+    logging.info("Regenerating %d portraits with %d workers" %
+                 (len(image_ids), options.workers))
+
+    done = failed = 0
+    started = time.monotonic()
+    with worker_pool(options.workers) as pool:
+        for chunk_done, chunk_failed in pool.imap_unordered(_regenerate,
+                                                            chunks):
+            done += chunk_done
+            failed += chunk_failed
+            log_progress(done, len(image_ids), 'portraits', started)
+
+    elapsed = time.monotonic() - started
+    logging.info("Regenerated %d portraits in %.1f s, %d failed" %
+                 (done - failed, elapsed, failed))
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
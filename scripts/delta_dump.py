@@ -0,0 +1,238 @@
+"""
+This script produces an incremental (delta) dump of the gcd data tables for
+a time window, based on the modified timestamps of the data objects.
+
+For each table the delta contains the rows which were added or changed in
+the window, together with the ids of the rows deleted in the window.  Data
+objects are not removed from the database when deleted, but flagged, so
+these are found by their modified timestamp as well.  Link objects are
+removed from the database, for these the delta lists the ranges of the
+currently existing ids instead, any other id has been deleted.  The rows of
+many-to-many tables are included for all changed objects of the table.
+
+The deltas are chained by a manifest, starting with the last full dump.
+Each delta begins where the previous one ended, and a newer full dump
+starts a new chain.  The chain starts at the time the snapshot of the full
+dump was taken, not when the dump finished, so the dump job needs to write
+that time next to the dump, see DELTA_DUMP_SNAPSHOT.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import zipfile
+from datetime import datetime, timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone as django_timezone
+
+from apps.gcd.models.gcddata import GcdBase, GcdData
+
+CHUNK_SIZE = 1000
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def delta_dir():
+    return os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR,
+                        settings.DELTA_DUMP_DIR)
+
+
+def full_dump_timestamp():
+    """
+    The time the snapshot of the last full dump was taken, which is the
+    start of the delta chain.  Changes made while the dump was running are
+    not in it, these are in the first delta.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, settings.DUMP_DIR,
+                        settings.DELTA_DUMP_SNAPSHOT)
+    with open(path) as snapshot:
+        return _parse_timestamp(snapshot.read().strip())
+
+
+def read_manifest():
+    try:
+        with open(os.path.join(delta_dir(),
+                               settings.DELTA_DUMP_MANIFEST)) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(manifest):
+    path = os.path.join(delta_dir(), settings.DELTA_DUMP_MANIFEST)
+    with open(path + '.part', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(path + '.part', path)
+
+
+def _format_timestamp(timestamp):
+    return timestamp.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def _parse_timestamp(value):
+    return datetime.strptime(value, TIMESTAMP_FORMAT) \
+                   .replace(tzinfo=timezone.utc)
+
+
+def _delta_models():
+    return [model for model in apps.get_app_config('gcd').get_models()
+            if issubclass(model, GcdBase) and not model._meta.proxy]
+
+
+def _chunks(ids):
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def id_ranges(ids):
+    """
+    Compress sorted ids into inclusive [first, last] ranges.
+    """
+    ranges = []
+    for id in ids:
+        if ranges and ranges[-1][1] == id - 1:
+            ranges[-1][1] = id
+        else:
+            ranges.append([id, id])
+    return ranges
+
+
+def _write_rows(archive, name, rows):
+    with archive.open(name, 'w', force_zip64=True) as member:
+        for row in rows:
+            member.write(json.dumps(row, cls=DjangoJSONEncoder)
+                             .encode('utf-8'))
+            member.write(b'\n')
+
+
+def _dump_model(archive, model, since, until):
+    """
+    Write the changed rows of a model and of its many-to-many tables, and
+    return the summary of the table for the delta manifest.
+    """
+    window = model.objects.filter(modified__gt=since, modified__lte=until)
+    table = {}
+    if issubclass(model, GcdData):
+        table['deleted'] = sorted(window.filter(deleted=True)
+                                        .values_list('id', flat=True))
+        window = window.filter(deleted=False)
+    else:
+        table['live_ranges'] = id_ranges(
+          model.objects.order_by('id').values_list('id', flat=True)
+                                      .iterator(chunk_size=CHUNK_SIZE))
+    upserted = sorted(window.values_list('id', flat=True))
+    table['upserted'] = len(upserted)
+
+    columns = [field.attname for field in model._meta.concrete_fields]
+    rows = (row for ids in _chunks(upserted)
+            for row in model.objects.filter(id__in=ids).order_by('id')
+                                    .values(*columns))
+    _write_rows(archive, '%s.jsonl' % model._meta.db_table, rows)
+
+    for field in model._meta.local_many_to_many:
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            continue
+        owner = field.m2m_field_name() + '_id'
+        rows = (row for ids in _chunks(upserted)
+                for row in through.objects.filter(**{owner + '__in': ids})
+                                          .order_by('id').values())
+        _write_rows(archive, '%s.jsonl' % through._meta.db_table, rows)
+        table.setdefault('many_to_many', {})[through._meta.db_table] = owner
+    return table
+
+
+def dump_delta(since, until):
+    """
+    Write the delta for the window (since, until] into a zip archive in the
+    delta directory, and return its manifest entry.
+    """
+    name = 'delta_%s_%s.zip' % (_format_timestamp(since),
+                                _format_timestamp(until))
+    path = os.path.join(delta_dir(), name)
+    entry = {'file': name,
+             'since': _format_timestamp(since),
+             'until': _format_timestamp(until),
+             'tables': {}}
+
+    with zipfile.ZipFile(path + '.part', 'w',
+                         compression=zipfile.ZIP_DEFLATED) as archive:
+        for model in _delta_models():
+            table = _dump_model(archive, model, since, until)
+            entry['tables'][model._meta.db_table] = table
+            logging.info("%s: %d upserted, %d deleted" % (
+              model._meta.db_table, table['upserted'],
+              len(table.get('deleted', []))))
+        archive.writestr('delta.json', json.dumps(entry, indent=2))
+    os.replace(path + '.part', path)
+
+    entry['tables'] = {db_table: {'upserted': table['upserted'],
+                                  'deleted': len(table.get('deleted', []))}
+                       for db_table, table in entry['tables'].items()}
+    return entry
+
+
+def main(*args):
+    """
+    Dump the changes since the end of the last delta, or since the last
+    full dump if the chain is new, within one transaction for a consistent
+    view.  See name_value.main for why the BEGIN statement is issued
+    manually.
+    """
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='delta_dump.py')
+    parser.add_argument('--until', type=_parse_timestamp,
+                        help='end of the window, as %s' %
+                             TIMESTAMP_FORMAT.replace('%', '%%'))
+    options = parser.parse_args(args)
+
+    os.makedirs(delta_dir(), exist_ok=True)
+    try:
+        base = full_dump_timestamp()
+    except FileNotFoundError:
+        logging.error("The snapshot time of the full dump is missing, it "
+                      "needs to be written to %s by the dump job" %
+                      settings.DELTA_DUMP_SNAPSHOT)
+        sys.exit(-1)
+    manifest = read_manifest()
+    if manifest is None or _parse_timestamp(manifest['base']) < base:
+        manifest = {'base': _format_timestamp(base),
+                    'full_dump': settings.MYSQL_DUMP,
+                    'deltas': []}
+
+    if manifest['deltas']:
+        since = _parse_timestamp(manifest['deltas'][-1]['until'])
+    else:
+        since = _parse_timestamp(manifest['base'])
+    until = options.until or django_timezone.now().replace(microsecond=0)
+    if until <= since:
+        logging.error("Nothing to dump, the last delta ends at %s" % since)
+        sys.exit(-1)
+
+    cursor = connection.cursor()
+    cursor.execute('BEGIN')
+    try:
+        entry = dump_delta(since, until)
+    finally:
+        cursor.execute('ROLLBACK')
+
+    manifest['deltas'].append(entry)
+    _write_manifest(manifest)
+    logging.info("Wrote delta %s" % entry['file'])
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
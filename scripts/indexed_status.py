@@ -0,0 +1,73 @@
+"""
+This script checks the stored index status of the issues, which is otherwise
+set when stories of the issues are committed.  The number of issues with an
+outdated status is logged, with --fix they are corrected together with their
+variants, afterwards the statistics need to be recounted with reset_stats.py.
+The issues are processed in id ranges by a pool of worker processes.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from django.db.models import Max
+
+from apps.gcd.models import Issue
+from apps.gcd.models.issue import set_indexed_statuses
+from scripts.workers import worker_pool, log_progress
+
+RANGE_SIZE = 1000
+
+
+def _check(task):
+    start, fix = task
+    issues = Issue.objects.filter(id__gte=start, id__lt=start + RANGE_SIZE,
+                                  deleted=False, variant_of=None)\
+                          .only('id', 'variant_of', 'page_count',
+                                'page_count_uncertain', 'is_indexed')
+    return len(set_indexed_statuses(list(issues), save=fix))
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='indexed_status.py')
+    parser.add_argument('--fix', action='store_true',
+                        help='correct the outdated issues')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    options = parser.parse_args(args)
+
+    last_id = Issue.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    tasks = [(start, options.fix)
+             for start in range(1, last_id + 1, RANGE_SIZE)]
+    logging.info("Checking the index status of the issues up to id %d with "
+                 "%d workers" % (last_id, options.workers))
+
+    done = 0
+    outdated = 0
+    started = time.monotonic()
+    with worker_pool(options.workers) as pool:
+        for range_outdated in pool.imap_unordered(_check, tasks):
+            done += 1
+            outdated += range_outdated
+            log_progress(done, len(tasks), 'id ranges', started)
+
+    logging.info("Checked the issues in %.1f s, %d outdated%s" %
+                 (time.monotonic() - started, outdated,
+                  ', fixed' if options.fix else ''))
+    if outdated and not options.fix:
+        sys.exit(1)
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+This script sets the date columns of the key dates and on-sale dates of the
+issues, which are otherwise set when issues are saved and by the migration
+adding the columns.  It logs the number of issues with outdated columns,
+e.g. after bulk updates of the dates, and corrects them.  The issues are
+processed in id ranges by a pool of worker processes.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from django.db.models import Max
+
+from apps.gcd.models import Issue
+from scripts.workers import worker_pool, log_progress
+
+RANGE_SIZE = 1000
+DATE_FIELDS = ['key_date_value', 'key_date_precision',
+               'on_sale_date_value', 'on_sale_date_precision']
+
+
+def _set_date_values(start):
+    issues = Issue.objects.filter(id__gte=start, id__lt=start + RANGE_SIZE)\
+                          .only('id', 'key_date', 'on_sale_date',
+                                *DATE_FIELDS)
+    changed = []
+    for issue in issues:
+        old_values = [getattr(issue, field) for field in DATE_FIELDS]
+        issue.set_date_values()
+        if old_values != [getattr(issue, field) for field in DATE_FIELDS]:
+            changed.append(issue)
+    Issue.objects.bulk_update(changed, DATE_FIELDS)
+    return len(changed)
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='issue_date_values.py')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    options = parser.parse_args(args)
+
+    last_id = Issue.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    starts = range(1, last_id + 1, RANGE_SIZE)
+    logging.info("Setting the date columns of the issues up to id %d with "
+                 "%d workers" % (last_id, options.workers))
+
+    done = 0
+    changed = 0
+    started = time.monotonic()
+    with worker_pool(options.workers) as pool:
+        for range_changed in pool.imap_unordered(_set_date_values, starts):
+            done += 1
+            changed += range_changed
+            log_progress(done, len(starts), 'id ranges', started)
+
+    logging.info("Set the date columns of %d issues in %.1f s" %
+                 (changed, time.monotonic() - started))
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,23 +7,32 @@ appearing multiple times per issue with different values and no indication of
 which field values are grouped on a particular story.
 """
 
+import os
 import sys
+import time
+import shutil
 import logging
+import argparse
 import itertools
 from django.db import connection, models
 from django.db.models import prefetch_related_objects
 from apps.gcd.models import Issue, Story
 from apps.gcd.models.story import show_feature, character_notes
 from apps.gcd.templatetags.credits import show_creator_credit
+from scripts.workers import worker_pool
+
+
+def _brand_name(issue):
+    return '; '.join(brand.name for brand in issue.brand_emblem.all())
 
 
 def _brand_group_name(issue):
-    if issue.brand:
-        groups = ''
-        for group in issue.brand.group.all():
-            groups += group.name + ', '
-        return groups[:-2]
-    return ''
+    groups = []
+    for brand in issue.brand_emblem.all():
+        for group in brand.group.all():
+            if group.name not in groups:
+                groups.append(group.name)
+    return ', '.join(groups)
 
 
 # Map moderately human-friendly field names to functions producing the data
@@ -35,14 +44,14 @@ ISSUE_FIELDS = {
     'no volume': lambda i: i.no_volume,
     'display number': lambda i: i.display_number,
     'variant name': lambda i: i.variant_name if i.variant_name else '',
-    'variant_of': lambda i: i.variant_of_id if i.variant_of else '',
+    'variant_of': lambda i: i.variant_of_id or '',
     'price': lambda i: i.price or '',
     'issue page count': lambda i: i.page_count if i.page_count else '',
     'issue page count uncertain': lambda i: i.page_count_uncertain,
     'publication date': lambda i: i.publication_date or '',
     'key date': lambda i: i.key_date or '',
     'publisher name': lambda i: i.series.publisher.name,
-    'brand name': lambda i: i.brand.name if i.brand else '',
+    'brand name': _brand_name,
     'brand group names': _brand_group_name,
     'indicia publisher name': lambda i: i.indicia_publisher.name if
                                         i.indicia_publisher else '',
@@ -197,6 +206,33 @@ def prefetch_related_iterator(queryset, *related_lookups, chunk_size=1000):
         yield from chunk
 
 
+def _dump_range(dumpfile, objects, start, end, fields, get_id,
+                *related_lookups):
+    """
+    Dump the records with ids in [start, end], selecting particular fields.
+    Fields with a NULL or empty string value are omitted.
+    Returns the number of records dumped.
+    """
+    rows = 0
+    for object in prefetch_related_iterator(objects.filter(
+                                            id__range=(start, end)),
+                                            *related_lookups):
+        rows += 1
+        for name, func in list(fields.items()):
+            value = str(func(object)).replace('"', '""')
+            value = _fix_value(value)
+            if value is not None:
+                if isinstance(object, Story):
+                    record = '"%d"\t"%d"\t"%s"\t%s\n' % (
+                      get_id(object), object.sequence_number,
+                      name, value)
+                else:
+                    record = '"%d"\t"%s"\t%s\n' % (get_id(object),
+                                                   name, value)
+                dumpfile.write(record.encode('utf-8'))
+    return rows
+
+
 def _dump_table(dumpfile, objects, max, fields, get_id, *related_lookups):
     """
     Dump records from a table a chunk at a time, selecting particular fields.
@@ -209,21 +245,8 @@ def _dump_table(dumpfile, objects, max, fields, get_id, *related_lookups):
         logging.info("Dumping object rows %d through %d (out of %d)" %
                      (start, end, max))
         try:
-            for object in prefetch_related_iterator(objects.filter(
-                                                    id__range=(start, end)),
-                                                    *related_lookups):
-                for name, func in list(fields.items()):
-                    value = str(func(object)).replace('"', '""')
-                    value = _fix_value(value)
-                    if value is not None:
-                        if isinstance(object, Story):
-                            record = '"%d"\t"%d"\t"%s"\t%s\n' % (
-                              get_id(object), object.sequence_number,
-                              name, value)
-                        else:
-                            record = '"%d"\t"%s"\t%s\n' % (get_id(object),
-                                                           name, value)
-                        dumpfile.write(record.encode('utf-8'))
+            _dump_range(dumpfile, objects, start, end, fields, get_id,
+                        *related_lookups)
         except IndexError:
             # Somehow our count was wrong and we ran off the end.  That's OK
             # because it just means we tried to select extra rows that aren't
@@ -237,12 +260,172 @@ def _dump_table(dumpfile, objects, max, fields, get_id, *related_lookups):
         start, end = _next_range(end, max)
 
 
+def _issues():
+    return Issue.objects \
+                .filter(deleted=False) \
+                .order_by() \
+                .select_related('series',
+                                'series__publisher',
+                                'indicia_publisher',
+                                'series__language',
+                                'series__country',
+                                'series__publisher__country')
+
+
+def _stories():
+    return Story.objects.filter(type__name__in=STORY_TYPES,
+                                deleted=False) \
+                        .order_by('issue_id', 'sequence_number') \
+                        .select_related('type')
+
+
+def _covers():
+    return Issue.objects \
+                .filter(deleted=False) \
+                .exclude(cover=None) \
+                .order_by()
+
+
+def _issue_id(issue):
+    return issue.id
+
+
+def _story_issue_id(story):
+    return story.issue_id
+
+
+# The tables of the dump, in output order, with the queryset, the fields,
+# the id written per record, and the related objects to prefetch. Defined
+# by name, so that worker processes can rebuild the querysets themselves.
+# To be able to do prefetching for credits, characters and covers we need to
+# filter in python.
+TABLES = {
+    'issues': (_issues, ISSUE_FIELDS, _issue_id, ('brand_emblem__group',)),
+    'sequences': (_stories, STORY_FIELDS, _story_issue_id,
+                  ('feature_object', 'credits__creator__creator',
+                   'credits__creator__type',
+                   'appearing_characters__character')),
+    'covers': (_covers, COVER_FIELDS, _issue_id, ('cover_set',)),
+}
+
+
+def _ranges(max):
+    """
+    All id ranges of a table up to max, in the same windows that
+    _dump_table walks through.
+    """
+    ranges = []
+    if max is None:
+        return ranges
+    start, end = 0, DELTA
+    while start is not None:
+        ranges.append((start, min(end, max)))
+        start, end = _next_range(min(end, max), max)
+    return ranges
+
+
+def _shard_name(shard_dir, table, start, end):
+    return os.path.join(shard_dir, table, '%010d-%010d.tsv' % (start, end))
+
+
+def _dump_shard(task):
+    """
+    Dump one id range of a table into its own shard file. The shard only
+    gets its final name once it is complete, so an existing shard marks a
+    finished range when a run is resumed.
+    """
+    table, start, end, shard = task
+    objects, fields, get_id, related_lookups = TABLES[table]
+    started = time.monotonic()
+    cursor = connection.cursor()
+    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+    cursor.execute('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+    try:
+        with open(shard + '.part', 'wb') as dumpfile:
+            rows = _dump_range(dumpfile, objects(), start, end, fields,
+                               get_id, *related_lookups)
+    finally:
+        cursor.execute('ROLLBACK')
+    os.replace(shard + '.part', shard)
+    return rows, time.monotonic() - started
+
+
+def _merge_shards(filename, shards):
+    with open(filename, 'wb') as dumpfile:
+        for shard in shards:
+            with open(shard, 'rb') as shard_file:
+                shutil.copyfileobj(shard_file, dumpfile)
+
+
+def dump_parallel(filename, workers, resume=False):
+    """
+    Dump the tables with a pool of worker processes, each one dumping a
+    range of ids with its own connection and snapshot. Finished ranges are
+    kept as shard files, so that an interrupted run can be resumed. Note
+    that in contrast to the sequential dump the snapshots of the ranges are
+    taken at slightly different times.
+    """
+    shard_dir = filename + '_shards'
+    if not resume and os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+
+    # We need the current max ids, the pool closes the connection before
+    # forking the processes.
+    maxima = {}
+    for table, (objects, fields, get_id, related_lookups) in TABLES.items():
+        maxima[table] = objects().aggregate(models.Max('id'))['id__max']
+        os.makedirs(os.path.join(shard_dir, table), exist_ok=True)
+
+    with worker_pool(workers) as pool:
+        for table in TABLES:
+            shards = []
+            tasks = []
+            for start, end in _ranges(maxima[table]):
+                shard = _shard_name(shard_dir, table, start, end)
+                shards.append(shard)
+                if os.path.exists(shard):
+                    continue
+                tasks.append((table, start, end, shard))
+
+            logging.info("Dumping %s: %d of %d ranges left" %
+                         (table, len(tasks), len(shards)))
+            rows = 0
+            started = time.monotonic()
+            for done, (shard_rows, seconds) in enumerate(
+              pool.imap_unordered(_dump_shard, tasks), 1):
+                rows += shard_rows
+                if done % 10 == 0 or done == len(tasks):
+                    logging.info("%s: %d of %d ranges done" %
+                                 (table, done, len(tasks)))
+            elapsed = time.monotonic() - started
+            logging.info("%s: dumped %d rows in %.1f s, %.1f rows/sec" %
+                         (table, rows, elapsed,
+                          rows / elapsed if elapsed else 0))
+
+            _merge_shards('%s_%s.tsv' % (filename, table), shards)
+
+    shutil.rmtree(shard_dir)
+
+
+def _open_dumpfile(filename):
+    try:
+        return open(filename, 'wb')
+    except (IOError, OSError) as e:
+        logging.error("Error opening output file '%s': %s" % (filename,
+                                                              e.strerror))
+        sys.exit(-1)
+
+
 def main(*args):
     """
     Dump public data in chunks, manually establishing a transaction to ensure
     a consistent view.  The BEGIN statement must be issued manually because
     django transaction objects will only initiate a transaction when writes
     are involved.
+
+    With --workers the id ranges are instead dumped in parallel, see
+    dump_parallel, and with --resume an interrupted parallel run continues
+    with the ranges that are not finished yet.
     """
 
     logging.basicConfig(level=logging.NOTSET,
@@ -250,23 +433,19 @@ def main(*args):
                         format='%(asctime)s %(levelname)s: %(message)s',
                         force=True)
 
-    if len(args) != 1:
-        logging.error("Usage:  name-value.py <output-file>")
-        # sys.exit(-1)
+    parser = argparse.ArgumentParser(prog='name_value.py')
+    parser.add_argument('filename')
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--resume', action='store_true')
+    options = parser.parse_args(args)
+    filename = options.filename
 
-    filename = args[0]
-    try:
-        dumpfile_issues = open(filename + '_issues.tsv', 'wb')
-    except (IOError, OSError) as e:
-        logging.error("Error opening output file '%s': %s" % (filename,
-                                                              e.strerror))
-        sys.exit(-1)
-    try:
-        dumpfile_sequences = open(filename + '_sequences.tsv', 'wb')
-    except (IOError, OSError) as e:
-        logging.error("Error opening output file '%s': %s" % (filename,
-                                                              e.strerror))
-        sys.exit(-1)
+    if options.workers:
+        dump_parallel(filename, options.workers, resume=options.resume)
+        return
+
+    dumpfiles = {table: _open_dumpfile('%s_%s.tsv' % (filename, table))
+                 for table in TABLES}
 
     cursor = connection.cursor()
     cursor.execute('BEGIN')
@@ -275,50 +454,19 @@ def main(*args):
         # Note: count() is relatively expensive with InnoDB, so don't call it
         # more than we absolutely have to.  Since this is being done within a
         # transaction, the count should never change.
-        issues = Issue.objects \
-                      .filter(deleted=False) \
-                      .order_by() \
-                      .select_related('series',
-                                      'series__publisher',
-                                      'brand',
-                                      'indicia_publisher',
-                                      'series__language',
-                                      'series__country',
-                                      'series__publisher__country')
-        max = issues.aggregate(models.Max('id'))['id__max']
-
-        _dump_table(dumpfile_issues, issues, max, ISSUE_FIELDS,
-                    lambda i: i.id,
-                    'brand__group')
-
-        stories = Story.objects.filter(type__name__in=STORY_TYPES,
-                                       deleted=False) \
-                               .order_by('issue_id', 'sequence_number') \
-                               .select_related('type')
-        max = stories.aggregate(models.Max('id'))['id__max']
-
-        # to be able to do prefetching for credits and characters we need to
-        # filter in python
-        _dump_table(dumpfile_sequences, stories, max, STORY_FIELDS,
-                    lambda s: s.issue_id,
-                    'feature_object', 'credits__creator__creator',
-                    'credits__creator__type',
-                    'appearing_characters__character')
-
-        covers = Issue.objects \
-                      .filter(deleted=False) \
-                      .exclude(cover=None) \
-                      .order_by()
-        max = covers.aggregate(models.Max('id'))['id__max']
-
-        # to be able to do prefetching for covers we need to filter in python
-        _dump_table(dumpfile_covers, covers, max, COVER_FIELDS,
-                    lambda i: i.id, 'cover_set')
+        for table, (objects, fields, get_id, related_lookups) in \
+          TABLES.items():
+            objects = objects()
+            max = objects.aggregate(models.Max('id'))['id__max']
+            _dump_table(dumpfiles[table], objects, max, fields, get_id,
+                        *related_lookups)
 
     finally:
         # We shouldn't have anything to commit or roll back, so just to be
         # safe, use a rollback to end the transaction.
         cursor.execute('ROLLBACK')
+        for dumpfile in dumpfiles.values():
+            dumpfile.close()
 
 
 def run(*args):
@@ -0,0 +1,142 @@
+"""
+This script produces a columnar export of the same data as the name-value
+dump in name_value.py, one Parquet file per table with one row per issue,
+story and cover, and one typed column per field.  The files are compressed
+and can be memory-mapped and filtered by clients without parsing all of the
+text of the name-value dump.
+"""
+
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import connection, models
+
+from scripts.name_value import TABLES, prefetch_related_iterator, _ranges
+
+BATCH_SIZE = 1000
+
+
+# Column types for fields that are not plain strings.  All fields not listed
+# here are exported as strings.
+FIELD_TYPES = {
+    'issues': {
+        'no volume': pa.bool_(),
+        'variant_of': pa.int64(),
+        'issue page count': pa.float64(),
+        'issue page count uncertain': pa.bool_(),
+    },
+    'sequences': {
+        'sequence_number': pa.int32(),
+        'title by gcd': pa.bool_(),
+    },
+    'covers': {
+        'last_upload': pa.timestamp('s', tz='UTC'),
+        'is_wraparound': pa.bool_(),
+    },
+}
+
+
+def _schema(table, fields):
+    types = FIELD_TYPES[table]
+    return pa.schema([('issue_id', pa.int64())] +
+                     [(name, types.get(name, pa.string()))
+                      for name in fields])
+
+
+def _typed_value(value, type):
+    """
+    The field functions return values formatted for the name-value dump,
+    with empty strings for missing values.  Convert these to the column type
+    and to None for missing values.
+    """
+    if value is None or value == '':
+        return None
+    if type == pa.bool_():
+        return value is True or value == 'True'
+    if type == pa.int64() or type == pa.int32():
+        return int(value)
+    if type == pa.float64():
+        return float(value)
+    if isinstance(type, pa.TimestampType):
+        if isinstance(value, str):
+            # formatted with "%s", which turns a NULL into 'None'
+            if value == 'None':
+                return None
+            value = datetime.fromisoformat(value)
+        return value
+    return str(value)
+
+
+def _dump_table(filename, table):
+    """
+    Write one table in batches of BATCH_SIZE rows, so that neither the
+    objects nor the columns of the whole table are kept in memory.  The
+    objects are queried in the id ranges of the name-value dump, since the
+    database client buffers the whole result of a query.
+    """
+    objects, fields, get_id, related_lookups = TABLES[table]
+    schema = _schema(table, fields)
+    types = [schema.field(name).type for name in fields]
+    max = objects().aggregate(models.Max('id'))['id__max']
+    rows = 0
+
+    with pq.ParquetWriter(filename, schema, compression='zstd') as writer:
+        columns = {name: [] for name in schema.names}
+        for start, end in _ranges(max):
+            for object in prefetch_related_iterator(
+                            objects().filter(id__range=(start, end)),
+                            *related_lookups, chunk_size=BATCH_SIZE):
+                columns['issue_id'].append(get_id(object))
+                for (name, func), type in zip(fields.items(), types):
+                    columns[name].append(_typed_value(func(object), type))
+                rows += 1
+                if rows % BATCH_SIZE == 0:
+                    writer.write_table(pa.Table.from_pydict(columns, schema))
+                    columns = {name: [] for name in schema.names}
+                    logging.info("Dumped %d %s rows" % (rows, table))
+        if columns['issue_id']:
+            writer.write_table(pa.Table.from_pydict(columns, schema))
+    return rows
+
+
+def main(*args):
+    """
+    Dump the tables within one transaction for a consistent view, see
+    name_value.main for why the BEGIN statement is issued manually.
+    """
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='name_value_parquet.py')
+    parser.add_argument('filename')
+    filename = parser.parse_args(args).filename
+
+    cursor = connection.cursor()
+    cursor.execute('BEGIN')
+
+    try:
+        for table in TABLES:
+            try:
+                rows = _dump_table('%s_%s.parquet' % (filename, table),
+                                   table)
+            except (IOError, OSError) as e:
+                logging.error("Error writing output file for %s: %s" %
+                              (table, e.strerror))
+                sys.exit(-1)
+            logging.info("Dumped %d %s rows" % (rows, table))
+    finally:
+        cursor.execute('ROLLBACK')
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+This script checks the stored previous and next issues of the issues,
+which are otherwise set when issues are added, moved, deleted or
+reordered, and by the migration adding them.  The series with
+inconsistent issues are logged, with --fix their issues are corrected.
+The series are processed by a pool of worker processes.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from apps.gcd.models import Series
+from scripts.workers import worker_pool, log_progress
+
+CHUNK_SIZE = 100
+
+
+def _check(task):
+    ids, fix = task
+    inconsistent = []
+    for series in Series.objects.filter(id__in=ids):
+        changed = series.set_prev_next_issues(save=fix)
+        if changed:
+            inconsistent.append((series.id, changed))
+    return len(ids), inconsistent
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='prev_next_issues.py')
+    parser.add_argument('series_ids', nargs='*', type=int)
+    parser.add_argument('--fix', action='store_true',
+                        help='correct the inconsistent issues')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    options = parser.parse_args(args)
+
+    series = Series.objects.filter(deleted=False)
+    if options.series_ids:
+        series = series.filter(id__in=options.series_ids)
+    ids = list(series.order_by('id').values_list('id', flat=True))
+    tasks = [(ids[i:i + CHUNK_SIZE], options.fix)
+             for i in range(0, len(ids), CHUNK_SIZE)]
+    logging.info("Checking the previous and next issues of %d series with "
+                 "%d workers" % (len(ids), options.workers))
+
+    done = 0
+    inconsistent = 0
+    started = time.monotonic()
+    with worker_pool(options.workers) as pool:
+        for chunk_done, chunk_inconsistent in pool.imap_unordered(_check,
+                                                                  tasks):
+            for series_id, changed in chunk_inconsistent:
+                logging.warning("Series %d: %d issues %s" %
+                                (series_id, changed,
+                                 'fixed' if options.fix else 'inconsistent'))
+            done += chunk_done
+            inconsistent += len(chunk_inconsistent)
+            log_progress(done, len(ids), 'series', started)
+
+    logging.info("Checked %d series in %.1f s, %d inconsistent%s" %
+                 (done, time.monotonic() - started, inconsistent,
+                  ', fixed' if options.fix else ''))
+    if inconsistent and not options.fix:
+        sys.exit(1)
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+This script rebuilds the search index of all or the given models, e.g.
+story or issue, as a faster replacement of update_index.  The id range of
+each model is split into ranges processed by a pool of worker processes.
+A worker loads the objects of a range with the index_queryset of the
+search index, which prefetches the related data, and bulk-posts their
+documents to the search backend.
+
+The last id of each model up to which all ranges are posted is written to
+a checkpoint file, with --resume an interrupted run continues after it.
+As with update_index, deleted objects are removed from the index.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+
+from django.db.models import Max, Min
+from haystack import connections as haystack_connections
+from haystack.constants import DEFAULT_ALIAS
+
+from scripts.workers import init_worker, worker_pool
+
+RANGE_SIZE = 1000
+
+
+def _indexes(using):
+    unified_index = haystack_connections[using].get_unified_index()
+    return {model._meta.model_name: unified_index.get_index(model)
+            for model in unified_index.get_indexed_models()}
+
+
+def _init_worker(using):
+    init_worker()
+    haystack_connections.reload(using)
+
+
+def _reindex(task):
+    """
+    Post the documents of the objects with ids in the range, returns the
+    end of the range and the number of objects.
+    """
+    using, model_name, start, end = task
+    index = _indexes(using)[model_name]
+    objects = list(index.index_queryset(using=using)
+                        .filter(id__gte=start, id__lt=end).order_by())
+    if objects:
+        haystack_connections[using].get_backend().update(index, objects,
+                                                         commit=False)
+    return end, len(objects)
+
+
+def _read_checkpoint(checkpoint):
+    try:
+        with open(checkpoint) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_checkpoint(checkpoint, last_ids):
+    with open(checkpoint + '.part', 'w') as checkpoint_file:
+        json.dump(last_ids, checkpoint_file)
+    os.replace(checkpoint + '.part', checkpoint)
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='search_reindex.py')
+    parser.add_argument('models', nargs='*',
+                        help='model names, e.g. story, default is all')
+    parser.add_argument('--using', default=DEFAULT_ALIAS)
+    parser.add_argument('--range-size', type=int, default=RANGE_SIZE)
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--checkpoint', default='search_reindex.checkpoint')
+    parser.add_argument('--resume', action='store_true')
+    options = parser.parse_args(args)
+
+    indexes = _indexes(options.using)
+    model_names = options.models or sorted(indexes)
+    unknown = set(model_names) - set(indexes)
+    if unknown:
+        parser.error('no search index for %s' % ', '.join(sorted(unknown)))
+
+    last_ids = _read_checkpoint(options.checkpoint) if options.resume else {}
+    for model_name in model_names:
+        id_range = indexes[model_name].get_model().objects\
+                                      .aggregate(first=Min('id'),
+                                                 last=Max('id'))
+        if id_range['first'] is None:
+            continue
+        first = max(id_range['first'], last_ids.get(model_name, 0) + 1)
+        tasks = [(options.using, model_name, start,
+                  min(start + options.range_size, id_range['last'] + 1))
+                 for start in range(first, id_range['last'] + 1,
+                                    options.range_size)]
+        logging.info("Reindexing %s ids %d to %d in %d ranges with %d "
+                     "workers" % (model_name, first, id_range['last'],
+                                  len(tasks), options.workers))
+
+        done = 0
+        started = time.monotonic()
+        with worker_pool(options.workers, initializer=_init_worker,
+                         initargs=(options.using,)) as pool:
+            # imap returns the ranges in order, so everything before the
+            # end of a returned range is posted
+            for end, range_done in pool.imap(_reindex, tasks):
+                done += range_done
+                last_ids[model_name] = end - 1
+                _write_checkpoint(options.checkpoint, last_ids)
+                elapsed = time.monotonic() - started
+                logging.info("%s up to id %d, %d done, %.1f s, %.1f docs "
+                             "per sec" % (model_name, end - 1, done, elapsed,
+                                          done / elapsed if elapsed else 0))
+
+        # make the posted documents visible to searches
+        backend = haystack_connections[options.using].get_backend()
+        backend.update(indexes[model_name], [], commit=True)
+        logging.info("Reindexed %d %s objects in %.1f s" %
+                     (done, model_name, time.monotonic() - started))
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
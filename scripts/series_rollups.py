@@ -0,0 +1,82 @@
+"""
+This script reconciles the series and feature rollups of creators,
+characters and groups, which are added by their migration and otherwise
+kept up to date when story revisions are committed.  Changes which do not
+go through stories, e.g. of issue key dates or of creator names, are
+picked up, it is meant to be run nightly.  Only differing rows are written,
+their number is logged.  The objects are processed by a pool of worker
+processes.
+"""
+
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from apps.gcd.models import Creator, Character, Group
+from apps.gcd.models.rollup import update_creator_rollups, \
+                                   update_character_rollups, \
+                                   update_group_rollups
+from scripts.workers import worker_pool, log_progress
+
+CHUNK_SIZE = 100
+
+ROLLUPS = {
+  'creators': (Creator, update_creator_rollups),
+  'characters': (Character, update_character_rollups),
+  'groups': (Group, update_group_rollups),
+}
+
+
+def _reconcile(task):
+    kind, ids = task
+    model, update = ROLLUPS[kind]
+    changed = 0
+    for obj in model.objects.filter(id__in=ids):
+        changed += update(obj)
+    return len(ids), changed
+
+
+def main(*args):
+    logging.basicConfig(level=logging.NOTSET,
+                        stream=sys.stdout,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        force=True)
+
+    parser = argparse.ArgumentParser(prog='series_rollups.py')
+    parser.add_argument('kinds', nargs='*', choices=list(ROLLUPS),
+                        default=list(ROLLUPS))
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    options = parser.parse_args(args)
+
+    for kind in options.kinds:
+        model = ROLLUPS[kind][0]
+        ids = list(model.objects.order_by('id').values_list('id', flat=True))
+        tasks = [(kind, ids[i:i + CHUNK_SIZE])
+                 for i in range(0, len(ids), CHUNK_SIZE)]
+        logging.info("Reconciling the rollups of %d %s with %d workers" %
+                     (len(ids), kind, options.workers))
+
+        done = 0
+        changed = 0
+        started = time.monotonic()
+        with worker_pool(options.workers) as pool:
+            for chunk_done, chunk_changed in pool.imap_unordered(_reconcile,
+                                                                 tasks):
+                done += chunk_done
+                changed += chunk_changed
+                log_progress(done, len(ids), kind, started)
+
+        logging.info("Reconciled the rollups of %d %s in %.1f s, %d rows "
+                     "changed" % (done, kind, time.monotonic() - started,
+                                  changed))
+
+
+def run(*args):
+    main(*args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+The pool of worker processes of the scripts processing the data in chunks
+or id ranges.
+"""
+
+import time
+import logging
+import multiprocessing
+
+from django.db import connections
+
+
+def init_worker():
+    # Connections inherited from the parent process must not be shared,
+    # each worker opens its own on first use.
+    connections.close_all()
+
+
+def worker_pool(workers, initializer=init_worker, initargs=()):
+    """
+    A pool of forked worker processes.  The connections of the parent
+    process are closed before, it opens new ones on its next use.
+    """
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    return context.Pool(workers, initializer=initializer, initargs=initargs)
+
+
+def log_progress(done, total, name, started):
+    elapsed = time.monotonic() - started
+    logging.info("%d of %d %s done, %.1f s, %.1f per sec" %
+                 (done, total, name, elapsed,
+                  done / elapsed if elapsed else 0))
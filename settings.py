@@ -310,6 +310,10 @@ HAYSTACK_CONNECTIONS = {
 # Comment out on a dev-setup with running ElasticSearch / Haystack
 # HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
 
+# With this the objects of approved changes are updated in the search index
+# after the commit, by an RQ job if django_rq is in INSTALLED_APPS.
+# HAYSTACK_SIGNAL_PROCESSOR = 'apps.gcd.search_updates.QueuedSignalProcessor'
+
 # assumingly this needs elasticstack
 ELASTICSEARCH_INDEX_SETTINGS = {
     # index settings
@@ -331,6 +335,9 @@ ELASTICSEARCH_DEFAULT_ANALYZER = 'default'
 USE_ELASTICSEARCH = False
 
 # override on production
+# With django_rq in INSTALLED_APPS the scaling of uploaded covers, the
+# moving of the files of approved covers and the updates of the data derived
+# from approved changes run as jobs on the default queue.
 RQ_QUEUES = {
     'default': {
         'HOST': 'localhost',
@@ -405,6 +412,13 @@ SITE_BACK_UP_AT = ''
 READ_ONLY = False
 NO_OI = False
 
+# Count the SQL queries of each request, see apps/middleware/query_count.py.
+# Query shapes run at least QUERY_COUNT_REPEATED times in a request are
+# logged, and the query count of QUERY_COUNT_SAMPLE of all requests.
+QUERY_COUNT = False
+QUERY_COUNT_REPEATED = 10
+QUERY_COUNT_SAMPLE = 0.01
+
 ###
 # General GCD site settings
 
@@ -493,7 +507,15 @@ DUMP_DIR = 'dumps'
 MYSQL_DUMP = 'current.zip'
 POSTGRES_DUMP = 'pg-current.zip'
 NAME_VALUE_DUMP = 'current_name_value.zip'
+PARQUET_DUMP = 'current_parquet.zip'
 SQLITE_DUMP = 'current_sqlite.zip'
+# delta dumps and their manifest, relative to DUMP_DIR
+DELTA_DUMP_DIR = 'deltas'
+DELTA_DUMP_MANIFEST = 'manifest.json'
+# the UTC time the snapshot of MYSQL_DUMP was taken, as YYYYMMDDTHHMMSSZ,
+# written by the dump job when the dump starts and moved into place with
+# the finished dump, the delta chain starts there
+DELTA_DUMP_SNAPSHOT = 'current.snapshot'
 
 # Amount of time that must pass before a user can download the same
 # dump (or similar) file again, in minutes.
@@ -526,3 +548,7 @@ if READ_ONLY or NO_OI:
     MIDDLEWARE += \
       ('apps.middleware.read_only.ReadOnlyMiddleware',)
 
+if QUERY_COUNT:
+    MIDDLEWARE = \
+      ('apps.middleware.query_count.QueryCountMiddleware',) + MIDDLEWARE
+